@@ -0,0 +1,277 @@
+"""
+The Build file.
+Stores the BuildPlanner class, which decides (like latexmk)
+which auxiliary tools (BibTeX, Biber, MakeIndex) and extra
+compiler passes a compile needs, by hashing their inputs
+between passes, so that nothing is rerun for no reason.
+"""
+from hashlib import sha1
+from os import environ, pathsep
+from os.path import abspath, dirname, exists, join
+from re import compile as compile_regex
+from subprocess import PIPE
+from threading import Lock
+
+# Files which the compiler reads back in its next pass (a change in any of them means it should run again),
+# and which are carried over to the next compile
+AUX_EXTENSIONS = [".aux", ".toc", ".lof", ".lot", ".out", ".nav", ".snm", ".bbl", ".ind"]
+
+# The lines of the .aux file which BibTeX reads
+BIBTEX_PATTERN = compile_regex(r"^\\(citation|bibdata|bibstyle)\{(.*)\}")
+
+# The data sources listed in Biber's control file
+BIBER_PATTERN = compile_regex(r"<bcf:datasource[^>]*>([^<]+)</bcf:datasource>")
+
+
+class BuildPlanner:
+	"""
+	The BuildPlanner class runs the passes which follow the
+	compiler's first pass. After each pass, it hashes the files
+	that the auxiliary tools and the next pass would read, runs
+	only the tools whose inputs changed since they last ran, and
+	runs the compiler again only if its own inputs changed.
+	The reason for every extra step is recorded.
+
+	The files of the last successful build of each document are carried
+	over into the next compile's build directory, so unchanged references
+	and citations never need an extra pass.
+	"""
+
+	def __init__(self, max_passes=4):
+		"""
+		:param max_passes: The most compiler passes a single compile may take.
+		"""
+		self.max_passes = max_passes
+		# The full paths of the documents to their last successful build's files (by file extension)
+		self.carried = dict()
+		# The full paths of the documents to the hash of each tool's inputs when it last ran (by tool name),
+		# in the last successful build (the tools' outputs are carried along with the rest of the files)
+		self.tool_inputs = dict()
+		# The reasons for the extra steps of the last build
+		self.reasons = list()
+		self.lock = Lock()
+
+	@staticmethod
+	def digest(*paths):
+		"""
+		Hashes files.
+
+		:param paths: The paths to the files.
+		:return: The hex digest of their contents (missing files are hashed as such).
+		"""
+		digest = sha1()
+		for path in paths:
+			digest.update(path.encode("utf-8"))
+			try:
+				with open(path, "rb") as file:
+					digest.update(file.read())
+			except OSError:
+				digest.update(b"\0missing")
+		return digest.hexdigest()
+
+	@staticmethod
+	def read_text(path):
+		"""
+		Reads a text file, or returns an empty string if it can't be read.
+		"""
+		try:
+			with open(path, "r", encoding="utf-8", errors="replace") as file:
+				return file.read()
+		except OSError:
+			return str()
+
+	@staticmethod
+	def bib_files(names, source_dir):
+		"""
+		Finds the .bib files of a bibliography.
+
+		:param names: The names of the .bib files (with or without the extension).
+		:param source_dir: The directory of the source file, which the names are relative to.
+		:return: A list of the paths to the .bib files.
+		"""
+		paths = list()
+		for name in names:
+			name = name.strip()
+			if name:
+				paths.append(join(source_dir, name if name.endswith(".bib") else name + ".bib"))
+		return paths
+
+	def carried_file(self, source, extension):
+		"""
+		Returns the contents of a file of a document's last successful build.
+
+		:param source: The path to the document's .tex file.
+		:param extension: The extension of the file (e.g. ".aux").
+		:return: The contents, as bytes (empty if there is no such file).
+		"""
+		with self.lock:
+			return self.carried.get(abspath(source), dict()).get(extension, bytes())
+
+	def seed(self, compiler, build_dir, source):
+		"""
+		Writes the files of the document's last successful build into a new
+		build directory, before the compiler's first pass reads them.
+
+		:param compiler: The Compile object of the build (its inputs attribute is set to what the first pass reads).
+		:param build_dir: The path to the build directory.
+		:param source: The path to the document's .tex file.
+		"""
+		with self.lock:
+			carried = dict(self.carried.get(abspath(source), dict()))
+		for extension, contents in carried.items():
+			with open(join(build_dir, "compile" + extension), "wb") as file:
+				file.write(contents)
+		compiler.inputs = self.snapshot(build_dir)
+
+	def remember(self, build_dir, source, tool_inputs, reasons):
+		"""
+		Keeps the files of a successful build, to be carried over to the next compile
+		of the document, along with the hashes of the inputs of the tools they came from.
+
+		:param build_dir: The path to the build directory.
+		:param source: The path to the document's .tex file.
+		:param tool_inputs: A dictionary of tool names to the hash of their inputs when they last ran.
+		:param reasons: The reasons for the extra steps of the build.
+		"""
+		carried = dict()
+		for extension in AUX_EXTENSIONS:
+			path = join(build_dir, "compile" + extension)
+			if exists(path):
+				with open(path, "rb") as file:
+					carried[extension] = file.read()
+		with self.lock:
+			self.carried[abspath(source)] = carried
+			self.tool_inputs[abspath(source)] = tool_inputs
+			self.reasons = reasons
+
+	def snapshot(self, build_dir):
+		"""
+		Hashes the files which the compiler reads back in its next pass.
+
+		:param build_dir: The path to the build directory.
+		:return: A dictionary of file extensions to their hashes.
+		"""
+		return {extension: self.digest(join(build_dir, "compile" + extension)) for extension in AUX_EXTENSIONS}
+
+	def plan_tools(self, build_dir, source, tool_inputs):
+		"""
+		Decides which auxiliary tools should run, by comparing the hash
+		of each tool's inputs to the hash from when it last ran.
+
+		:param build_dir: The path to the build directory.
+		:param source: The path to the compiled .tex file.
+		:param tool_inputs: A dictionary of tool names to the hash of their inputs when they last ran.
+		:return: A list of [tool, command, inputs hash, reason] lists.
+		"""
+		tools = list()
+		source_dir = dirname(abspath(source))
+		aux = self.read_text(join(build_dir, "compile.aux"))
+		bcf_path = join(build_dir, "compile.bcf")
+
+		# Biber (biblatex) lists its inputs in the .bcf file
+		if exists(bcf_path):
+			bib_files = self.bib_files(BIBER_PATTERN.findall(self.read_text(bcf_path)), source_dir)
+			tools.append(["biber", ["biber", "compile"], self.digest(bcf_path, *bib_files),
+			              "compile.bcf or its .bib files changed"])
+		# BibTeX reads the citations, the style and the databases from the .aux file
+		else:
+			bibtex_lines = [match.group(0) for match in map(BIBTEX_PATTERN.match, aux.splitlines()) if match]
+			if any(line.startswith("\\bibdata") for line in bibtex_lines):
+				names = list()
+				for line in bibtex_lines:
+					if line.startswith("\\bibdata"):
+						names += BIBTEX_PATTERN.match(line).group(2).split(",")
+				digest = sha1("\n".join(bibtex_lines).encode("utf-8"))
+				digest.update(self.digest(*self.bib_files(names, source_dir)).encode("utf-8"))
+				tools.append(["bibtex", ["bibtex", "compile"], digest.hexdigest(),
+				              "the citations in compile.aux or the .bib files changed"])
+		# MakeIndex reads the index entries from the .idx file
+		idx_path = join(build_dir, "compile.idx")
+		if exists(idx_path):
+			tools.append(["makeindex", ["makeindex", "compile"], self.digest(idx_path),
+			              "the index entries in compile.idx changed"])
+
+		# Only run the tools whose inputs changed (or whose output is missing)
+		outputs = {"biber": ".bbl", "bibtex": ".bbl", "makeindex": ".ind"}
+		planned = list()
+		for tool, command, digest, reason in tools:
+			if not exists(join(build_dir, "compile" + outputs[tool])):
+				planned.append([tool, command, digest, "compile{extension} is missing".format(
+					extension=outputs[tool]
+				)])
+			elif tool_inputs.get(tool) != digest:
+				planned.append([tool, command, digest, reason])
+		return planned
+
+	def run_tool(self, compiler, command, source):
+		"""
+		Runs an auxiliary tool in the build directory.
+
+		:param compiler: The Compile object of the build.
+		:param command: The tool's command line, as a list of arguments.
+		:param source: The path to the compiled .tex file (the tool looks for its inputs next to it).
+		:return: True if the tool ran successfully, False otherwise.
+		"""
+		env = dict(environ)
+		# Look for .bib and style files next to the source file first (the trailing separator keeps the defaults)
+		for variable in ["BIBINPUTS", "BSTINPUTS"]:
+			env[variable] = dirname(abspath(source)) + pathsep + env.get(variable, str())
+		try:
+			proc = compiler.spawn(command, cwd=compiler.build_dir, stdout=PIPE, stderr=PIPE, env=env)
+		except OSError:
+			# The tool isn't installed
+			return False
+		if compiler.job:
+			compiler.job.attach(proc)
+		proc.communicate()
+		return proc.returncode == 0
+
+	def build(self, compiler, source, fmt=False, pdf_path=False, output=str()):
+		"""
+		Runs the auxiliary tools and the extra compiler passes a compile needs.
+		Should be called after the compiler's first pass succeeded.
+
+		:param compiler: The Compile object of the build (its reasons attribute is filled in).
+		:param source: The path to the compiled .tex file.
+		:param fmt: The path to the precompiled format the first pass used, or False.
+		:param pdf_path: The path to the .pdf of the first pass.
+		:param output: The output of the first pass.
+		:return: An array containing the path to the compiled .pdf (or False), and the last pass' output.
+		"""
+		# What the last pass read (see the .seed() method)
+		before = compiler.inputs or self.snapshot(compiler.build_dir)
+		# The tools' hashes are only kept along with their outputs, once the whole build succeeded
+		with self.lock:
+			tool_inputs = dict(self.tool_inputs.get(abspath(source), dict()))
+		for pass_index in range(2, self.max_passes + 1):
+			# Run the tools whose inputs changed, their output is read by the next pass
+			for tool, command, digest, reason in self.plan_tools(compiler.build_dir, source, tool_inputs):
+				if compiler.job and compiler.job.cancelled:
+					return [False, output]
+				compiler.app_pointer.status_bar_instance.update_status({"Task": "Running {tool}...".format(tool=tool)})
+				if self.run_tool(compiler, command, source):
+					tool_inputs[tool] = digest
+					compiler.reasons.append("{tool}: {reason}".format(tool=tool, reason=reason))
+				else:
+					compiler.reasons.append("{tool}: failed or not installed".format(tool=tool))
+
+			# If nothing the compiler reads changed, another pass would produce the same document
+			after = self.snapshot(compiler.build_dir)
+			changed = [extension for extension in AUX_EXTENSIONS if before[extension] != after[extension]]
+			# The files of a killed pass are incomplete, so they aren't carried over
+			if compiler.job and compiler.job.cancelled:
+				return [False, output]
+			if not changed:
+				break
+			compiler.reasons.append("pass {index}: {files} changed".format(
+				index=pass_index,
+				files=", ".join(["compile" + extension for extension in changed])
+			))
+			before = after
+			compiler.app_pointer.status_bar_instance.update_status({"Task": "Rerunning..."})
+			pdf_path, output = compiler.compile(source, fmt=fmt, rerun=True)
+			if not pdf_path:
+				return [False, output]
+
+		self.remember(compiler.build_dir, source, tool_inputs, compiler.reasons)
+		return [pdf_path, output]
@@ -0,0 +1,189 @@
+"""
+The Cache file.
+Stores the CompileCache class, which remembers
+the results of previous compiles so that
+unchanged (or reverted) code is never compiled twice.
+"""
+from collections import OrderedDict
+from hashlib import sha256
+from os import remove
+from os.path import abspath, commonpath, isabs, isdir, join
+from shutil import rmtree
+from threading import Lock
+
+
+class CompileCache:
+	"""
+	The CompileCache class is a content-addressed cache
+	of compile results. Each result is keyed by a hash of
+	everything that affects it (the source code, and the
+	compiler and its flags). The other files which the compile
+	read (e.g. \\input files, images and .bib files) are hashed
+	along with the result, and a result whose files changed
+	since is never returned. The images of the resulting
+	pages are cached separately, by their quality (see the PageCache class).
+	Once the cache is full, the least recently used
+	result is evicted and its files are deleted.
+	"""
+
+	def __init__(self, size=32):
+		self.size = size
+		self.entries = OrderedDict()
+		self.hits = int()
+		self.misses = int()
+		self.lock = Lock()
+
+	@staticmethod
+	def key(source, command):
+		"""
+		Hashes all the inputs of a compile.
+
+		:param source: The LaTeX code (as bytes).
+		:param command: The compiler's command line, as a list of arguments.
+		:return: The hex digest identifying the compile.
+		"""
+		digest = sha256(source)
+		digest.update("\0{command}".format(
+			command=" ".join(command)
+		).encode("utf-8"))
+		return digest.hexdigest()
+
+	@staticmethod
+	def read_inputs(fls_path, source_dir):
+		"""
+		Lists the files which a compile read, from the compiler's -recorder file.
+		Only the files in the source file's directory (and the ones below it) are listed,
+		the TeX distribution's files and the build directory's files are left out.
+
+		:param fls_path: The path to the .fls file written by the compiler.
+		:param source_dir: The directory of the compiled document.
+		:return: A sorted list of the full paths to the files (empty if the .fls file can't be read).
+		"""
+		try:
+			file = open(fls_path, "r", encoding="utf-8", errors="replace")
+			lines = file.read().splitlines()
+			file.close()
+		except OSError:
+			return list()
+		source_dir = abspath(source_dir)
+		working_dir = source_dir
+		inputs = set()
+		for line in lines:
+			# Relative paths are relative to the compiler's working directory, which comes first
+			if line.startswith("PWD "):
+				working_dir = line[4:]
+			elif line.startswith("INPUT "):
+				path = abspath(line[6:] if isabs(line[6:]) else join(working_dir, line[6:]))
+				try:
+					if commonpath([path, source_dir]) == source_dir:
+						inputs.add(path)
+				except ValueError:
+					# The file is on another drive
+					pass
+		return sorted(inputs)
+
+	@staticmethod
+	def hash_inputs(paths):
+		"""
+		Hashes the files which a compile read.
+
+		:param paths: The paths to the files (see the .read_inputs() method).
+		:return: A dictionary of the paths to the hex digests of their contents (empty for missing files).
+		"""
+		digests = dict()
+		for path in paths:
+			try:
+				file = open(path, "rb")
+				digests[path] = sha256(file.read()).hexdigest()
+				file.close()
+			except OSError:
+				digests[path] = str()
+		return digests
+
+	@staticmethod
+	def changed(inputs):
+		"""
+		Checks whether any of the files which a compile read changed since.
+
+		:param inputs: The hashes of the files, when the compile read them (see the .hash_inputs() method).
+		:return: True if any of the files changed (or was removed), False otherwise.
+		"""
+		return bool(inputs) and CompileCache.hash_inputs(list(inputs)) != inputs
+
+	def get(self, key):
+		"""
+		Looks up a compile result, and marks it as recently used.
+		A result whose input files changed is evicted instead (see the .changed() method).
+
+		:param key: The hash of the compile (see the .key() method).
+		:return: The stored result, or False if the compile isn't cached.
+		"""
+		with self.lock:
+			result = self.entries.get(key, False)
+		# The files are hashed outside of the lock
+		if result and self.changed(result.get("inputs")):
+			with self.lock:
+				if self.entries.get(key) is result:
+					del self.entries[key]
+			self.discard(result)
+			result = False
+		with self.lock:
+			if result and key in self.entries:
+				self.hits += 1
+				self.entries.move_to_end(key)
+				return result
+			self.misses += 1
+			return False
+
+	def put(self, key, result):
+		"""
+		Stores a compile result, evicting the least recently used results if the cache is full.
+
+		:param key: The hash of the compile (see the .key() method).
+		:param result: A dictionary describing the result. Its "files" item lists
+		the paths (files or directories) to delete once the result is evicted.
+		"""
+		with self.lock:
+			self.entries[key] = result
+			self.entries.move_to_end(key)
+			evicted = list()
+			while len(self.entries) > self.size:
+				evicted.append(self.entries.popitem(last=False)[1])
+		# Delete the files outside of the lock
+		for old_result in evicted:
+			self.discard(old_result)
+
+	@staticmethod
+	def discard(result):
+		"""
+		Deletes the files of a compile result.
+
+		:param result: The evicted result.
+		"""
+		for file in result.get("files", list()):
+			try:
+				if isdir(file):
+					rmtree(file)
+				else:
+					remove(file)
+			except OSError:
+				pass
+
+	def clear(self):
+		"""
+		Evicts all the results in the cache.
+		"""
+		with self.lock:
+			evicted = list(self.entries.values())
+			self.entries.clear()
+		for old_result in evicted:
+			self.discard(old_result)
+
+	def ratio(self):
+		"""
+		Returns the ratio of lookups which were found in the cache.
+
+		:return: A float between 0 and 1 (0 if there were no lookups).
+		"""
+		total = self.hits + self.misses
+		return self.hits / total if total else float()
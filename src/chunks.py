@@ -0,0 +1,232 @@
+"""
+The Chunks file.
+Stores the ChunkBuilder class, which compiles a long
+document in chunks (a chapter or a section each), in
+parallel, and merges the chunks' .pdf files into one.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from os import cpu_count
+from os.path import abspath, dirname, exists, join
+from shutil import which, rmtree
+from subprocess import PIPE
+
+from cache import CompileCache
+from compile import Compile
+from project import COUNTER_RECORDER, SECTION_LEVELS, Project
+
+try:
+	# noinspection PyUnresolvedReferences
+	from pypdf import PdfReader, PdfWriter
+except ImportError:
+	PdfWriter = False
+
+
+class ChunkBuilder:
+	"""
+	The ChunkBuilder class compiles the chunks of a document
+	at the same time (each chunk is a compiler process of its own).
+	The chunks share the .aux state of the previous build, so that
+	references and counters (including page numbers) carry across
+	chunks, much like LaTeX's \\includeonly. Chunks are cached by
+	their code, so editing a single chapter recompiles only it.
+	A chunk which started from other counters than the ones the
+	chunk before it ended with (e.g. the first build, or after a
+	chapter grew a page) is compiled again before merging.
+	"""
+
+	def __init__(self, lines, workers=0, size=64):
+		"""
+		:param lines: The amount of lines from which a document is compiled in chunks (0 to never compile in chunks).
+		:param workers: The amount of chunks to compile at the same time (0 for one per core).
+		:param size: The amount of compiled chunks to remember.
+		"""
+		self.lines = lines
+		self.workers = workers or cpu_count() or 1
+		self.cache = CompileCache(size)
+		# The merged .aux files of the previous build's chunks
+		self.aux = str()
+		# The counters at the start of each chunk, as recorded in the previous build
+		self.counters = dict()
+
+	def build(self, compiler, path, fmt=False):
+		"""
+		Compiles a document in chunks, and merges them.
+
+		:param compiler: The Compile object of the build (the merged .pdf is put in its build directory).
+		:param path: The path to the .tex file to compile.
+		:param fmt: The path to the precompiled format of the file's preamble, or False.
+		:return: An array containing the path to the merged .pdf (or False) and the chunks'
+		output, or False if the document is too short or has less than two chunks.
+		"""
+		file = open(path, "r", encoding="utf-8")
+		text = file.read()
+		file.close()
+		if not self.lines or text.count("\n") < self.lines:
+			return False
+		project = Project(path)
+		ranges = project.chunks(text)
+		if len(ranges) < 2:
+			return False
+
+		# The first build has no .aux state of its own, so start from the last whole build's
+		planner = getattr(compiler.app_pointer, "build_planner", False)
+		aux = self.aux or (planner and planner.carried_file(path, ".aux").decode("utf-8", errors="replace"))
+
+		# The counters each chunk starts from, as recorded by the chunk before it in the previous build
+		counters = [self.counters.get(index, False) for index in range(len(ranges))]
+		results = [None] * len(ranges)
+		source_dir = Compile.make_build_dir()
+		stale = list(range(len(ranges)))
+		# Each round settles at least one more chunk, so there are at most as many rounds as chunks
+		for _ in range(len(ranges)):
+			# Write the chunks, with line numbers and counters as in the whole document
+			chunks = list()
+			for index in stale:
+				start, end = ranges[index]
+				code = project.extract(start, end, text, counters=counters[index], trailer=COUNTER_RECORDER)
+				chunks.append([index, join(source_dir, "chunk{index}.tex".format(index=index)), code])
+
+			# Compile them all at the same time
+			compiler.app_pointer.status_bar_instance.update_status({"Task": "Compiling {count} chunks...".format(
+				count=len(chunks)
+			)})
+			with ThreadPoolExecutor(max_workers=self.workers) as executor:
+				for index, result in zip(stale, executor.map(
+					lambda chunk: self.build_chunk(compiler, chunk[1], chunk[2], path, fmt, aux),
+					chunks
+				)):
+					results[index] = result
+			output = "\n".join([result["errors"] for result in results if result["errors"]])
+			if not all(result["pdf"] for result in results) or (compiler.job and compiler.job.cancelled):
+				rmtree(source_dir, ignore_errors=True)
+				return [False, output]
+
+			# Compile the chunks again which didn't start where the chunk before them ended
+			stale = list()
+			for index in range(1, len(ranges)):
+				recorded = Project.read_counters(results[index - 1]["aux"])
+				if self.numbering(recorded) != self.numbering(counters[index] or dict()):
+					counters[index] = recorded
+					stale.append(index)
+			if not stale:
+				break
+		rmtree(source_dir, ignore_errors=True)
+
+		# Share the chunks' references and counters with the next build
+		self.aux = "\n".join([result["aux"] for result in results])
+		for index, counter in enumerate(counters):
+			self.counters[index] = counter
+
+		# Merge the chunks' .pdf files
+		compiler.app_pointer.status_bar_instance.update_status({"Task": "Merging..."})
+		compiler.build_dir = Compile.make_build_dir()
+		pdf_path = join(compiler.build_dir, "compile.pdf")
+		if not self.merge([result["pdf"] for result in results], pdf_path):
+			return [False, output]
+		# The merged build read whatever the chunks read
+		file = open(join(compiler.build_dir, "compile.fls"), "w", encoding="utf-8")
+		file.write("\n".join([result["fls"] for result in results]))
+		file.close()
+		return [pdf_path, output]
+
+	def build_chunk(self, compiler, chunk_path, code, path, fmt, aux):
+		"""
+		Compiles a single chunk, unless the same code was compiled before.
+
+		:param compiler: The Compile object of the whole build.
+		:param chunk_path: The path to write the chunk's code to.
+		:param code: The chunk's code.
+		:param path: The path to the document's .tex file (the chunk's errors are reported as its errors).
+		:param fmt: The path to the precompiled format of the preamble, or False.
+		:param aux: The .aux state to compile the chunk with.
+		:return: A dictionary with the chunk's .pdf path (or False), errors, .aux file and .fls file.
+		"""
+		# The labels and citations the chunk refers to are part of its inputs, so that it's compiled
+		# again once they're renumbered (even if the chunk's own code didn't change)
+		key = self.cache.key(
+			(code + "\0" + Project.used_labels(code, aux)).encode("utf-8"),
+			Compile.command(fmt)
+		)
+		result = self.cache.get(key)
+		if result:
+			return result
+		file = open(chunk_path, "w", encoding="utf-8")
+		file.write(code)
+		file.close()
+
+		# The chunks are line-for-line copies of the document, so their errors point to the document's lines
+		c = Compile(compiler.app_pointer, compiler.job)
+		pdf_path, output = c.compile(chunk_path, fmt=fmt, before=lambda build_dir: self.seed(build_dir, aux))
+		output = (output or str()).replace(chunk_path + ":", path + ":")
+		if not pdf_path:
+			c.clean()
+			return {"pdf": False, "errors": output, "aux": str(), "fls": str()}
+		file = open(join(c.build_dir, "compile.aux"), "r", encoding="utf-8", errors="replace")
+		result = {"pdf": pdf_path, "errors": output, "aux": file.read(), "files": [c.build_dir]}
+		file.close()
+		# Remember the files the chunk read (other than its own code), so that it's compiled again once they change
+		fls_path = join(c.build_dir, "compile.fls")
+		if exists(fls_path):
+			file = open(fls_path, "r", encoding="utf-8", errors="replace")
+			result["fls"] = file.read()
+			file.close()
+		else:
+			result["fls"] = str()
+		result["inputs"] = CompileCache.hash_inputs(CompileCache.read_inputs(fls_path, dirname(abspath(path))))
+		self.cache.put(key, result)
+		return result
+
+	@staticmethod
+	def numbering(counters):
+		"""
+		Leaves out the section counters of recorded counters (an extract
+		counts its sections itself, see the Project.extract() method).
+
+		:param counters: A dictionary of counters' names to their values.
+		:return: A dictionary of the rest of the counters.
+		"""
+		return {name: value for name, value in counters.items() if name not in SECTION_LEVELS}
+
+	@staticmethod
+	def seed(build_dir, aux):
+		"""
+		Writes the shared .aux state into a chunk's build directory.
+
+		:param build_dir: The path to the build directory.
+		:param aux: The contents of the .aux file.
+		"""
+		if aux:
+			file = open(join(build_dir, "compile.aux"), "w", encoding="utf-8")
+			file.write(aux)
+			file.close()
+
+	@staticmethod
+	def merge(pdf_paths, output_path):
+		"""
+		Merges .pdf files into one, with Poppler's pdfunite (or pypdf, if pdfunite isn't installed).
+
+		:param pdf_paths: The paths to the .pdf files, in order.
+		:param output_path: The path to write the merged .pdf file to.
+		:return: True if the files were merged, False otherwise.
+		"""
+		if which("pdfunite"):
+			proc = Compile.spawn(["pdfunite"] + pdf_paths + [output_path], stdout=PIPE, stderr=PIPE)
+			proc.communicate()
+			return proc.returncode == 0
+		if PdfWriter:
+			writer = PdfWriter()
+			for pdf_path in pdf_paths:
+				for page in PdfReader(pdf_path).pages:
+					writer.add_page(page)
+			with open(output_path, "wb") as file:
+				writer.write(file)
+			return True
+		return False
+
+	def clear(self):
+		"""
+		Forgets the compiled chunks (deleting their files) and the shared state.
+		"""
+		self.cache.clear()
+		self.aux = str()
+		self.counters = dict()
@@ -0,0 +1,232 @@
+"""
+The CLI file.
+Stores the Headless class, which stands in for the app
+when compiling without a GUI, and the functions behind
+the command line, which compile many .tex files at the
+same time (e.g. main.py build ../tests/*.tex --jobs 4).
+"""
+from argparse import ArgumentParser
+from concurrent.futures import ProcessPoolExecutor
+from json import dumps, load as load_json
+from os import cpu_count, makedirs
+from os.path import abspath, basename, dirname, exists, join, splitext
+from shutil import copyfile
+from time import time
+
+from yaml import load, SafeLoader
+
+from build import BuildPlanner
+from cache import CompileCache
+from chunks import ChunkBuilder
+from compile import compile_to_pdf, compile_to_image, Compile
+from diagnostics import Diagnostic
+from raster import RasterPool
+
+# The settings files, relative to this file (the command line may be run from any directory)
+SETTINGS_PATHS = [
+	join(dirname(abspath(__file__)), "..", "resources", "settings.yaml"),
+	join(dirname(abspath(__file__)), "..", "defaults", "settings.yaml")
+]
+
+
+class HeadlessStatus:
+	"""
+	The HeadlessStatus class stands in for the status bar.
+	It only remembers the latest value of each status.
+	"""
+
+	def __init__(self):
+		self.statuses = dict()
+
+	def update_status(self, statuses):
+		"""
+		Remembers the statuses, instead of displaying them.
+
+		:param statuses: A dictionary of status names to their new values.
+		"""
+		self.statuses.update(statuses)
+
+
+class Headless:
+	"""
+	The Headless class stands in for the app (as the app_pointer)
+	when compiling without a GUI. It holds the settings and the
+	caches the compiler looks for, but no window and no QApplication.
+	"""
+
+	def __init__(self, settings):
+		"""
+		:param settings: The settings dictionary (see the load_settings function).
+		"""
+		self.settings = settings
+		self.status_bar_instance = HeadlessStatus()
+		self.compile_cache = CompileCache(settings["compile_cache_size"])
+		self.build_planner = BuildPlanner(settings["build_passes"])
+		# Files are already compiled at the same time, so each one compiles its chunks one after another
+		self.chunk_builder = ChunkBuilder(settings["build_chunks"], 1)
+		# The pages of each file are converted across the cores
+		self.raster_pool = RasterPool(settings["raster_workers"])
+
+	def close(self):
+		"""
+		Deletes the build directories of the compiles, and stops the raster pool's workers.
+		"""
+		self.compile_cache.clear()
+		self.chunk_builder.clear()
+		self.raster_pool.close()
+
+
+def load_settings():
+	"""
+	Reads the settings, or the default settings if the app was never started.
+
+	:return: The settings dictionary.
+	"""
+	for path in SETTINGS_PATHS:
+		if exists(path):
+			file = open(path, "r", encoding="utf-8")
+			settings = load(file.read(), Loader=SafeLoader)
+			file.close()
+			return settings
+	return dict()
+
+
+def build_file(path, output_dir, settings, quality=False):
+	"""
+	Compiles a single .tex file, and copies the results to the output directory.
+	Runs in a worker process of the build command.
+
+	The results are skipped if the file's code (and the compiler's command line), and
+	the other files it read (see the CompileCache.read_inputs() method) didn't change
+	since the last build into the output directory. A report of each
+	build is kept next to its results (named after the file, with a .json extension).
+
+	:param path: The full path to the .tex file.
+	:param output_dir: The full path to the directory to put the .pdf (and images) in.
+	:param settings: The settings dictionary.
+	:param quality: The DPI to convert the pages to .jpg files at, or False to only compile the .pdf.
+	:return: The report of the build, as a dictionary.
+	"""
+	start_time = time()
+	name = splitext(basename(path))[0]
+	report_path = join(output_dir, name + ".json")
+
+	# Hash everything that affects the results
+	file = open(path, "rb")
+	key = CompileCache.key(file.read(), Compile.command() + ["-quality={quality}".format(quality=quality)])
+	file.close()
+
+	# If the results of the very same code are already there, then there's no need to start the compiler
+	if exists(report_path):
+		file = open(report_path, "r", encoding="utf-8")
+		report = load_json(file)
+		file.close()
+		if report.get("key") == key and not CompileCache.changed(report.get("inputs")) and \
+			all(exists(result) for result in [report["pdf"]] + report["images"] if result):
+			report.update({"cached": True, "seconds": round(time() - start_time, 3)})
+			return report
+
+	app = Headless(settings)
+	try:
+		# Compile the file (the compiler is given the full path, so its errors point to it)
+		if quality:
+			split_path, error_msg = compile_to_image(app, path, quality)
+			pdf_path = split_path and split_path + ".pdf"
+		else:
+			pdf_path, error_msg = compile_to_pdf(app, path, chunked=True)
+
+		# Copy the results to the output directory
+		report = {"file": path, "key": key, "inputs": dict(), "pdf": False, "images": list(), "pages": int(),
+		          "cached": False}
+		if pdf_path:
+			# The files the compiler read, next to the .pdf in its build directory
+			report["inputs"] = CompileCache.hash_inputs(CompileCache.read_inputs(
+				join(dirname(pdf_path), "compile.fls"),
+				dirname(path)
+			))
+			report["pdf"] = join(output_dir, name + ".pdf")
+			copyfile(pdf_path, report["pdf"])
+			report["pages"] = Compile.page_count(pdf_path)
+			if quality:
+				for page_index in range(1, report["pages"] + 1):
+					image_path = join(output_dir, "{name}-{index}.jpg".format(name=name, index=page_index))
+					copyfile("{path}{index}.jpg".format(path=split_path, index=page_index), image_path)
+					report["images"].append(image_path)
+		report["errors"] = [
+			diagnostic.to_dict() for diagnostic in Diagnostic.parse_output(error_msg or str()) if diagnostic.file == path
+		]
+		report["passes"] = app.status_bar_instance.statuses.get("Passes", 1)
+	finally:
+		app.close()
+
+	# Keep the report, so that the next build can skip the file if it didn't change
+	file = open(report_path, "w", encoding="utf-8")
+	file.write(dumps(report, indent=1))
+	file.close()
+	report["seconds"] = round(time() - start_time, 3)
+	return report
+
+
+def build(paths, output_dir, jobs=0, quality=False):
+	"""
+	Compiles many .tex files at the same time, each one in a worker process.
+
+	:param paths: The paths to the .tex files.
+	:param output_dir: The path to the directory to put the results in.
+	:param jobs: The amount of files to compile at the same time (0 for one per core).
+	:param quality: The DPI to convert the pages to .jpg files at, or False to only compile the .pdf files.
+	:return: A generator of the builds' reports, in the order of the files.
+	"""
+	settings = load_settings()
+	output_dir = abspath(output_dir)
+	makedirs(output_dir, exist_ok=True)
+	paths = [abspath(path) for path in paths]
+	with ProcessPoolExecutor(max_workers=min(jobs or cpu_count() or 1, max(1, len(paths)))) as executor:
+		futures = [executor.submit(build_file, path, output_dir, settings, quality) for path in paths]
+		for path, future in zip(paths, futures):
+			try:
+				yield future.result()
+			except Exception as e:
+				# A file which crashed its worker is reported as a failed build
+				yield {"file": path, "pdf": False, "images": list(), "pages": int(), "cached": False,
+				       "errors": [{"line": int(), "message": repr(e)}]}
+
+
+def main(args):
+	"""
+	Runs the build command.
+
+	:param args: The command line arguments (without the program's name and "build").
+	:return: The exit code (0 if all the files were compiled, 1 otherwise).
+	"""
+	parser = ArgumentParser(prog="main.py build", description="Compile .tex files without the GUI.")
+	parser.add_argument("files", nargs="+", help="the .tex files to compile")
+	parser.add_argument("-j", "--jobs", type=int, default=0,
+	                    help="the amount of files to compile at the same time (default: one per core)")
+	parser.add_argument("-o", "--output", default="build", help="the directory to put the results in")
+	parser.add_argument("-q", "--quality", type=int, default=0,
+	                    help="also convert the pages to .jpg files at this DPI")
+	parser.add_argument("--json", action="store_true", help="print the reports as JSON lines")
+	options = parser.parse_args(args)
+
+	exit_code = 0
+	try:
+		for report in build(options.files, options.output, options.jobs, options.quality or False):
+			if not report["pdf"]:
+				exit_code = 1
+			if options.json:
+				print(dumps(report), flush=True)
+				continue
+			print("{file}: {result}".format(
+				file=report["file"],
+				result="{pages} pages{cached}".format(
+					pages=report["pages"],
+					cached=" (unchanged)" if report["cached"] else str()
+				) if report["pdf"] else "failed"
+			), flush=True)
+			for error in report["errors"]:
+				print("  {line}: {message}".format(line=error["line"], message=error["message"]))
+	finally:
+		# Clean the build directories of the compiles
+		Compile.clean_all()
+	return exit_code
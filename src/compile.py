@@ -4,36 +4,145 @@ Stores objects (including classes
 and functions) for compiling LaTeX
 code into .pdf files and into image files.
 """
-from os import remove
-from os.path import splitext, exists
-from shutil import copyfile
+from collections import OrderedDict
+from os import remove, makedirs, access, getpid, stat, W_OK, name as os_name
+from os.path import abspath, dirname, splitext, exists, isdir, join
+from shutil import rmtree
 from subprocess import Popen, PIPE
+from tempfile import gettempdir, mkdtemp
+from threading import Lock
+from time import time
 
-from pdf2image import convert_from_path
+from pdf2image import pdfinfo_from_path
 from pdf2image.exceptions import PDFPageCountError
-from psutil import process_iter
 
-from utility import Utility
+from cache import CompileCache
+from diagnostics import OutputReader
+from pages import fingerprint_pages, read_page_info
+from raster import select_rasterizer, RasterPool
+from metrics import observe, count
+from tracing import span
 
+if os_name == "nt":
+	from subprocess import CREATE_NEW_PROCESS_GROUP
 
-def compile_to_image(app_pointer, path, quality):
+	try:
+		# noinspection PyUnresolvedReferences
+		from win32job import CreateJobObject, AssignProcessToJobObject, TerminateJobObject
+	except ImportError:
+		CreateJobObject = False
+else:
+	from os import killpg
+	from signal import SIGKILL
+
+
+def compile_to_pdf(app_pointer, path, fmt=False, job=False, partial=False, chunked=False):
+	"""
+	Function to shorten the process of compiling the current.tex file to a .pdf file.
+
+	If a precompiled preamble format is passed (fmt), the
+	compiler loads it instead of parsing the preamble again.
+	If the app has a compile cache, code which was already
+	compiled is not compiled again, unless a file it read changed
+	(the cache owns the build directory of the result, and deletes it once it's evicted).
+	If a CompileJob is passed (job), the compile can be cancelled by it.
+	If the app has a build planner, the tools and extra passes the document
+	needs are run as well, unless the file is only an excerpt of the document (partial, the
+	path to the whole document, whose last build's files the excerpt starts from).
+	If the app has a chunk builder, a long document can be compiled in chunks, which
+	are compiled at the same time and merged (chunked). The merged .pdf has no SyncTeX data.
+
+	Returns an array containing the path to the compiled .pdf
+	file (or False), and any of the STDOUT messages (usually
+	errors) from the compiler.
+	"""
+	# Look up the code in the compile cache
+	cache = getattr(app_pointer, "compile_cache", False)
+	if cache:
+		app_pointer.status_bar_instance.update_status({"Task": "Hashing..."})
+		with span(app_pointer, "cache lookup"):
+			file = open(path, "rb")
+			# A merged chunked build has no SyncTeX data, so it's never handed out for a normal build (or vice versa)
+			key = cache.key(file.read(), Compile.command() + (["-chunked"] if chunked else list()))
+			file.close()
+			result = cache.get(key)
+		count(app_pointer, "compile_cache", hits=int(bool(result)), misses=int(not result))
+		# If it was compiled before, then there's no need to start the compiler
+		if result:
+			return [result["pdf"], result["errors"]]
+	# Create an instance of the compiler
+	app_pointer.status_bar_instance.update_status({"Task": "Compiling..."})
+	c = Compile(app_pointer, job)
+	# Compile a long document in chunks, if it's worth it
+	builder = getattr(app_pointer, "chunk_builder", False)
+	with span(app_pointer, "chunks", chunked=bool(chunked and builder)):
+		result = chunked and builder and builder.build(c, path, fmt=fmt)
+	planner = getattr(app_pointer, "build_planner", False)
+	if result:
+		file_path, error_msg = result
+	# Compile to a .pdf
+	# Live (scheduled) compiles stop at the first fatal error, so that it's highlighted right away
+	else:
+		file_path, error_msg = c.compile(
+			path,
+			fmt=fmt,
+			abort=bool(job),
+			before=(lambda build_dir: planner.seed(c, build_dir, partial or path)) if planner else False
+		)
+	# Run the tools and extra passes which the document needs (references, citations, indexes)
+	if file_path and planner and not partial and not result and not (job and job.cancelled):
+		with span(app_pointer, "extra passes"):
+			file_path, error_msg = planner.build(c, path, fmt=fmt, pdf_path=file_path, output=error_msg)
+		app_pointer.status_bar_instance.update_status({
+			"Passes": 1 + len([reason for reason in c.reasons if reason.startswith("pass")])
+		})
+	# If the job was cancelled, then the result is outdated
+	if job and job.cancelled:
+		c.clean()
+		return [False, False]
+	# If the file was compiled successfully...
+	if file_path:
+		# Remember the result (its build directory is deleted once it's evicted), along with the files it read
+		if cache:
+			cache.put(key, {
+				"pdf": file_path,
+				"errors": error_msg,
+				"reasons": c.reasons,
+				"inputs": CompileCache.hash_inputs(CompileCache.read_inputs(
+					join(dirname(file_path), "compile.fls"),
+					dirname(abspath(partial or path))
+				)),
+				"files": [c.build_dir]
+			})
+		return [file_path, error_msg]
+	else:
+		c.clean()
+		return [False, error_msg]
+
+
+def compile_to_image(app_pointer, path, quality, fmt=False, job=False, page=False):
 	"""
 	Function to shorten the process of converting the current.tex file to an image.
+	The images are written to the disk (for live previews, use the .render_page() method instead).
+
+	If a page number is passed (page), only that page is converted,
+	the rest can be converted on demand with the .image_page() method.
+	The rest of the parameters are passed on to compile_to_pdf.
 
 	Returns an array containing the constant path to the
 	images (more info in the .image() method), and any of
 	the STDOUT messages (usually errors) from the compiler.
 	"""
-	# Create an instance of the compiler
-	app_pointer.status_bar_instance.update_status({"Task": "Compiling..."})
-	c = Compile(app_pointer)
 	# Compile to a .pdf
-	file_path, error_msg = c.compile(path)
+	file_path, error_msg = compile_to_pdf(app_pointer, path, fmt=fmt, job=job)
 	# If the file was compiled successfully...
 	if file_path:
 		# Convert the .pdf to a picture
 		app_pointer.status_bar_instance.update_status({"Task": "Converting..."})
-		split_path = c.image(file_path, quality=quality)
+		if page:
+			split_path = Compile.image_page(file_path, page, quality, app_pointer) and splitext(file_path)[0]
+		else:
+			split_path = Compile(app_pointer).image(file_path, quality=quality)
 		# If the image was created...
 		if split_path:
 			return [split_path, error_msg]
@@ -51,49 +160,113 @@ class Compile:
 	converting LaTeX code to PDF files
 	and PDF files to image files.
 	"""
-	def __init__(self, app_pointer):
+	# The directory which holds the build directories of this session
+	build_root = join(
+		"/dev/shm" if isdir("/dev/shm") and access("/dev/shm", W_OK) else gettempdir(),
+		"abuela-{pid}".format(pid=getpid())
+	)
+	# The command which starts the compiler (e.g. replaced by a stand-in for benchmarks)
+	engine = ["xelatex"]
+	# The amount of pages and the page size of the most recently read .pdf files (see the .page_info() method)
+	page_infos = OrderedDict()
+	page_infos_size = 64
+	page_infos_lock = Lock()
+	# The DPI each page image was last written at, by its path (see the .image() method)
+	image_qualities = dict()
+
+	def __init__(self, app_pointer, job=False):
 		self.app_pointer = app_pointer
+		self.job = job
+		self.build_dir = False
+		self.pages = int()
+		self.rendered = int()
+		self.reused = int()
+		# The reasons for the extra steps of the build, and the hashes of what the first pass read
+		self.reasons = list()
+		self.inputs = False
 
-	def compile(self, file_path):
+	@classmethod
+	def command(cls, fmt=False, build_dir=False):
 		"""
-		This method takes the current.tex file (Currently open project) and
-		compiles it to a .pdf file, which is then put in
+		Builds the command line which executes the compiler.
 
-		Returns an array containing the path to the compiled .pdf, and a
-		string containing any error messages from compilation.
+		:param fmt: The path to a precompiled format of the preamble, or False.
+		:param build_dir: The directory to write the output files to, or False for the current directory.
+		:return: A list of the command's arguments, not including the file to compile.
 		"""
-		# Make sure pdflatex isn't in use at the moment or accessing files
-		self.app_pointer.status_bar_instance.update_status({"Task": "Killing processes..."})
-		self.kill()
-		# Execute pdflatex with subprocess library
-		self.app_pointer.status_bar_instance.update_status({"Task": "Multiprocessing..."})
-		proc = Popen([
-			'xelatex',
+		command = cls.engine + [
 			'-quiet',
 			'-enable-installer',
 			'-c-style-errors',
-			'-job-name=compile',
-			file_path
-		], stdout=PIPE)
-		# Wait until execution is over, then copy all STDOUT text to an array
+			'-synctex=1',
+			'-recorder',
+			'-job-name=compile'
+		]
+		# Load the dumped preamble, the compiler will skip ahead to \begin{document}
+		if fmt:
+			command.append('-fmt={fmt}'.format(fmt=fmt))
+		if build_dir:
+			command.append('-output-directory={dir}'.format(dir=build_dir))
+		return command
+
+	@classmethod
+	def make_build_dir(cls):
+		"""
+		Creates a private build directory for a single compile, so that
+		compiles never share (or race on) their output files.
+		The directories are kept on a RAM-backed file system when there is one.
+
+		:return: The path to the new directory.
+		"""
+		makedirs(cls.build_root, exist_ok=True)
+		return mkdtemp(prefix="job", dir=cls.build_root)
+
+	def compile(self, file_path, fmt=False, abort=False, before=False, rerun=False):
+		"""
+		This method takes the current.tex file (Currently open project) and
+		compiles it to a .pdf file, which is then put in its build directory.
+		The compiler's output is parsed while it runs (see the OutputReader class).
+
+		:param file_path: The path to the .tex file to compile.
+		:param fmt: The path to a precompiled format of the file's preamble (see the FormatCache
+		class), or False to compile the preamble as well.
+		:param abort: Whether to kill the compiler on the first fatal error (no .pdf is returned then).
+		:param before: A function to call with the build directory before the compiler reads
+		any files (e.g. to copy the previous build's .aux file into it), or False.
+		:param rerun: Whether to run another pass in the build directory of the previous pass.
+
+		Returns an array containing the path to the compiled .pdf, and a
+		string containing any error messages from compilation.
+		"""
+		# Try handing the file to a compiler that already loaded the preamble
+		proc = False
+		with span(self.app_pointer, "start engine", standby=bool(fmt and not rerun)):
+			if fmt and not rerun and getattr(self.app_pointer, "engine_pool", False):
+				self.app_pointer.status_bar_instance.update_status({"Task": "Waking standby..."})
+				proc, self.build_dir = self.app_pointer.engine_pool.start(fmt, file_path, before)
+			# Otherwise, execute the compiler with subprocess library
+			if not proc:
+				self.app_pointer.status_bar_instance.update_status({"Task": "Multiprocessing..."})
+				if not rerun:
+					self.build_dir = self.make_build_dir()
+					if before:
+						before(self.build_dir)
+				proc = self.spawn(self.command(fmt, self.build_dir) + [file_path], stdout=PIPE)
+		# Let the job kill the compiler if it's cancelled
+		if self.job:
+			self.job.attach(proc)
+		# Read and parse STDOUT (printed data) while the compiler runs, until execution is over
 		self.app_pointer.status_bar_instance.update_status({"Task": "Compiling..."})
-		proc.wait()
-		# Read STDOUT (printed data)
-		self.app_pointer.status_bar_instance.update_status({"Task": "Parsing..."})
-		stdout_data = "".join([i.decode() for i in proc.stdout.readlines()])
-		# Create instance of Utility class so we can move the compiled pdf to our folder
-		utils = Utility(False)
-		file_name = utils.get_file_id("pdf", "../compile/")
-		# Try to move the file
-		try:
-			self.app_pointer.status_bar_instance.update_status({"Task": "Copying..."})
-			copyfile("compile.pdf", file_name)
-		except FileNotFoundError:
-			# If the move failed, then return False.
+		engine_start = time()
+		with span(self.app_pointer, "engine", rerun=rerun):
+			reader = OutputReader(proc, on_fatal=(lambda: self.kill(proc)) if abort else False)
+			stdout_data = reader.wait()
+		observe(self.app_pointer, "engine", time() - engine_start)
+		# If the compiler was aborted, then its output is useless
+		if reader.aborted:
 			return [False, stdout_data]
-		# Read the STDOUT lines from execution
-		# Decode each one (current type is bytes, convert it to string)
-		# Merge all the lines into one string
+		# The compiled pdf is handed over by its path in the build directory (no copying)
+		file_name = join(self.build_dir, "compile.pdf")
 		# Return the file path if the file exists, otherwise return False
 		if exists(file_name):
 			return [file_name, stdout_data]
@@ -120,78 +293,335 @@ class Compile:
 
 	def clean(self):
 		"""
-		Deletes the temporary files generated by the pdflatex compiler
+		Deletes the build directory of the compile, along with
+		all the files generated by the compiler and the images.
 		"""
 		if self.app_pointer:
 			self.app_pointer.status_bar_instance.update_status({"Task": "Cleaning..."})
-		self.safe_remove("compile.pdf")
-		self.safe_remove("compile.aux")
-		self.safe_remove("compile.log")
+		if self.build_dir:
+			rmtree(self.build_dir, ignore_errors=True)
+			self.build_dir = False
+
+	@classmethod
+	def clean_all(cls):
+		"""
+		Deletes the build directories of all of the session's compiles.
+		Should be called on termination.
+		"""
+		rmtree(cls.build_root, ignore_errors=True)
+
+	@staticmethod
+	def spawn(command, **kwargs):
+		"""
+		Starts a compiler process in a process group of its own (a job object on Windows),
+		so that it can be killed along with its children without touching any other process.
+
+		:param command: The command line to execute, as a list of arguments.
+		:param kwargs: Any other arguments for Popen (e.g. stdout).
+		:return: The Popen object of the process.
+		"""
+		if os_name == "nt":
+			proc = Popen(command, creationflags=CREATE_NEW_PROCESS_GROUP, **kwargs)
+			if CreateJobObject:
+				# Processes spawned by the compiler (e.g. the package installer) join the job as well
+				proc.job_object = CreateJobObject(None, "")
+				AssignProcessToJobObject(proc.job_object, int(proc._handle))
+		else:
+			proc = Popen(command, start_new_session=True, **kwargs)
+		return proc
 
 	@staticmethod
-	def kill():
+	def kill(proc):
 		"""
-		Kills the pdflatex process, if it is currently being used.
-		This method is meant to save RAM and assure that the compile.pdf data location is writable to.
-		This method doesn't use the best algorithm, but it's one which can work on multiple operating systems.
+		Kills a process started by the .spawn() method, along with all of its children.
+		Only the process' own group is signalled, so other compilers (e.g. of other
+		users or other ABUELA instances) are never touched.
+
+		:param proc: The Popen object of the process.
 		"""
-		for proc in process_iter():
-			# check whether the process name matches
-			if "pdflatex" in proc.name():
+		# If the process was already waited for, its ID might belong to another process by now
+		if proc.returncode is not None:
+			return
+		try:
+			if getattr(proc, "job_object", False):
+				TerminateJobObject(proc.job_object, 1)
+			elif os_name == "nt":
 				proc.kill()
+			else:
+				killpg(proc.pid, SIGKILL)
+		except Exception:
+			# The process (or group) has already exited
+			pass
+
+	@classmethod
+	def page_info(cls, path):
+		"""
+		Reads the amount of pages in a .pdf file and the size of its pages (without converting any of them).
+		Each .pdf file is only read once (with pypdf, or with Poppler's pdfinfo if it isn't installed),
+		so that looking up a cached compile's pages starts no process at all.
+
+		:param path: The full path to the .pdf file.
+		:return: An array containing the amount of pages (0 if the file can't be read),
+		and the width and height of the page in inches (False if the file can't be read).
+		"""
+		# A file which was written again (e.g. by another pass) is read again
+		try:
+			status = stat(path)
+		except OSError:
+			return [int(), False]
+		key = (path, status.st_mtime_ns, status.st_size)
+		with cls.page_infos_lock:
+			if key in cls.page_infos:
+				cls.page_infos.move_to_end(key)
+				return cls.page_infos[key]
+
+		info = read_page_info(path)
+		if not info:
+			try:
+				pdfinfo = pdfinfo_from_path(path)
+				# For example, "595.276 x 841.89 pts (A4)"
+				size = pdfinfo["Page size"].split()
+				info = [int(pdfinfo["Pages"]), [float(size[0]) / 72, float(size[2]) / 72]]
+			except (PDFPageCountError, KeyError, ValueError, IndexError):
+				# Files which can't be read aren't remembered, they might be still being written
+				return [int(), False]
+
+		with cls.page_infos_lock:
+			cls.page_infos[key] = info
+			while len(cls.page_infos) > cls.page_infos_size:
+				cls.page_infos.popitem(last=False)
+		return info
 
-	def image(self, path, quality=100):
+	@staticmethod
+	def page_count(path):
+		"""
+		Reads the amount of pages in a .pdf file (see the .page_info() method).
+
+		:param path: The full path to the .pdf file.
+		:return: The amount of pages, or 0 if the file can't be read.
+		"""
+		return Compile.page_info(path)[0]
+
+	@staticmethod
+	def page_size(path):
+		"""
+		Reads the size of the pages in a .pdf file (see the .page_info() method).
+
+		:param path: The full path to the .pdf file.
+		:return: The width and height of the page in inches, or False if the file can't be read.
+		"""
+		return Compile.page_info(path)[1]
+
+	@staticmethod
+	def image_page(path, page, quality=100, app_pointer=False):
+		"""
+		Converts a single page of a compiled .pdf file to an image,
+		unless it was already converted at the same quality (the image's file name doesn't include it).
+
+		:param path: The full path to the compiled .pdf file.
+		:param page: The page number (starting from 1).
+		:param quality: The DPI of the image to create (Defaults to 100).
+		:param app_pointer: The app, whose page cache (if any) is used, or False.
+		:return: The path to the page's image, or False if the page couldn't be converted.
+		"""
+		image_path = "{path}{index}.jpg".format(path=splitext(path)[0], index=page)
+		if exists(image_path) and Compile.image_qualities.get(image_path) == quality:
+			return image_path
+		if page > Compile.page_count(path):
+			return False
+		c = Compile(app_pointer)
+		if c.image(path, quality=quality, first_page=page, last_page=page) and exists(image_path):
+			return image_path
+		return False
+
+	@staticmethod
+	def page_runs(pages):
+		"""
+		Groups a sorted list of page numbers into runs of consecutive pages.
+		For example, [1, 2, 3, 7, 9, 10] is grouped into [[1, 3], [7, 7], [9, 10]].
+
+		:param pages: A sorted list of page numbers.
+		:return: A list of [first page, last page] pairs.
+		"""
+		runs = list()
+		for page in pages:
+			if runs and runs[-1][1] == page - 1:
+				runs[-1][1] = page
+			else:
+				runs.append([page, page])
+		return runs
+
+	@staticmethod
+	def render_page(path, page, quality=100, app_pointer=False):
+		"""
+		Converts a single page of a compiled .pdf file to an image in memory.
+
+		:param path: The full path to the compiled .pdf file.
+		:param page: The page number (starting from 1).
+		:param quality: The DPI of the image to create (Defaults to 100).
+		:param app_pointer: The app, whose page cache (if any) is used, or False.
+		:return: The page as a PIL image, or False if the page couldn't be converted.
+		"""
+		return Compile(app_pointer).render(path, quality=quality, first_page=page, last_page=page).get(page, False)
+
+	def render(self, path, quality=100, first_page=1, last_page=None, prefix=False, on_page=False):
+		"""
+		Converts pages of a compiled LaTeX .pdf file to images in memory.
+		Nothing is encoded or written to the disk.
+
+		Only the pages between first_page and last_page are converted,
+		so that pages which aren't viewed aren't rasterized for nothing.
+		If the app has a page cache, pages which were converted before
+		(or which look exactly like they did in a previous compile)
+		are taken from the cache instead. The rest are converted on
+		the app's raster pool (if any), across all the cores.
+
+		:param path: The full path to the compiled .pdf file.
+		:param quality: The DPI of the images to create (Defaults to 100).
+		:param first_page: The first page to convert (Defaults to the first page).
+		:param last_page: The last page to convert (Defaults to the last page).
+		:param prefix: If given, converted pages are also saved as .jpg files named prefix + page number.
+		:param on_page: A function to call with each converted page (page number, PIL image),
+		in page order and as soon as it is ready, or False.
+		:return: A dictionary of page numbers to PIL images (empty if the conversion failed).
+		"""
+		# Find out which pages exist
+		self.pages = self.page_count(path)
+		last_page = min(last_page or self.pages, self.pages)
+		if not last_page:
+			return dict()
+		# If the pages are past the end of the document (e.g. pages were removed), convert the last page
+		first_page = min(first_page, last_page)
+
+		# Take the pages which were already converted from this very .pdf
+		page_cache = getattr(self.app_pointer, "page_cache", False)
+		images = dict()
+		if page_cache:
+			for page_index in range(first_page, last_page + 1):
+				image = page_cache.get(page_cache.key("pdf", path, page_index, quality))
+				if image:
+					images[page_index] = image
+		remaining = [page_index for page_index in range(first_page, last_page + 1) if page_index not in images]
+
+		# Fingerprint the rest, so that pages which look exactly like
+		# they did in a previous compile don't have to be converted again
+		fingerprints = dict()
+		if page_cache and remaining:
+			self.app_pointer.status_bar_instance.update_status({"Task": "Fingerprinting..."})
+			with span(self.app_pointer, "fingerprint", pages=len(remaining)):
+				page_fingerprints = fingerprint_pages(path, remaining[0], remaining[-1])
+			if page_fingerprints:
+				fingerprints = {page_index: page_fingerprints[page_index - remaining[0]] for page_index in remaining}
+		missing = list()
+		for page_index in remaining:
+			image = page_index in fingerprints and page_cache.get(page_cache.key(
+				"fingerprint",
+				fingerprints[page_index],
+				quality
+			))
+			if image:
+				images[page_index] = image
+				page_cache.put(page_cache.key("pdf", path, page_index, quality), image)
+			else:
+				missing.append(page_index)
+		self.rendered = len(missing)
+		self.reused = len(images)
+		count(self.app_pointer, "page_cache", hits=self.reused, misses=self.rendered)
+
+		# Choose the backend to convert the pages with
+		rasterizer = select_rasterizer(getattr(self.app_pointer, "settings", dict()).get("raster_backend", "auto"), path) \
+			if missing else False
+		# Without the app's pool, convert the pages in this process
+		raster_pool = getattr(self.app_pointer, "raster_pool", False) or RasterPool(1)
+
+		# For each run of consecutive pages which weren't reused
+		for run_first, run_last in self.page_runs(missing):
+			# Attempt to convert the pages to an object
+			if self.app_pointer:
+				self.app_pointer.status_bar_instance.update_status({"Task": "Converting..."})
+			converted = int()
+			raster_start = time()
+			with span(self.app_pointer, "rasterize", first=run_first, last=run_last, quality=quality):
+				for page_index, page in raster_pool.render(rasterizer, path, quality, run_first, run_last, prefix):
+					converted += 1
+					images[page_index] = page
+					# Remember it for this .pdf, and in case the page doesn't change in the next compile
+					if page_cache:
+						page_cache.put(page_cache.key("pdf", path, page_index, quality), page)
+						if page_index in fingerprints:
+							page_cache.put(page_cache.key("fingerprint", fingerprints[page_index], quality), page)
+					if on_page:
+						on_page(page_index, page)
+			observe(self.app_pointer, "raster", time() - raster_start)
+			if not converted:
+				return dict()
+
+		# Report how many pages were reused, and how long converting a page takes
+		if self.app_pointer:
+			self.app_pointer.status_bar_instance.update_status({
+				"Reused Pages": "{reused}/{total}".format(reused=self.reused, total=self.reused + self.rendered)
+			})
+			if rasterizer:
+				self.app_pointer.status_bar_instance.update_status({
+					"Render Time": "{time} ms/page ({name})".format(
+						time=round(rasterizer.page_time() * 1000),
+						name=rasterizer.name
+					)
+				})
+		return images
+
+	def image(self, path, quality=100, first_page=1, last_page=None):
 		"""
 		Converts a compiled LaTeX .pdf file to an image.
 
 		Each page is converted as an image, which is exported
 		in a .jpg file with the same name as the original .pdf
 		file, and with the page number as a suffix.
+		Only the pages between first_page and last_page are converted
+		(see the .render() method, which this method writes to the disk).
 
 		:param path: The full path to the compiled .pdf file.
 		:param quality: The DPI of the image to create (Defaults to 100).
+		:param first_page: The first page to convert (Defaults to the first page).
+		:param last_page: The last page to convert (Defaults to the last page).
 
 		Returns the constant path, not including the altering suffix.
-		If the path to one of the compiled images is "../compile/compile1230.jpg",
-		then the returned data would be "../compile/compile123"
+		If the path to one of the compiled images is "/dev/shm/abuela-1/job123/compile1.jpg",
+		then the returned data would be "/dev/shm/abuela-1/job123/compile"
 		"""
-		# Attempt to convert the files to an object
-		try:
-			self.app_pointer.status_bar_instance.update_status({"Task": "Loading..."})
-			pages = convert_from_path(path, quality)
-		except PDFPageCountError:
-			return False
-
-		# For each page in the pdf
-		self.app_pointer.status_bar_instance.update_status({"Task": "Converting..."})
-		page_index = int()
-		for page in pages:
-			page_index += 1
-			# Save it as a picture
-			page.save("{path}{index}.jpg".format(
-				path=splitext(path)[0],
-				index=page_index
-			), 'JPEG')
+		# Convert the pages to objects (converted pages are saved while converting, by the raster pool)
+		saved = set()
+		with span(self.app_pointer, "image", quality=quality):
+			pages = self.render(path, quality=quality, first_page=first_page, last_page=last_page,
+			                    prefix=splitext(path)[0], on_page=lambda page_index, page: saved.add(page_index))
 
-		# Clean trash files
-		try:
-			self.clean()
-		except PermissionError:
-			# If the .pdf file is inaccessible, then a new update is currently compiling
-			return False
+			# For each page in the pdf which was taken from the cache
+			with span(self.app_pointer, "save images", pages=len(pages) - len(saved)):
+				for page_index, page in pages.items():
+					if page_index not in saved:
+						# Save it as a picture
+						page.save("{path}{index}.jpg".format(
+							path=splitext(path)[0],
+							index=page_index
+						), 'JPEG')
 
 		# Verify that all the pages were created successfully
-		self.app_pointer.status_bar_instance.update_status({"Task": "Verifying..."})
-		all_exists = True
-		# For each page index (starting from 1)
-		for i in range(1, len(pages) + 1):
-			# If it doesn't exist,
-			if not exists("{path}{index}.jpg".format(
+		if self.app_pointer:
+			self.app_pointer.status_bar_instance.update_status({"Task": "Verifying..."})
+		all_exists = bool(pages)
+		# For each converted page index
+		for i in pages:
+			image_path = "{path}{index}.jpg".format(
 				path=splitext(path)[0],
 				index=i
-			)):
+			)
+			# If it doesn't exist,
+			if not exists(image_path):
 				# Then not all of the images were created successfully
 				all_exists = False
+			else:
+				# Remember its quality, so that it's only reused at the same quality
+				Compile.image_qualities[image_path] = quality
 
 		# If all the images were created successfully...
 		if all_exists:
@@ -0,0 +1,168 @@
+"""
+The Diagnostics file.
+Stores the Diagnostic class, which describes a single
+message from the compiler, the DiagnosticCollector class,
+which groups the compiler's output lines into messages,
+and the OutputReader class, which parses the compiler's
+output while it is running.
+"""
+from re import compile as compile_regex
+from threading import Thread
+
+# A C-style error line, e.g. "../project/current.tex:12: Undefined control sequence."
+DIAGNOSTIC_PATTERN = compile_regex(r"^(.+?):(\d+): (.*)$")
+
+# Messages after which the compiler can't produce a usable document
+FATAL_MESSAGES = [
+	"Emergency stop",
+	"Fatal error",
+	"TeX capacity exceeded",
+	"Missing \\begin{document}"
+]
+
+# A missing package or class, e.g. "LaTeX Error: File `tikz.sty' not found." (other missing files, such as
+# images, are recoverable errors)
+MISSING_PACKAGE_PATTERN = compile_regex(r"File `[^']+\.(sty|cls)' not found")
+
+# TeX's context line, which shows where in the line the error is, e.g. "l.12 \foo"
+CONTEXT_PATTERN = compile_regex(r"^l\.\d+(\s|$)")
+
+
+class Diagnostic:
+	"""
+	The Diagnostic class stores a single message
+	from the compiler: the file and line it points
+	to, the message itself, and whether it is fatal.
+	"""
+
+	def __init__(self, file, line, message, fatal=False):
+		self.file = file
+		self.line = line
+		self.message = message
+		self.fatal = fatal
+
+	@staticmethod
+	def parse(output_line):
+		"""
+		Parses a line of the compiler's output.
+
+		:param output_line: A single line of output, without the line break.
+		:return: A Diagnostic if the line starts a message, False otherwise.
+		"""
+		match = DIAGNOSTIC_PATTERN.match(output_line)
+		if not match:
+			return False
+		message = match.group(3).strip()
+		return Diagnostic(
+			file=match.group(1),
+			line=int(match.group(2)),
+			message=message,
+			fatal=any(fatal_message in message for fatal_message in FATAL_MESSAGES) or
+			bool(MISSING_PACKAGE_PATTERN.search(message))
+		)
+
+	@staticmethod
+	def parse_output(output):
+		"""
+		Parses the full output of the compiler (e.g. of a cached compile).
+
+		:param output: The output, as a string.
+		:return: A list of Diagnostic objects, in order.
+		"""
+		collector = DiagnosticCollector()
+		for output_line in output.split("\n"):
+			collector.feed(output_line.rstrip("\r"))
+		return collector.diagnostics
+
+	def to_dict(self):
+		"""
+		Returns the diagnostic as a dictionary (e.g. to dump it as JSON).
+		"""
+		return {
+			"file": self.file,
+			"line": self.line,
+			"message": self.message,
+			"fatal": self.fatal
+		}
+
+
+class DiagnosticCollector:
+	"""
+	The DiagnosticCollector class groups the compiler's output lines
+	into Diagnostic objects. A message continues on the lines after
+	it, up to the first blank line or TeX's context line (which is
+	the message's last line), so that the rest of the output (e.g.
+	the page numbers) is never taken as part of it.
+	"""
+
+	def __init__(self):
+		self.diagnostics = list()
+		# Whether the lines being read continue the last message
+		self.continuing = False
+
+	def feed(self, output_line):
+		"""
+		Parses a line of the compiler's output.
+
+		:param output_line: A single line of output, without the line break.
+		:return: The Diagnostic if the line starts a message, False otherwise.
+		"""
+		diagnostic = Diagnostic.parse(output_line)
+		if diagnostic:
+			self.diagnostics.append(diagnostic)
+			self.continuing = True
+		elif self.continuing and output_line.strip():
+			self.diagnostics[-1].message += "\n" + output_line
+			self.continuing = not CONTEXT_PATTERN.match(output_line)
+		else:
+			self.continuing = False
+		return diagnostic
+
+
+class OutputReader:
+	"""
+	The OutputReader class consumes the compiler's STDOUT
+	on a thread of its own while the compiler runs, so that
+	a chatty document can never fill up the pipe. Each line
+	is parsed into a Diagnostic as soon as it arrives, and
+	the compiler can be aborted on the first fatal error.
+	"""
+
+	def __init__(self, proc, on_fatal=False):
+		"""
+		:param proc: The Popen object of the compiler (with stdout=PIPE).
+		:param on_fatal: A function to call on the first fatal error (e.g. to kill the compiler), or False.
+		"""
+		self.proc = proc
+		self.on_fatal = on_fatal
+		self.lines = list()
+		self.collector = DiagnosticCollector()
+		self.diagnostics = self.collector.diagnostics
+		self.aborted = False
+		self.reader = Thread(target=self.read)
+		self.reader.setDaemon(True)
+		self.reader.start()
+
+	def read(self):
+		"""
+		The reader thread's loop. Reads and parses lines until the compiler closes its STDOUT.
+		"""
+		for raw_line in iter(self.proc.stdout.readline, b""):
+			line = raw_line.decode("utf-8", errors="replace").rstrip("\r\n")
+			self.lines.append(line)
+			diagnostic = self.collector.feed(line)
+			# Abort on the first fatal error, there's no point in waiting for the rest
+			if diagnostic and diagnostic.fatal and self.on_fatal and not self.aborted:
+				self.aborted = True
+				self.on_fatal()
+		self.proc.stdout.close()
+
+	def wait(self):
+		"""
+		Waits until the compiler exits and all of its output was read.
+
+		:return: The full output of the compiler, as a string.
+		"""
+		self.reader.join()
+		self.proc.wait()
+		return "\n".join(self.lines)
@@ -0,0 +1,144 @@
+"""
+The Engine file.
+Stores the EnginePool class, which keeps compiler
+processes on standby so that live compiles don't
+have to wait for the compiler to start up.
+"""
+from subprocess import PIPE
+from threading import Thread, Lock
+
+from compile import Compile
+
+
+class EnginePool:
+	"""
+	The EnginePool class manages a pool of pre-spawned
+	compiler processes. Each one has already loaded the
+	precompiled preamble format, and is blocked on its
+	STDIN, waiting for the name of the file to typeset.
+	The pool refills itself in the background, and is
+	thrown away whenever the preamble (format) changes.
+	"""
+
+	def __init__(self, size=2):
+		self.size = size
+		self.fmt = False
+		# A list of [process, build directory] pairs which are waiting for a file
+		self.standby = list()
+		self.filling = False
+		self.lock = Lock()
+
+	def start(self, fmt, file_path, before=False):
+		"""
+		Hands a file to a compiler that is on standby.
+
+		:param fmt: The path to the format of the file's preamble.
+		:param file_path: The path to the .tex file to compile.
+		:param before: A function to call with the build directory before the compiler is woken up, or False.
+		:return: An array containing the running process and its build directory,
+		or [False, False] if there was no compiler on standby for the format.
+		"""
+		self.prepare(fmt)
+		with self.lock:
+			standby = self.standby
+			self.standby = list()
+		proc, build_dir = False, False
+		# Wake up the first compiler that is still alive
+		while standby and not proc:
+			proc, build_dir = standby.pop(0)
+			try:
+				if before:
+					before(build_dir)
+				# The first line of a compiler's input is the file it should typeset
+				proc.stdin.write("{path}\n".format(path=file_path).encode("utf-8"))
+				proc.stdin.close()
+			except OSError:
+				# The process died while waiting
+				self.discard(proc, build_dir)
+				proc, build_dir = False, False
+		# Return the rest of the compilers to the pool, and start replacing the used one
+		with self.lock:
+			self.standby = standby + self.standby
+		self.refill()
+		return [proc, build_dir]
+
+	def prepare(self, fmt):
+		"""
+		Makes sure that the pool is filled with compilers for a format.
+		If the pool holds compilers for a different format, they are killed.
+
+		:param fmt: The path to the format of the current preamble, or False.
+		"""
+		with self.lock:
+			if fmt == self.fmt:
+				stale = list()
+			else:
+				stale = self.standby
+				self.standby = list()
+				self.fmt = fmt
+		for proc, build_dir in stale:
+			self.discard(proc, build_dir)
+		self.refill()
+
+	def refill(self):
+		"""
+		Starts filling the pool in the background (if it isn't being filled already).
+		"""
+		with self.lock:
+			if self.filling or not self.fmt or len(self.standby) >= self.size:
+				return
+			self.filling = True
+		filler = Thread(target=self.fill)
+		filler.setDaemon(True)
+		filler.start()
+
+	def fill(self):
+		"""
+		Spawns compilers until the pool is full.
+		"""
+		try:
+			while True:
+				with self.lock:
+					fmt = self.fmt
+					if not fmt or len(self.standby) >= self.size:
+						return
+				# Each compiler writes to a build directory of its own
+				build_dir = Compile.make_build_dir()
+				proc = Compile.spawn(Compile.command(fmt, build_dir), stdin=PIPE, stdout=PIPE)
+				with self.lock:
+					# If the format changed while spawning, then the process is already stale
+					if fmt == self.fmt:
+						self.standby.append([proc, build_dir])
+						continue
+				self.discard(proc, build_dir)
+		except OSError:
+			# The compiler couldn't be executed, so live compiles will start their own
+			pass
+		finally:
+			with self.lock:
+				self.filling = False
+
+	@staticmethod
+	def discard(proc, build_dir):
+		"""
+		Kills a compiler that is on standby and removes its build directory.
+
+		:param proc: The compiler's process.
+		:param build_dir: The compiler's build directory.
+		"""
+		Compile.kill(proc)
+		proc.wait()
+		c = Compile(False)
+		c.build_dir = build_dir
+		c.clean()
+
+	def close(self):
+		"""
+		Kills every compiler in the pool. Should be called on termination.
+		"""
+		with self.lock:
+			stale = self.standby
+			self.standby = list()
+			self.fmt = False
+		for proc, build_dir in stale:
+			self.discard(proc, build_dir)
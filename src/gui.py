@@ -3,21 +3,36 @@ The GUI file, reserved for all interactions
 GUI-wise and some others that fit within the
 category or are critical / necessary for the GUI to run.
 """
+from collections import deque
 from os import listdir
-from random import randint
-from threading import Thread
-from time import sleep, time
+from os.path import join, splitext
+from shutil import rmtree
+from time import time, perf_counter
 
 from PyQt5 import QtGui
-from PyQt5.QtCore import QEvent, Qt, QCoreApplication, QTimer
-from PyQt5.QtGui import QPixmap, QIcon, QFont, QTextCursor, QTextBlockFormat, QColor
-from PyQt5.QtWidgets import QLabel, QPlainTextEdit, QMainWindow, QListWidget, QListWidgetItem, QGroupBox, QSpinBox
+from PyQt5.QtCore import QEvent, Qt, QCoreApplication, QTimer, pyqtSignal
+from PyQt5.QtGui import QPixmap, QIcon, QFont, QTextCursor, QTextCharFormat, QTextFormat, QColor
+from PyQt5.QtWidgets import QLabel, QPlainTextEdit, QMainWindow, QListWidget, QListWidgetItem, QGroupBox, QSpinBox, \
+	QFileDialog, QTextEdit
 from keyboard import is_pressed as is_key_pressed
 
-from compile import compile_to_image
+from build import BuildPlanner
+from cache import CompileCache
+from chunks import ChunkBuilder
+from compile import compile_to_pdf, Compile
+from diagnostics import Diagnostic
+from engine import EnginePool
 from error import Error
 from menu import Menu, Status
+from metrics import Metrics
+from pages import PageCache
+from preamble import FormatCache
+from preview import Preview
 from project import Project
+from raster import compare_rasterizers, RasterPool
+from scheduler import CompileScheduler
+from synctex import SyncTex
+from tracing import span, Tracer
 from updater import Updater
 from utility import Utility
 
@@ -30,6 +45,9 @@ class App(QMainWindow):
 	Executed by the main.py file.
 	"""
 
+	# Emitted by the compiler thread with a revision number and the compiled data
+	live_ready = pyqtSignal(int, list)
+
 	# Constructor
 	def __init__(self):
 		"""
@@ -53,6 +71,11 @@ class App(QMainWindow):
 		# Pull settings
 		self.settings = self.utils.get_settings()
 
+		# Create the tracer of the live pipeline's stages (see the Export Trace tool)
+		self.tracer = Tracer(self.settings["trace_size"])
+		# Collect the latencies of the live pipeline for each project (kept across sessions, see the Metrics tool)
+		self.metrics = Metrics()
+
 		# Clear cache
 		self.utils.clear_cache()
 
@@ -68,10 +91,35 @@ class App(QMainWindow):
 		# Create an instance of the Updater class
 		self.updater_instance = Updater()
 
-		# Set default compiler live identifier number
-		self.live = int()
-		self.live_update = int()
-		self.live_compile = str()
+		# Create the cache of precompiled preambles, and the pool of compilers waiting for them
+		self.format_cache = FormatCache()
+		self.engine_pool = EnginePool(self.settings["live_standby"])
+
+		# Create the cache of compile results, and the cache of converted pages
+		self.compile_cache = CompileCache(self.settings["compile_cache_size"])
+		# Create the planner of the tools and extra passes which follow each compile
+		self.build_planner = BuildPlanner(self.settings["build_passes"])
+		# Create the builder which compiles long documents in chunks, at the same time
+		self.chunk_builder = ChunkBuilder(self.settings["build_chunks"], self.settings["build_workers"])
+		self.page_cache = PageCache(self.settings["page_cache_size"])
+		# Create the pool of processes which convert pages (started once many pages are converted)
+		self.raster_pool = RasterPool(self.settings["raster_workers"])
+
+		# Create the live compiler's scheduler (it runs all compiles on a single worker thread)
+		self.scheduler = CompileScheduler(self.updateLive, self.settings["live_update"], Compile.kill)
+		self.live_ready.connect(self.show_live)
+		# The displayed live image (as a PIL image)
+		self.live_image = False
+		# The last successfully compiled live .pdf
+		self.live_pdf = False
+		# The page of the compiled document at the middle of the live-render (set by the preview, converted first)
+		self.page_index = 1
+		# The SyncTeX index of the last successful live compile, and the line of the editor's cursor
+		self.synctex = False
+		self.cursor_line = 1
+		# The live-render's size in physical pixels, and the durations of the recent live compiles
+		self.viewport = [int(), int()]
+		self.compile_times = deque(maxlen=5)
 
 		# Other attributes
 		self.last_data = str()
@@ -114,7 +162,10 @@ class App(QMainWindow):
 		self.editor_box.installEventFilter(self)
 
 		# The live-compile renderer element
-		self.editor_compiled = self.make_pic(background=self.theme["Live"]["background-color"])
+		self.editor_compiled = Preview(self, background=self.theme["Live"]["background-color"])
+		# Link the editor's cursor and the live-render's pages (through the SyncTeX index)
+		self.editor_box.cursorPositionChanged.connect(self.follow_cursor)
+		self.editor_compiled.clicked.connect(self.jump_to_source)
 
 		# Create Settings list element
 		self.settings_list = self.make_list(["Appearance", "Shortcuts", "Advanced"])
@@ -356,123 +407,273 @@ class App(QMainWindow):
 				self.thread_compile()
 			else:
 				# If there are no characters, make sure there is no picture
-				self.editor_compiled.setPixmap(QPixmap())
+				self.editor_compiled.clear()
 
 			self.status_bar_instance.update_status({"Task": "Idling"})
 
-	def thread_compile(self):
+	def thread_compile(self, full=False):
 		"""
-		The method which starts a compiler thread.
+		The method which queues a live compile of the editor's text.
 		Written as a method as to be called easier.
-		"""
-		# Generate a random ID and pass it as a parameter to
-		# the compiler thread. Set the ID as an attribute so that
-		# the compiler thread can also access it. If the compiler thread
-		# notices that its ID is not matching to the attribute ID,
-		# then that means that the compiler thread is invalid,
-		# and that a new thread is the latest thread which should run.
 
+		:param full: Whether to compile the whole document right away, even if it is long.
+		"""
 		# Update last edit time
 		self.last_update = time()
 
-		# Set the current live ID and pass it to the function
-		live_id = randint(0, 999999999999999)
-		self.live = live_id
+		# Queue a snapshot of the text. The scheduler's worker thread compiles it once
+		# there were no new edits for the live_update delay, and if a compile of an
+		# older revision is already running, then it is killed.
+		self.status_bar_instance.update_status({"Task": "Queueing..."})
+		self.scheduler.submit(self.editor_box.toPlainText(), full)
 
-		# Set the time at which to call the live update
-		self.live_update = time() + self.settings["live_update"]
+	def updateLive(self, job):
+		"""
+		This function is used to compile the live version of the LaTeX source code.
+		It is called by the scheduler's worker thread, and passes the compiled
+		data on to the GUI thread (see the .show_live() method).
 
-		# Initialize the process
-		self.status_bar_instance.update_status({"Task": "Multiprocessing..."})
-		p = Thread(target=self.updateLive, args=[live_id])
-		p.setDaemon(True)
-		p.start()
+		:param job: The CompileJob to compile. It holds a snapshot of the text, and
+		its revision number. If a newer revision is submitted, the job is cancelled.
+		"""
+		# Trace the whole stage, along with the time the job waited for new edits (debounce) and for the worker
+		self.tracer.record("debounce", job.due - self.settings["live_update"], job.due, revision=job.revision)
+		self.tracer.record("queue", job.due, perf_counter(), revision=job.revision)
+		self.metrics.observe("debounce", perf_counter() - (job.due - self.settings["live_update"]))
+		with span(self, "updateLive", revision=job.revision, full=job.full):
+			# Update project
+			self.status_bar_instance.update_status({"Task": "Saving..."})
+			with span(self, "save"):
+				self.project.save(job.text, overwrite=True)
+
+			# Update the status bar
+			self.status_bar_instance.update_status({
+				"Words": len([item for item in job.text.split(" ") if item.strip()]),
+				"Characters": len(job.text)
+			})
+
+			# Look up the precompiled preamble (if it changed, a new one is built in the background)
+			fmt = False
+			if self.settings["live_format"]:
+				fmt = self.format_cache.get(self.project.split())
+			# Throw away the compilers on standby if the preamble changed
+			self.engine_pool.prepare(fmt)
+
+			# In a long document, only compile the section around the cursor, and compile the whole document
+			# once there are no new edits for a while (or when it is requested, see the .full_build() method)
+			excerpt = False
+			if not job.full and self.settings["live_partial"] and job.text.count("\n") >= self.settings["live_partial"]:
+				excerpt = self.project.excerpt(self.cursor_line, job.text)
+			if excerpt:
+				# The excerpt is written into a directory of its own, never next to the user's document
+				excerpt_dir = Compile.make_build_dir()
+				excerpt_path = join(excerpt_dir, self.project.excerpt_name)
+				file = open(excerpt_path, "w", encoding="utf-8")
+				file.write(excerpt[0])
+				file.close()
+				self.status_bar_instance.update_status({"Scope": "Lines {first}-{last}".format(
+					first=excerpt[1],
+					last=excerpt[2]
+				)})
+				try:
+					self.compile_live(job, excerpt_path, fmt)
+				finally:
+					rmtree(excerpt_dir, ignore_errors=True)
+				with span(self, "idle"):
+					if not self.scheduler.wait_idle(job.revision, self.settings["live_full_delay"]):
+						return
+			self.status_bar_instance.update_status({"Scope": "Document"})
+			# A requested full build of a long document is compiled in chunks (at the cost of SyncTeX)
+			self.compile_live(job, self.project.file_name, fmt, chunked=job.full)
+
+	def compile_live(self, job, path, fmt=False, chunked=False):
+		"""
+		Compiles a live version of the LaTeX source code, and passes the displayed page on to the GUI thread.
+		Called by the .updateLive() method, on the scheduler's worker thread.
 
-	def updateLive(self, liveID):
+		:param job: The CompileJob to compile.
+		:param path: The path to the file to compile (the project's file, or an excerpt of it).
+		:param fmt: The path to the precompiled format of the preamble, or False.
+		:param chunked: Whether a long document may be compiled in chunks.
 		"""
-		This function is used to compile and update the image
-		displaying the live version of the LaTeX source code.
+		# Compile the code to a .pdf
+		self.status_bar_instance.update_status({"Task": "Compiling..."})
+		compile_start = time()
+		with span(self, "compile", scope="excerpt" if path != self.project.file_name else "document"):
+			pdf_path, error_msg = compile_to_pdf(
+				app_pointer=self,
+				path=path,
+				fmt=fmt,
+				job=job,
+				partial=path != self.project.file_name and self.project.file_name,
+				chunked=chunked
+			)
+		self.compile_times.append(time() - compile_start)
+		self.metrics.observe("compile", self.compile_times[-1])
+		# Excerpts keep the project's line numbers, so their errors are reported as the project's
+		if error_msg and path != self.project.file_name:
+			error_msg = error_msg.replace(path + ":", self.project.file_name + ":")
+
+		# If the file was successfully compiled, convert the displayed page (in memory), quickly at first
+		image = page_size = False
+		quality = draft_quality = page_count = int()
+		if pdf_path:
+			self.live_pdf = pdf_path
+			# Make sure the displayed page still exists (pages may have been removed)
+			page_count, page_size = Compile.page_info(pdf_path)
+			# Index the places of the lines, and convert the page under the cursor first
+			with span(self, "synctex"):
+				self.synctex = SyncTex.parse(splitext(pdf_path)[0] + ".synctex.gz", path)
+			place = self.synctex and self.synctex.forward(self.cursor_line)
+			if place:
+				self.page_index = place[0]
+			self.page_index = max(1, min(self.page_index, page_count))
+			quality = self.live_dpi(page_size)
+			draft_quality = self.draft_dpi(quality)
+			with span(self, "draft render", page=self.page_index, quality=draft_quality):
+				image = Compile.render_page(pdf_path, self.page_index, draft_quality, self)
+
+		# Results of cancelled or outdated compiles never reach the GUI
+		if job.cancelled or not self.scheduler.is_current(job.revision):
+			return
+		page_index = self.page_index
+		self.live_ready.emit(job.revision, [image, error_msg, pdf_path, page_index, page_size, page_count])
+
+		# Convert the page again in full resolution, if there were no new edits for a while
+		# (the rest of the visible pages, and the pages around them, are converted by the preview)
+		if image and draft_quality < quality and self.scheduler.wait_idle(job.revision, self.settings["live_refine"]):
+			self.status_bar_instance.update_status({"Task": "Refining..."})
+			with span(self, "refine", page=page_index, quality=quality):
+				image = Compile.render_page(pdf_path, page_index, quality, self)
+			if image and not job.cancelled and self.scheduler.is_current(job.revision):
+				self.live_ready.emit(job.revision, [image, error_msg, pdf_path, page_index, page_size, page_count])
+			self.status_bar_instance.update_status({"Task": "Idling"})
 
-		:param liveID: An ID which is passed just before called. If the global live ID is not equal to this function's
-		live ID, then this function will terminate (another key was pressed, therefore this function is old and the
-		new function should compile together the new LaTeX source code)
+	def follow_cursor(self):
+		"""
+		Scrolls the live-render to the place of the line under the editor's cursor (forward search).
+		"""
+		self.cursor_line = self.editor_box.textCursor().blockNumber() + 1
+		place = self.synctex and self.synctex.forward(self.cursor_line)
+		if place:
+			self.editor_compiled.show_place(place[0], place[1])
 
-		This function doesn't return any data, it calls directly on the editor_compiled attribute and updates the image.
+	def jump_to_source(self, page, x, y):
 		"""
-		# Wait until it's time to update the live
-		while time() < self.live_update:
-			if self.live != liveID:
-				return
-			sleep(self.settings["live_thread_refresh"])
-		# Check if the liveID is this function's ID
-		if self.live != liveID:
-			return
+		Moves the editor's cursor to the line at a clicked place of the live-render (inverse search).
 
-		# If the ID is equal, then continue.
-		# From this point on, the actual compiler will run.
-		# That is to say, the above code is only a check
-		# that there are not multiple threads attempting
-		# to compile at the same time, and that only after
-		# a delay will the compiler threads attempt to compile.
+		:param page: The clicked page number.
+		:param x: The place's distance from the page's left (inches).
+		:param y: The place's distance from the page's top (inches).
+		"""
+		line = self.synctex and self.synctex.inverse(page, y)
+		if line:
+			cursor = QTextCursor(self.editor_box.document().findBlockByNumber(line - 1))
+			self.editor_box.setTextCursor(cursor)
+			self.editor_box.setFocus()
 
-		# Update project
-		self.status_bar_instance.update_status({"Task": "Saving..."})
-		self.project.save(self.editor_box.toPlainText(), overwrite=True)
+	def live_dpi(self, page_size):
+		"""
+		Calculates the quality which matches the live-render's
+		size, so that the page is never converted to more pixels
+		than can be displayed, or to too few to look sharp.
 
-		# Update the status bar
-		self.status_bar_instance.update_status({
-			"Words": len([item for item in self.editor_box.toPlainText().split(" ") if item.strip()]),
-			"Characters": len(self.editor_box.toPlainText())
-		})
+		:param page_size: The width and height of the displayed page in inches (see Compile.page_size()).
+		:return: The DPI to convert the displayed page at (rounded to tens, so that it can be cached).
+		"""
+		# Before the live-render is laid out (or if the page can't be read), use the quality from the settings
+		if not page_size or not all(self.viewport):
+			return self.settings["live_quality"]
+		# The pages are fitted to the live-render's width (zooming in is drawn from tiles, see the Preview class)
+		quality = self.viewport[0] / page_size[0]
+		return int(min(max(round(quality, -1), 10), self.settings["live_max_quality"]))
+
+	def draft_dpi(self, quality):
+		"""
+		Calculates the quality of the first, fast conversion of the displayed page.
+		When the recent compiles were slow, the quality is lowered further,
+		so that the page is displayed sooner.
+
+		:param quality: The full quality of the displayed page.
+		:return: The DPI of the first conversion (rounded to tens, so that it can be cached).
+		"""
+		draft_quality = quality * self.settings["live_draft"]
+		compile_time = sum(self.compile_times) / len(self.compile_times) if self.compile_times else float()
+		if compile_time > self.settings["live_draft_budget"]:
+			draft_quality *= self.settings["live_draft_budget"] / compile_time
+		return int(min(max(round(draft_quality, -1), 10), quality))
+
+	def show_live(self, revision, compiled_return_data):
+		"""
+		Updates the image displaying the live version of the LaTeX source code,
+		or colors the lines with errors. Called on the GUI thread by the live_ready signal.
+
+		:param revision: The revision number of the compiled job.
+		:param compiled_return_data: An array containing the displayed page as
+		a PIL image (or False), the error messages from compilation, the compiled
+		.pdf file, the displayed page's number, the size of the pages in inches,
+		and the amount of pages.
+		"""
+		# If a newer revision was submitted since, then discard the result
+		if not self.scheduler.is_current(revision):
+			return
+		update_start = perf_counter()
 
-		# Compile the code to an image
-		self.status_bar_instance.update_status({"Task": "Compiling..."})
-		page_index = 1  # TO DO (ADD SCROLL ELEMENT WHICH ALTERS THIS VALUE & MAKE THIS VALUE AN ATTRIBUTE)
-		compiled_return_data = compile_to_image(
-			app_pointer=self,
-			path=self.project.file_name,
-			quality=self.settings["live_quality"]
-		)
 		# If the file was successfully compiled...
 		if compiled_return_data[0]:
 			# Update the live image element
 			self.status_bar_instance.update_status({"Task": "Updating..."})
-			self.live_compile = "{path}{index}.jpg".format(path=compiled_return_data[0], index=page_index)
-			pixel_map = QPixmap(self.live_compile)
-			self.editor_compiled.setPixmap(pixel_map)
-			self.editor_compiled.setScaledContents(True)
+			self.live_image = compiled_return_data[0]
+			self.editor_compiled.set_document(
+				compiled_return_data[2],
+				compiled_return_data[5],
+				compiled_return_data[4],
+				compiled_return_data[3],
+				self.live_image
+			)
+			# Show the place of the cursor's line (the pages may have moved)
+			self.follow_cursor()
 
-			# Clear the error coloring
+			# Clear the error coloring (the text, the cursor and the undo history are untouched)
 			self.status_bar_instance.update_status({"Task": "Clearing..."})
-			# Get the cursor element and its position
-			cursor_pos = self.editor_box.textCursor().position()
-			# Reset the window by overwriting all text with itself
-			self.editor_box.setPlainText(self.editor_box.toPlainText())
-			# Set the block position again
-			cursor = self.editor_box.textCursor()
-			cursor.setPosition(cursor_pos)
-			self.editor_box.setTextCursor(cursor)
+			self.editor_box.setExtraSelections(list())
 		# Otherwise, if there was a compilation error,
 		else:
 			# If there is a compilation error... (otherwise, the second
 			# item would be returned as false from the compileToImage function)
 			if compiled_return_data[1]:
 				# compiled_return_data[1] now holds the error message as a string
-				# Make a formatter object which colors the background
+				# Make a formatter object which colors the background of whole lines
 				self.status_bar_instance.update_status({"Task": "Parsing..."})
-				color_format = QTextBlockFormat()
+				color_format = QTextCharFormat()
 				error_color = self.utils.hex_to_rgb(self.utils.hex_format(self.theme["Editor"]["error"]))
 				color_format.setBackground(QColor(error_color[0], error_color[1], error_color[2]))
-				# For each line which has an error...
-				for line, message in self.utils.parse_errors(compiled_return_data[1]).items():
-					# Set a cursor to the line number
-					cursor = QTextCursor(self.editor_box.document().findBlockByNumber(line - 1))
-					# Update the background color
-					cursor.setBlockFormat(color_format)
+				color_format.setProperty(QTextFormat.FullWidthSelection, True)
+				# Color the lines with errors in an overlay, which replaces the previous one
+				# (the document itself isn't changed, so it isn't laid out again)
+				selections = list()
+				lines = {diagnostic.line for diagnostic in Diagnostic.parse_output(compiled_return_data[1])
+				         if diagnostic.file == self.project.file_name}
+				for line in sorted(lines):
+					# Set a cursor to the line number (errors past the end of the text are skipped)
+					block = self.editor_box.document().findBlockByNumber(line - 1)
+					if not block.isValid():
+						continue
+					selection = QTextEdit.ExtraSelection()
+					selection.cursor = QTextCursor(block)
+					selection.format = color_format
+					selections.append(selection)
+				self.editor_box.setExtraSelections(selections)
 		self.status_bar_instance.update_status({
 			"Compile Time": round(time() - self.last_update, 2),
+			"Cache Hits": "{hits}/{total}".format(
+				hits=self.compile_cache.hits,
+				total=self.compile_cache.hits + self.compile_cache.misses
+			),
 			"Task": "Idling"
 		})
+		self.tracer.record("show_live", update_start, perf_counter(), revision=revision)
+		self.metrics.observe("ui", perf_counter() - update_start)
 
 	def initUI(self):
 		"""
@@ -583,14 +784,16 @@ class App(QMainWindow):
 		self.status_bar_instance.update_status({"Task": "Opening..."})
 		self.projects_index = new_project_index
 		self.project = self.projects[self.projects_index]
+		self.metrics.project = self.project.file_name
 
 		# Unload all other projects to save memory
 		for i in range(len(self.projects)):
 			if i != self.projects_index:
 				self.projects[i].unload()
 
-		# Open it in the editor box
+		# Open it in the editor box (without the previous project's error coloring)
 		self.editor_box.setPlainText(self.project.open())
+		self.editor_box.setExtraSelections(list())
 
 		# Update the status bar to the current project
 		self.status_bar_instance.update_status({"Project": self.project.name})
@@ -615,7 +818,12 @@ class App(QMainWindow):
 			         {"name": "Split", "bind": False,
 			          "func": lambda: self.update_fill("split")}],
 			"Tools": [{"name": "Copy Live", "bind": 'Ctrl+Shift+C',
-			           "func": lambda: self.menu_bar_instance.copy_to_clipboard(self.live_compile)}],
+			           "func": lambda: self.menu_bar_instance.copy_to_clipboard(self.live_image)},
+			          {"name": "Compare Renderers", "bind": False, "func": self.compare_renderers},
+			          {"name": "Full Build", "bind": 'Ctrl+Shift+B', "func": lambda: self.thread_compile(full=True)},
+			          {"name": "Build Log", "bind": False, "func": self.show_build_log},
+			          {"name": "Export Trace", "bind": False, "func": self.export_trace},
+			          {"name": "Metrics", "bind": False, "func": self.show_metrics}],
 			"Projects": [{"name": self.projects[i].name, "bind": False,
 			              "func": lambda state, x=i: self.switch_project(x)} for i in range(len(self.projects))],
 			"Help": [{"name": "About", "bind": False, "func": lambda: self.error_instance.dialogue(
@@ -772,6 +980,46 @@ class App(QMainWindow):
 		label.resize(width, height)
 		return label
 
+	def show_build_log(self):
+		"""
+		Shows why each of the tools and extra passes of the last build ran.
+		"""
+		self.error_instance.info("Build Log", "Extra steps of the last build",
+		                         "<br>".join(self.build_planner.reasons) or "The first pass was enough.")
+
+	def show_metrics(self):
+		"""
+		Shows the latency percentiles and cache hit ratios of each project, across all sessions.
+		"""
+		# Include this session's metrics as well
+		self.metrics.save()
+		self.error_instance.info("Metrics", "Latency per project",
+		                         Metrics.report(self.metrics.path, line_break="<br>").replace("  ", "&nbsp;&nbsp;"))
+
+	def export_trace(self):
+		"""
+		Prompts the user for a file, and writes the traced stages of the live pipeline
+		to it (as Chrome trace events, see chrome://tracing or ui.perfetto.dev).
+		"""
+		file_path = QFileDialog.getSaveFileName(parent=self, caption="Export Trace", filter="JSON File (*.json)")[0]
+		if file_path:
+			self.tracer.export(file_path)
+
+	def compare_renderers(self):
+		"""
+		Converts the displayed page with each of the available
+		rasterizer backends, and shows how long each one took.
+		"""
+		# There's nothing to convert before the first successful compile
+		if not self.live_pdf:
+			return self.error_instance.info("Compare Renderers", "Nothing to compare", "Compile the project first.")
+		self.status_bar_instance.update_status({"Task": "Comparing..."})
+		results = compare_rasterizers(self.live_pdf, self.live_dpi(Compile.page_size(self.live_pdf)), self.page_index)
+		self.status_bar_instance.update_status({"Task": "Idling"})
+		self.error_instance.info("Compare Renderers", "Time to convert page {page}".format(page=self.page_index),
+		                         "<br>".join(["{name}: {time} ms".format(name=name, time=round(seconds * 1000))
+		                                      for name, seconds in results.items()]) or "No renderer is available.")
+
 	def formatStyle(self):
 		"""
 		A function that takes the currently loaded theme and formats it into QtCSS.
@@ -1099,6 +1347,12 @@ class App(QMainWindow):
 					self.height - self.menu_bar_element.height() - 2.5 * self.status_bar_element.height()
 				)
 
+		# Remember the live-render's size in physical pixels (read by the live compiler's thread)
+		self.viewport = [
+			self.editor_compiled.width() * self.editor_compiled.devicePixelRatioF(),
+			self.editor_compiled.height() * self.editor_compiled.devicePixelRatioF()
+		]
+
 	def set_tab_order(self, *tab_order):
 		"""
 		A method to set the order of how pressing the
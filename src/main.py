@@ -9,6 +9,18 @@ A Big, Useful, & Efficient LaTeX Application
 
 # Import modules and classes
 
+from sys import argv, exit as exit_program
+
+# Compile without the GUI (e.g. main.py build file.tex), before the GUI's modules are even imported
+if __name__ == "__main__" and argv[1:2] == ["build"]:
+	from cli import main
+	exit_program(main(argv[2:]))
+# Print the latency percentiles of each project (e.g. main.py metrics)
+if __name__ == "__main__" and argv[1:2] == ["metrics"]:
+	from metrics import Metrics
+	print(Metrics.report(argv[2] if len(argv) > 2 else "../resources/metrics.jsonl"))
+	exit_program(0)
+
 from PyQt5.QtWidgets import QApplication
 
 from compile import Compile
@@ -22,6 +34,13 @@ if __name__ == "__main__":
 		app = QApplication([])
 		ex = App()
 		exit_code = app.exec_()
+		# Stop the live compiler and kill the compilers which are still on standby
+		ex.scheduler.close()
+		ex.engine_pool.close()
+		ex.raster_pool.close()
+		ex.editor_compiled.stop()
+		# Keep the session's latencies for the next sessions
+		ex.metrics.save()
 
 		# If the exit code is the restart exit code, then restart the app
 		if exit_code == ex.restart_code:
@@ -51,6 +70,5 @@ if __name__ == "__main__":
 		utils.set_settings(ex.settings)
 	except NameError:
 		pass
-	# Clean the compile cache
-	comp = Compile(False)
-	comp.clean()
+	# Clean the build directories of the compiles
+	Compile.clean_all()
@@ -5,8 +5,9 @@ classes, and other such objects
 which are useful for the menu and status bars.
 """
 from io import BytesIO
+from threading import Lock
 
-from PIL import Image
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal
 from PyQt5.QtGui import QFont
 from PyQt5.QtWidgets import QAction, QMenu
 from win32clipboard import OpenClipboard, EmptyClipboard, SetClipboardData, CloseClipboard, CF_DIB
@@ -15,18 +16,32 @@ from error import CatchError
 
 
 # noinspection PyCompatibility
-class Status:
+class Status(QObject):
 	"""
 	Class to assist in the few functions and methods
 	that are needed for the Status Bar to operate.
+	Updates may come from any thread. They are posted to
+	the GUI thread through a signal, and coalesced, so that
+	the Status Bar is repainted at most once per interval,
+	and only if its text changed.
 	"""
+	# Emitted whenever a status changes (from any thread, handled on the GUI thread)
+	changed = pyqtSignal()
 
 	def __init__(self, app_pointer):
+		super().__init__()
 		self.app_pointer = app_pointer
 		self.padding = self.app_pointer.settings["status_margin"]
 		self.spacing = self.app_pointer.settings["status_spacing"]
 		self.status_dict = dict()
 		self.status = str()
+		self.lock = Lock()
+		# Repaint once the interval since the first pending change passes (created on the GUI thread)
+		self.timer = QTimer()
+		self.timer.setSingleShot(True)
+		self.timer.setInterval(self.app_pointer.settings["status_interval"])
+		self.timer.timeout.connect(self.repaint)
+		self.changed.connect(self.schedule)
 
 	def init(self):
 		"""
@@ -70,6 +85,11 @@ class Status:
 			"Words": int(),
 			"Characters": int(),
 			"Compile Time": int(),
+			"Passes": 1,
+			"Scope": "Document",
+			"Cache Hits": "0/0",
+			"Reused Pages": "0/0",
+			"Render Time": "0 ms/page",
 			"Task": "Idling"
 		})
 
@@ -91,16 +111,41 @@ class Status:
 		:param status_update: A dictionary containing the Status Bar
 								elements to update, and their new values.
 		"""
-		self.set_status({**self.status_dict, **status_update})
+		# The tasks mark the stages of the pipeline, so keep them in the trace
+		if "Task" in status_update and getattr(self.app_pointer, "tracer", False):
+			self.app_pointer.tracer.instant(status_update["Task"])
+		with self.lock:
+			self.status_dict = {**self.status_dict, **status_update}
+		self.changed.emit()
 
 	@CatchError
 	def set_status(self, status_dict: dict):
 		"""
-		Calls on the Status Bar updater function
-		in order to repaint the text on the Status Bar.
+		Replaces all the data of the Status Bar.
+		The Status Bar is repainted on the GUI thread (see the .repaint() method).
 
 		:param status_dict: A dictionary containing all the data to set the Status Bar to.
 		"""
+		with self.lock:
+			self.status_dict = dict(status_dict)
+		self.changed.emit()
+
+	def schedule(self):
+		"""
+		Schedules a repaint of the Status Bar, unless one is already scheduled.
+		Called on the GUI thread by the changed signal.
+		"""
+		if not self.timer.isActive():
+			self.timer.start()
+
+	@CatchError
+	def repaint(self):
+		"""
+		Repaints the text on the Status Bar, if it changed since the last repaint.
+		Called on the GUI thread once the interval passes.
+		"""
+		with self.lock:
+			status_dict = dict(self.status_dict)
 		# Initialize all statuses
 		statuses = list()
 		# For each status, create it's sector
@@ -110,8 +155,11 @@ class Status:
 				spacing=self.spacing * " ",
 				data=data
 			))
-		self.status_dict = status_dict
-		self.status = self.padding * " " + str(self.padding * " " + "|" + self.padding * " ").join(statuses)
+		status = self.padding * " " + str(self.padding * " " + "|" + self.padding * " ").join(statuses)
+		# Repainting the same text would only make it flicker
+		if status == self.status:
+			return
+		self.status = status
 		self.app_pointer.status = self.status
 		self.app_pointer.status_bar_element.showMessage(self.app_pointer.status)
 
@@ -215,14 +263,16 @@ class Menu:
 		self.sub_menu.addAction(new_action)
 
 	@staticmethod
-	def copy_to_clipboard(live_compile_path):
+	def copy_to_clipboard(live_image):
 		"""
 		Copies the currently rendered live-compiled image to the clipboard.
 
-		:param live_compile_path: The path to the currently rendered live-compiled image.
+		:param live_image: The currently rendered live-compiled image, as a PIL image.
 		"""
-		# Use the Pillow library to open the image
-		image = Image.open(live_compile_path)
+		# If nothing was rendered yet, there's nothing to copy
+		if not live_image:
+			return
+		image = live_image
 		# Use the io stream to capture the after-header data (after first 14 for a BMP image)
 		output = BytesIO()
 		# Convert the image
@@ -0,0 +1,259 @@
+"""
+The Metrics file.
+Stores the Histogram class, which counts durations
+in buckets, and the Metrics class, which collects
+the latencies of the live pipeline per project and
+keeps them across sessions in a .jsonl file.
+"""
+from json import dumps, loads
+from os.path import exists
+from threading import Lock
+from time import time
+
+# The upper bounds (milliseconds) of the histograms' buckets, the last bucket holds everything above them
+BUCKETS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 20000, 60000]
+
+# The histograms, in the order they are shown
+HISTOGRAMS = {
+	"debounce": "Wait for edits",
+	"compile": "Compile",
+	"engine": "Engine",
+	"raster": "Rasterization",
+	"ui": "UI update"
+}
+
+
+class Histogram:
+	"""
+	The Histogram class counts durations in fixed buckets,
+	so that it takes the same space however many durations
+	it counts, and histograms of different sessions can be
+	added up. Percentiles are estimated by the bucket bounds.
+	"""
+
+	def __init__(self, counts=None, total=float()):
+		"""
+		:param counts: The count of each bucket (or None for an empty histogram).
+		:param total: The sum of all the durations counted (seconds).
+		"""
+		self.counts = list(counts) if counts else [int()] * (len(BUCKETS) + 1)
+		self.total = total
+
+	def observe(self, seconds):
+		"""
+		Counts a duration.
+
+		:param seconds: The duration (seconds).
+		"""
+		milliseconds = seconds * 1000
+		index = len(BUCKETS)
+		for bucket_index, bound in enumerate(BUCKETS):
+			if milliseconds <= bound:
+				index = bucket_index
+				break
+		self.counts[index] += 1
+		self.total += seconds
+
+	def count(self):
+		"""
+		Returns the amount of durations counted.
+		"""
+		return sum(self.counts)
+
+	def merge(self, other):
+		"""
+		Adds the counts of another histogram to this one.
+
+		:param other: The other Histogram object.
+		"""
+		self.counts = [count + other_count for count, other_count in zip(self.counts, other.counts)]
+		self.total += other.total
+
+	def percentile(self, fraction):
+		"""
+		Estimates a percentile of the durations, as the upper bound of the bucket it falls in.
+
+		:param fraction: The percentile, between 0 and 1.
+		:return: The bound (milliseconds), infinity if it's above all the bounds, or 0 if nothing was counted.
+		"""
+		rank = fraction * self.count()
+		seen = int()
+		for index, count in enumerate(self.counts):
+			seen += count
+			if count and seen >= rank:
+				return BUCKETS[index] if index < len(BUCKETS) else float("inf")
+		return int()
+
+	def to_dict(self):
+		"""
+		Returns the histogram as a dictionary (e.g. to dump it as JSON).
+		"""
+		return {"counts": self.counts, "total": self.total}
+
+	@staticmethod
+	def from_dict(data):
+		"""
+		Creates a histogram from a dictionary (see the .to_dict() method).
+		"""
+		return Histogram(data["counts"], data["total"])
+
+
+class Metrics:
+	"""
+	The Metrics class collects the histograms of the live pipeline's
+	stages, and the hits and misses of the caches, for each project.
+	At exit, the session's metrics are appended to a .jsonl file
+	(a line per project), which the viewer adds up across sessions.
+	"""
+
+	def __init__(self, path="../resources/metrics.jsonl"):
+		"""
+		:param path: The path to the metrics file.
+		"""
+		self.path = path
+		# The project which the metrics are counted for (set when switching projects)
+		self.project = str()
+		# The histograms and the [hits, misses] counters, by project and name
+		self.histograms = dict()
+		self.counters = dict()
+		self.lock = Lock()
+
+	def observe(self, name, seconds):
+		"""
+		Counts a duration of a stage, for the current project.
+
+		:param name: The name of the histogram (see HISTOGRAMS).
+		:param seconds: The duration (seconds).
+		"""
+		with self.lock:
+			self.histograms.setdefault(self.project, dict()).setdefault(name, Histogram()).observe(seconds)
+
+	def count(self, name, hits=int(), misses=int()):
+		"""
+		Counts lookups of a cache, for the current project.
+
+		:param name: The name of the cache.
+		:param hits: The amount of lookups which were found.
+		:param misses: The amount of lookups which weren't.
+		"""
+		with self.lock:
+			counter = self.counters.setdefault(self.project, dict()).setdefault(name, [int(), int()])
+			counter[0] += hits
+			counter[1] += misses
+
+	def save(self):
+		"""
+		Appends the session's metrics to the metrics file, and forgets them.
+		"""
+		with self.lock:
+			projects = sorted(set(self.histograms) | set(self.counters))
+			lines = [dumps({
+				"time": round(time()),
+				"project": project,
+				"histograms": {name: histogram.to_dict() for name, histogram in self.histograms.get(project, dict()).items()},
+				"counters": self.counters.get(project, dict())
+			}) for project in projects]
+			self.histograms = dict()
+			self.counters = dict()
+		if lines:
+			file = open(self.path, "a", encoding="utf-8")
+			file.write("\n".join(lines) + "\n")
+			file.close()
+
+	@staticmethod
+	def load(path):
+		"""
+		Adds up the metrics of all the sessions in a metrics file.
+
+		:param path: The path to the metrics file.
+		:return: A dictionary of projects to their histograms and counters (by name).
+		"""
+		projects = dict()
+		if not exists(path):
+			return projects
+		file = open(path, "r", encoding="utf-8")
+		for line in file:
+			if not line.strip():
+				continue
+			try:
+				session = loads(line)
+			except ValueError:
+				# A line cut short (e.g. by a crash) is skipped
+				continue
+			project = projects.setdefault(session["project"], {"histograms": dict(), "counters": dict()})
+			for name, data in session["histograms"].items():
+				project["histograms"].setdefault(name, Histogram()).merge(Histogram.from_dict(data))
+			for name, (hits, misses) in session["counters"].items():
+				counter = project["counters"].setdefault(name, [int(), int()])
+				counter[0] += hits
+				counter[1] += misses
+		file.close()
+		return projects
+
+	@staticmethod
+	def bound(milliseconds):
+		"""
+		Formats a percentile estimated by a histogram (see the Histogram.percentile() method).
+		"""
+		if milliseconds == float("inf"):
+			return ">{bound}".format(bound=BUCKETS[-1])
+		return "<={bound}".format(bound=milliseconds)
+
+	@staticmethod
+	def report(path, line_break="\n"):
+		"""
+		Summarizes a metrics file: the percentiles of each stage, and the hit ratio of each cache, for each project.
+
+		:param path: The path to the metrics file.
+		:param line_break: The string to separate lines with (e.g. "<br>" for a dialogue).
+		:return: The summary, as a string.
+		"""
+		lines = list()
+		for project, metrics in sorted(Metrics.load(path).items()):
+			lines.append(project or "(no project)")
+			for name, title in HISTOGRAMS.items():
+				histogram = metrics["histograms"].get(name)
+				if histogram and histogram.count():
+					lines.append("  {title}: p50 {p50} ms, p90 {p90} ms, p99 {p99} ms ({count}, mean {mean} ms)".format(
+						title=title,
+						p50=Metrics.bound(histogram.percentile(0.5)),
+						p90=Metrics.bound(histogram.percentile(0.9)),
+						p99=Metrics.bound(histogram.percentile(0.99)),
+						count=histogram.count(),
+						mean=round(histogram.total / histogram.count() * 1000)
+					))
+			for name, (hits, misses) in sorted(metrics["counters"].items()):
+				lines.append("  {name} hits: {hits}/{total} ({ratio}%)".format(
+					name=name.replace("_", " ").capitalize(),
+					hits=hits,
+					total=hits + misses,
+					ratio=round(hits / (hits + misses) * 100) if hits + misses else int()
+				))
+		return line_break.join(lines) or "No metrics were collected yet."
+
+
+def observe(app_pointer, name, seconds):
+	"""
+	Counts a duration of a stage, if the app collects metrics.
+
+	:param app_pointer: The app (or False).
+	:param name: The name of the histogram (see HISTOGRAMS).
+	:param seconds: The duration (seconds).
+	"""
+	metrics = getattr(app_pointer, "metrics", False)
+	if metrics:
+		metrics.observe(name, seconds)
+
+
+def count(app_pointer, name, hits=int(), misses=int()):
+	"""
+	Counts lookups of a cache, if the app collects metrics.
+
+	:param app_pointer: The app (or False).
+	:param name: The name of the cache.
+	:param hits: The amount of lookups which were found.
+	:param misses: The amount of lookups which weren't.
+	"""
+	metrics = getattr(app_pointer, "metrics", False)
+	if metrics:
+		metrics.count(name, hits, misses)
@@ -0,0 +1,166 @@
+"""
+The Pages file.
+Stores functions for fingerprinting the pages of
+a compiled .pdf file, and the PageCache class, which
+keeps the images of pages in memory, so that pages
+which didn't change are never converted again.
+"""
+from collections import OrderedDict
+from hashlib import sha1
+from threading import Lock
+
+try:
+	# noinspection PyUnresolvedReferences
+	from pypdf import PdfReader
+	from pypdf.generic import ArrayObject, DictionaryObject, IndirectObject, StreamObject
+except ImportError:
+	PdfReader = False
+
+# Keys which don't affect how a page looks, or which change whenever any other page
+# changes (font subsets grow as glyphs are used anywhere in the document)
+IGNORED_KEYS = {"/Parent", "/P", "/Length", "/Length1", "/Length2", "/Length3", "/Filter", "/DecodeParms",
+                "/FontFile", "/FontFile2", "/FontFile3", "/CIDSet", "/CharSet", "/W", "/Widths",
+                "/FirstChar", "/LastChar"}
+
+
+def fingerprint_pages(path, first_page, last_page):
+	"""
+	Fingerprints pages of a .pdf file by hashing their content streams
+	and the resources they use (fonts, images, forms, and so on).
+	Two pages with the same fingerprint are rendered identically.
+
+	:param path: The full path to the .pdf file.
+	:param first_page: The first page to fingerprint (starting from 1).
+	:param last_page: The last page to fingerprint.
+	:return: A list of the pages' fingerprints, or False if the file can't be fingerprinted.
+	"""
+	# Without a PDF parser, every page is considered as changed
+	if not PdfReader:
+		return False
+	try:
+		reader = PdfReader(path)
+		fingerprints = list()
+		for index in range(first_page - 1, last_page):
+			page = reader.pages[index]
+			digest = sha1()
+			digest.update(repr([float(value) for value in page.mediabox]).encode("utf-8"))
+			contents = page.get_contents()
+			if contents:
+				digest.update(contents.get_data())
+			hash_object(digest, page.get("/Resources"), set())
+			fingerprints.append(digest.hexdigest())
+		return fingerprints
+	except Exception as e:
+		print("REPORT THIS ASAP 7 | ", e.__dict__)
+		return False
+
+
+def read_page_info(path):
+	"""
+	Reads the amount of pages in a .pdf file and the size of its pages (the size of the first page).
+
+	:param path: The full path to the .pdf file.
+	:return: An array containing the amount of pages and the width and height of the
+	page in inches, or False if the file can't be read (or there is no PDF parser).
+	"""
+	if not PdfReader:
+		return False
+	try:
+		reader = PdfReader(path)
+		if not reader.pages:
+			return [int(), False]
+		box = reader.pages[0].mediabox
+		return [len(reader.pages), [float(box.width) / 72, float(box.height) / 72]]
+	except Exception as e:
+		print("REPORT THIS ASAP 12 | ", e.__dict__)
+		return False
+
+
+def hash_object(digest, pdf_object, visited):
+	"""
+	Feeds a PDF object (and all the objects it references) into a hash.
+
+	:param digest: The hash object to update.
+	:param pdf_object: The PDF object to hash.
+	:param visited: A set of the indirect objects which were already hashed (to avoid cycles).
+	"""
+	# Follow references, but only once each
+	if isinstance(pdf_object, IndirectObject):
+		if (pdf_object.idnum, pdf_object.generation) in visited:
+			return
+		visited.add((pdf_object.idnum, pdf_object.generation))
+		pdf_object = pdf_object.get_object()
+	if isinstance(pdf_object, StreamObject):
+		digest.update(b"stream")
+		digest.update(pdf_object.get_data())
+	if isinstance(pdf_object, DictionaryObject):
+		digest.update(b"<<")
+		for key in sorted(pdf_object.keys()):
+			if key in IGNORED_KEYS:
+				continue
+			digest.update(key.encode("utf-8"))
+			value = pdf_object.raw_get(key)
+			# Subset tags (e.g. ABCDEF+LMRoman10) change along with the subset, the font itself doesn't
+			if key in ["/BaseFont", "/FontName"]:
+				digest.update(str(value).split("+")[-1].encode("utf-8"))
+			else:
+				hash_object(digest, value, visited)
+		digest.update(b">>")
+	elif isinstance(pdf_object, ArrayObject):
+		digest.update(b"[")
+		for value in pdf_object:
+			hash_object(digest, value, visited)
+		digest.update(b"]")
+	elif not isinstance(pdf_object, StreamObject):
+		digest.update(repr(pdf_object).encode("utf-8"))
+
+
+class PageCache:
+	"""
+	The PageCache class keeps the images of converted pages
+	in memory, so that they can be displayed without being
+	converted again. Pages are stored both by their location
+	(the .pdf file and page number) and by their fingerprint.
+	Once the cache is full, the least recently used page is evicted.
+	"""
+
+	def __init__(self, size=64):
+		self.size = size
+		self.entries = OrderedDict()
+		self.lock = Lock()
+
+	@staticmethod
+	def key(*parts):
+		"""
+		Builds the key of a page image.
+
+		:param parts: Whatever identifies the image, e.g. ("fingerprint", fingerprint, quality).
+		:return: The key, as a string.
+		"""
+		return "|".join([str(part) for part in parts])
+
+	def get(self, key):
+		"""
+		Looks up a page image, and marks it as recently used.
+
+		:param key: The key of the image (see the .key() method).
+		:return: The PIL image, or False if it isn't cached.
+		"""
+		with self.lock:
+			if key not in self.entries:
+				return False
+			self.entries.move_to_end(key)
+			return self.entries[key]
+
+	def put(self, key, image):
+		"""
+		Stores a page image, evicting the least recently used images if the cache is full.
+
+		:param key: The key of the image (see the .key() method).
+		:param image: The PIL image.
+		"""
+		with self.lock:
+			self.entries[key] = image
+			self.entries.move_to_end(key)
+			while len(self.entries) > self.size:
+				self.entries.popitem(last=False)
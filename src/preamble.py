@@ -0,0 +1,130 @@
+"""
+The Preamble file.
+Stores the FormatCache class, which dumps
+the preamble of a project into a precompiled
+format file, so that live compiles only
+have to typeset the document body.
+"""
+from hashlib import sha1
+from os import listdir, makedirs
+from os.path import abspath, exists, getmtime, join, splitext
+from subprocess import DEVNULL
+from threading import Thread, Lock
+
+from compile import Compile
+from utility import Utility
+
+
+class FormatCache:
+	"""
+	The FormatCache class keeps precompiled format
+	files (.fmt) of preambles, keyed by a hash of the
+	preamble's code. Formats are built in the background
+	with the mylatexformat package, so the compiler can
+	load every \\usepackage at once instead of parsing
+	the preamble again on every live compile.
+	"""
+
+	def __init__(self, directory="../cache/formats", engine="xelatex", keep=5):
+		self.directory = directory
+		self.engine = engine
+		self.keep = keep
+		# Keys of formats which are currently being built, or which failed to build
+		self.building = set()
+		self.failed = set()
+		self.lock = Lock()
+
+	def key(self, preamble):
+		"""
+		Hashes a preamble (along with the engine that dumps it).
+
+		:param preamble: The LaTeX code before \\begin{document}.
+		:return: The hex digest identifying the preamble's format.
+		"""
+		return sha1("{engine}\n{preamble}".format(
+			engine=self.engine,
+			preamble=preamble
+		).encode("utf-8")).hexdigest()
+
+	def get(self, preamble):
+		"""
+		Returns the format of a preamble. If the format was not
+		built yet, a background build is started for it.
+
+		:param preamble: The LaTeX code before \\begin{document}.
+		:return: The absolute path to the format (without the .fmt extension),
+		or False if there isn't a usable format for the preamble yet.
+		"""
+		# There's nothing to dump if the document has no preamble
+		if not preamble.strip():
+			return False
+		key = self.key(preamble)
+		fmt_path = abspath(join(self.directory, key))
+		# If the format was already dumped, then use it
+		if exists(fmt_path + ".fmt"):
+			return fmt_path
+		with self.lock:
+			# Don't build the same preamble twice, and don't retry preambles that can't be dumped
+			if key in self.building or key in self.failed:
+				return False
+			self.building.add(key)
+		# Build the format in the background, the current compile will run without it
+		builder = Thread(target=self.build, args=[preamble, key])
+		builder.setDaemon(True)
+		builder.start()
+		return False
+
+	def build(self, preamble, key):
+		"""
+		Dumps a preamble into a format file named after its key.
+
+		:param preamble: The LaTeX code before \\begin{document}.
+		:param key: The hash of the preamble (see the .key() method).
+		"""
+		try:
+			makedirs(self.directory, exist_ok=True)
+			# Write the preamble to its own file, so that edits to
+			# the project can't change it while the format is dumped
+			source_path = abspath(join(self.directory, "{key}.tex".format(key=key)))
+			file = open(source_path, "w", encoding="utf-8")
+			file.write("{preamble}\\begin{{document}}\n\\end{{document}}\n".format(preamble=preamble))
+			file.close()
+			# Dump everything up to \begin{document} into <key>.fmt
+			proc = Compile.spawn([
+				self.engine,
+				'-ini',
+				'-interaction=batchmode',
+				'-job-name={key}'.format(key=key),
+				'-output-directory={dir}'.format(dir=abspath(self.directory)),
+				'&{engine}'.format(engine=self.engine),
+				'mylatexformat.ltx',
+				source_path
+			], stdout=DEVNULL, stderr=DEVNULL)
+			proc.wait()
+			# Some preambles can't be dumped (e.g. native fonts in XeTeX), so remember them
+			if not exists(join(self.directory, "{key}.fmt".format(key=key))):
+				with self.lock:
+					self.failed.add(key)
+			self.prune()
+		except OSError:
+			with self.lock:
+				self.failed.add(key)
+		finally:
+			with self.lock:
+				self.building.discard(key)
+
+	def prune(self):
+		"""
+		Deletes all but the most recently built formats,
+		so that old preambles don't pile up on the disk.
+		"""
+		formats = [file for file in listdir(self.directory) if file.endswith(".fmt")]
+		formats.sort(key=lambda file: getmtime(join(self.directory, file)), reverse=True)
+		# For each format that is too old to keep
+		for file in formats[self.keep:]:
+			# Delete it and the files generated alongside it
+			for ext in ["fmt", "tex", "log"]:
+				Utility.safe_remove(join(self.directory, "{key}.{ext}".format(
+					key=splitext(file)[0],
+					ext=ext
+				)))
@@ -0,0 +1,607 @@
+"""
+The Preview file.
+Stores the TileCache class, which keeps tiles of
+converted pages in memory within a budget, and the
+Preview class, the widget which displays the pages
+of the live document, and which can be scrolled,
+zoomed and panned.
+"""
+from collections import OrderedDict
+from math import ceil, floor, log2
+from threading import Thread, Condition, Lock
+
+from PyQt5.QtCore import Qt, QPointF, QRectF, pyqtSignal
+from PyQt5.QtGui import QImage, QPainter
+from PyQt5.QtWidgets import QWidget
+
+from compile import Compile
+from raster import select_rasterizer
+
+# The width and height of a tile, in pixels
+TILE_SIZE = 256
+
+# The gap between pages, in inches
+PAGE_GAP = 0.1
+
+# The amount of pages around the visible ones whose images are kept in memory
+KEEP_PAGES = 2
+
+
+def to_qimage(image):
+	"""
+	Wraps the pixels of a PIL image in a QImage, without encoding
+	the image, writing it to the disk, or copying the pixels again.
+
+	:param image: The PIL image.
+	:return: The QImage (which keeps its pixels alive, so it can outlive the PIL image).
+	"""
+	if image.mode != "RGB":
+		image = image.convert("RGB")
+	data = image.tobytes("raw", "RGB")
+	qimage = QImage(data, image.width, image.height, 3 * image.width, QImage.Format_RGB888)
+	# The QImage only points to the pixels, so keep them alive along with it
+	qimage.pixels = data
+	return qimage
+
+
+class TileCache:
+	"""
+	The TileCache class keeps the tiles of zoomed-in pages in memory,
+	so that panning and zooming back and forth never converts a tile twice.
+	Once the tiles exceed the memory budget, the least recently used
+	tiles are evicted.
+	"""
+
+	def __init__(self, budget=64 * 1024 * 1024):
+		"""
+		:param budget: The most memory (bytes) the tiles can take.
+		"""
+		self.budget = budget
+		self.used = int()
+		self.entries = OrderedDict()
+		self.lock = Lock()
+
+	@staticmethod
+	def key(*parts):
+		"""
+		Builds the key of a tile.
+
+		:param parts: Whatever identifies the tile, e.g. (.pdf path, page, DPI, column, row).
+		:return: The key, as a string.
+		"""
+		return "|".join([str(part) for part in parts])
+
+	def get(self, key):
+		"""
+		Looks up a tile, and marks it as recently used.
+
+		:param key: The key of the tile (see the .key() method).
+		:return: The QImage, or False if it isn't cached.
+		"""
+		with self.lock:
+			if key not in self.entries:
+				return False
+			self.entries.move_to_end(key)
+			return self.entries[key]
+
+	def put(self, key, image):
+		"""
+		Stores a tile, evicting the least recently used tiles if the budget is exceeded.
+
+		:param key: The key of the tile (see the .key() method).
+		:param image: The QImage.
+		"""
+		with self.lock:
+			if key in self.entries:
+				self.used -= self.entries.pop(key).byteCount()
+			self.entries[key] = image
+			self.used += image.byteCount()
+			while self.used > self.budget and len(self.entries) > 1:
+				self.used -= self.entries.popitem(last=False)[1].byteCount()
+
+	def clear(self):
+		"""
+		Evicts all the tiles.
+		"""
+		with self.lock:
+			self.entries.clear()
+			self.used = int()
+
+
+class Preview(QWidget):
+	"""
+	The Preview class displays the pages of the live document,
+	stacked from top to bottom and fitted to the widget's width.
+	It is virtualized: only the pages near the visible ones have
+	their images in memory, pages further away are freed, and
+	pages are converted (on a thread of their own) only once
+	they are visible, or right above or below the visible ones.
+
+	Once zoomed in, pages are drawn from tiles, which are converted
+	at power-of-2 zoom levels. Until a page (or tile) is ready, the
+	previous image of it is drawn stretched in its place.
+
+	The mouse wheel scrolls, Ctrl + mouse wheel zooms around the
+	cursor, dragging pans, and double clicking fits the pages again.
+	Clicking a page emits the clicked signal (to jump to the source code),
+	and the page under the editor's cursor can be shown with .show_place().
+	"""
+	# Emitted (from the preview's thread) whenever new pages or tiles are ready
+	tiles_ready = pyqtSignal()
+	# Emitted when a page is clicked, with the page number and the place (inches from the page's top-left corner)
+	clicked = pyqtSignal(int, float, float)
+
+	def __init__(self, app_pointer, background=False):
+		"""
+		:param app_pointer: The app, whose settings are used.
+		:param background: The background color of the widget (as a hex string), or False.
+		"""
+		super().__init__(app_pointer)
+		self.app_pointer = app_pointer
+		if background:
+			self.setAttribute(Qt.WA_StyledBackground, True)
+			self.setStyleSheet("background-color: {bgColor};".format(
+				bgColor=app_pointer.utils.hex_format(background)
+			))
+		self.tile_cache = TileCache(app_pointer.settings["preview_memory"] * 1024 * 1024)
+
+		# The displayed document: its .pdf, amount of pages, and page size (inches)
+		self.pdf_path = False
+		self.page_count = int()
+		self.page_size = False
+		# The images of the pages near the visible ones, as page numbers to [.pdf path, QImage] pairs
+		self.images = dict()
+		self.lock = Lock()
+		# The zoom (1 is fitted to the widget's width), the scroll, and the horizontal pan
+		self.zoom = 1.0
+		self.scroll = float()
+		self.pan = float()
+		self.drag_start = False
+		self.drag_from = [float(), float()]
+		# The page under the editor's cursor (converted before the other pages), or 0
+		self.focus_page = int()
+
+		# The work requested from the preview's thread, and the pages or tiles which couldn't be converted
+		self.pending = list()
+		self.requested = set()
+		self.running = False
+		self.failed = set()
+		self.stopped = False
+		self.condition = Condition()
+		self.tiles_ready.connect(self.update)
+		self.worker = Thread(target=self.work)
+		self.worker.setDaemon(True)
+		self.worker.start()
+
+	def set_document(self, pdf_path, page_count, page_size, page, image):
+		"""
+		Displays a (newly compiled) document. The scroll, zoom and pan
+		are kept, so that editing doesn't lose the user's place. The
+		images of the previous document are displayed until the pages
+		are converted again.
+
+		:param pdf_path: The full path to the compiled .pdf file.
+		:param page_count: The amount of pages in the document.
+		:param page_size: The width and height of the pages in inches, or False if they're unknown.
+		:param page: The number of the page which was already converted (starting from 1).
+		:param image: The image of that page (a PIL image).
+		"""
+		if pdf_path != self.pdf_path:
+			self.failed = set()
+		self.pdf_path = pdf_path
+		self.page_count = page_count
+		# Without the page's size, assume the image's proportions at 72 DPI
+		self.page_size = page_size or [image.width / 72, image.height / 72]
+		with self.lock:
+			self.images[page] = [pdf_path, to_qimage(image)]
+		self.clamp()
+		self.update()
+
+	def clear(self):
+		"""
+		Stops displaying the document.
+		"""
+		self.pdf_path = False
+		self.page_count = int()
+		with self.lock:
+			self.images = dict()
+		self.update()
+
+	def scale(self):
+		"""
+		Returns the scale (logical pixels per inch) the pages are drawn at.
+		"""
+		return self.width() / self.page_size[0] * self.zoom
+
+	def stride(self):
+		"""
+		Returns the distance between the tops of two pages, in logical pixels.
+		"""
+		return (self.page_size[1] + PAGE_GAP) * self.scale()
+
+	def page_rect(self, page):
+		"""
+		Returns the rectangle a page is drawn in, in the widget's coordinates.
+
+		:param page: The page number (starting from 1).
+		"""
+		width = self.page_size[0] * self.scale()
+		return QRectF(
+			(self.width() - width) / 2 + self.pan,
+			(page - 1) * self.stride() - self.scroll,
+			width,
+			self.page_size[1] * self.scale()
+		)
+
+	def visible_pages(self):
+		"""
+		Returns the first and last pages which are (at least partly) visible.
+		"""
+		first_page = int(self.scroll // self.stride()) + 1
+		last_page = int((self.scroll + self.height()) // self.stride()) + 1
+		return [min(first_page, self.page_count), min(last_page, self.page_count)]
+
+	def current_page(self):
+		"""
+		Returns the page at the middle of the widget.
+		"""
+		return max(1, min(int((self.scroll + self.height() / 2) // self.stride()) + 1, self.page_count))
+
+	def scroll_to(self, page, position=float()):
+		"""
+		Scrolls a page into view.
+
+		:param page: The page number (starting from 1).
+		:param position: The point of the page to show at the top of the widget, in inches from the page's top.
+		"""
+		if not self.pdf_path:
+			return
+		self.scroll = (page - 1) * self.stride() + position * self.scale()
+		self.clamp()
+		self.update()
+
+	def show_place(self, page, top):
+		"""
+		Makes a page the focus page, and scrolls to a place on it (unless it is visible already).
+
+		:param page: The page number (starting from 1).
+		:param top: The place's distance from the page's top (inches).
+		"""
+		if not self.pdf_path or not 1 <= page <= self.page_count:
+			return
+		self.focus_page = page
+		y = (page - 1) * self.stride() + top * self.scale()
+		if not self.scroll <= y <= self.scroll + self.height() - self.scale():
+			# Leave some of what comes before the place in view
+			self.scroll_to(page, max(float(), top - 1))
+		self.update()
+
+	def place_at(self, point):
+		"""
+		Finds the place under a point of the widget.
+
+		:param point: The point, in the widget's coordinates.
+		:return: The page number, and the place's distance from the page's left and top (inches).
+		"""
+		page = max(1, min(int((point.y() + self.scroll) // self.stride()) + 1, self.page_count))
+		rect = self.page_rect(page)
+		return [page, (point.x() - rect.x()) / self.scale(), (point.y() - rect.y()) / self.scale()]
+
+	def clamp(self):
+		"""
+		Limits the scroll to the document, and the pan so that
+		a zoomed-in page always covers the widget's width.
+		"""
+		if not self.page_size or not self.page_count:
+			return
+		height = self.page_count * self.stride() - PAGE_GAP * self.scale()
+		self.scroll = min(max(self.scroll, float()), max(float(), height - self.height()))
+		limit = max(float(), (self.page_size[0] * self.scale() - self.width()) / 2)
+		self.pan = min(max(self.pan, -limit), limit)
+
+	def tile_dpi(self):
+		"""
+		Returns the DPI of the tiles for the current zoom. The zoom is rounded up
+		to a power of 2, so that tiles are reused across nearby zooms.
+		"""
+		level = min(ceil(log2(self.zoom)), ceil(log2(self.app_pointer.settings["preview_max_zoom"])))
+		return int(round(self.width() / self.page_size[0] * self.devicePixelRatioF() * 2 ** level))
+
+	def paintEvent(self, event):
+		"""
+		Draws the visible pages, frees the pages far from them,
+		and requests the pages and tiles which aren't ready yet.
+		"""
+		if not self.pdf_path or not self.page_count:
+			return
+		painter = QPainter(self)
+		painter.setRenderHint(QPainter.SmoothPixmapTransform)
+		first_page, last_page = self.visible_pages()
+		dpi = self.tile_dpi() if self.zoom > 1 else int()
+		work = list()
+		missing_pages = list()
+
+		for page in range(first_page, last_page + 1):
+			rect = self.page_rect(page)
+			with self.lock:
+				entry = self.images.get(page, False)
+			# Draw the page's image, or a blank page until it's converted
+			if entry:
+				painter.drawImage(rect, entry[1])
+			else:
+				painter.fillRect(rect, Qt.white)
+			if not entry or entry[0] != self.pdf_path:
+				missing_pages.append(page)
+			# Draw the tiles of a zoomed-in page which are ready
+			elif dpi:
+				missing = self.draw_tiles(painter, page, rect, dpi)
+				if missing:
+					work.append(["tiles", self.pdf_path, page, dpi, missing,
+					             [int(self.page_size[0] * dpi), int(self.page_size[1] * dpi)]])
+		painter.end()
+
+		# Prefetch the pages right above and below the visible ones
+		for page in [first_page - 1, last_page + 1]:
+			with self.lock:
+				entry = self.images.get(page, False)
+			if 1 <= page <= self.page_count and (not entry or entry[0] != self.pdf_path):
+				missing_pages.append(page)
+
+		# Free the images of pages far from the visible ones
+		with self.lock:
+			for page in list(self.images):
+				if page < first_page - KEEP_PAGES or page > last_page + KEEP_PAGES:
+					del self.images[page]
+
+		# The live compiler converts the page under the cursor first (or the page in the middle), on its own,
+		# and the rest of the missing pages are converted in runs, which the app's raster pool spreads across the cores
+		self.app_pointer.page_index = self.focus_page or self.current_page()
+		if self.focus_page in missing_pages:
+			missing_pages.remove(self.focus_page)
+			work.append(["pages", self.pdf_path, self.focus_page, self.focus_page])
+		for run_first, run_last in Compile.page_runs(sorted(missing_pages)):
+			work.append(["pages", self.pdf_path, run_first, run_last])
+		work.sort(key=lambda item: item[2] != self.focus_page)
+		self.request(work)
+
+	def draw_tiles(self, painter, page, rect, dpi):
+		"""
+		Draws the visible tiles of a zoomed-in page which are ready.
+
+		:param painter: The QPainter of the widget.
+		:param page: The page number (starting from 1).
+		:param rect: The rectangle the page is drawn in.
+		:param dpi: The DPI of the tiles.
+		:return: A list of [column, row] pairs of the visible tiles which aren't ready.
+		"""
+		# Logical pixels per pixel of the tiles
+		ratio = rect.width() / (self.page_size[0] * dpi)
+		columns = range(
+			max(0, floor(-rect.x() / ratio / TILE_SIZE)),
+			min(ceil(self.page_size[0] * dpi / TILE_SIZE), ceil((self.width() - rect.x()) / ratio / TILE_SIZE))
+		)
+		rows = range(
+			max(0, floor(-rect.y() / ratio / TILE_SIZE)),
+			min(ceil(self.page_size[1] * dpi / TILE_SIZE), ceil((self.height() - rect.y()) / ratio / TILE_SIZE))
+		)
+		missing = list()
+		for row in rows:
+			for column in columns:
+				key = self.tile_cache.key(self.pdf_path, page, dpi, column, row)
+				tile = self.tile_cache.get(key)
+				if tile:
+					painter.drawImage(QRectF(
+						rect.x() + column * TILE_SIZE * ratio,
+						rect.y() + row * TILE_SIZE * ratio,
+						tile.width() * ratio,
+						tile.height() * ratio
+					), tile)
+				elif key not in self.failed:
+					missing.append([column, row])
+		return missing
+
+	@staticmethod
+	def work_key(work):
+		"""
+		Builds the key of a page or tiles request, to tell whether it was already requested.
+
+		:param work: The request, as ["pages", .pdf path, first page, last page]
+		or ["tiles", .pdf path, page, DPI, tiles, page size].
+		:return: The key, as a string.
+		"""
+		return TileCache.key(*work[:4], work[4] if len(work) > 4 else str())
+
+	def request(self, work):
+		"""
+		Replaces the work of the preview's thread (unless all of it was already requested).
+
+		:param work: A list of requests, in order of priority (see the .work_key() method).
+		"""
+		keys = {self.work_key(item) for item in work if self.work_key(item) not in self.failed}
+		if self.running:
+			keys.discard(self.work_key(self.running))
+		if not keys or keys <= self.requested:
+			return
+		self.requested = keys
+		with self.condition:
+			self.pending = [item for item in work if self.work_key(item) in keys]
+			self.condition.notify()
+
+	def work(self):
+		"""
+		The preview's thread's loop. Converts the requested pages and tiles, in order.
+		"""
+		while True:
+			with self.condition:
+				while not self.stopped and not self.pending:
+					self.condition.wait()
+				if self.stopped:
+					return
+				self.running = self.pending.pop(0)
+			try:
+				if self.running[0] == "pages":
+					self.render_pages(*self.running[1:])
+				else:
+					self.render_tiles(*self.running[1:])
+			except Exception as e:
+				print("REPORT THIS ASAP 11 | ", e.__dict__)
+			# The next paint requests whatever is still missing
+			self.running = False
+			self.requested = set()
+			self.tiles_ready.emit()
+
+	def render_pages(self, pdf_path, first_page, last_page):
+		"""
+		Converts a run of pages (through the app's page cache and raster pool), at the quality of the live page.
+		Each page is displayed as soon as it's converted.
+
+		:param pdf_path: The full path to the compiled .pdf file.
+		:param first_page: The first page to convert (starting from 1).
+		:param last_page: The last page to convert.
+		"""
+		def show(page, image):
+			# The document may have been compiled again in the meantime
+			if pdf_path == self.pdf_path:
+				with self.lock:
+					self.images[page] = [pdf_path, to_qimage(image)]
+				self.tiles_ready.emit()
+
+		images = Compile(self.app_pointer).render(
+			pdf_path,
+			quality=self.app_pointer.live_dpi(self.page_size),
+			first_page=first_page,
+			last_page=last_page,
+			on_page=show
+		)
+		if not images:
+			self.failed.add(self.work_key(["pages", pdf_path, first_page, last_page]))
+		# The pages taken from the cache weren't shown yet
+		for page, image in images.items():
+			with self.lock:
+				entry = self.images.get(page, False)
+			if not entry or entry[0] != pdf_path:
+				show(page, image)
+
+	def render_tiles(self, pdf_path, page, dpi, tiles, page_pixels):
+		"""
+		Converts the region which holds the requested tiles (and a tile around
+		them, in case the page is panned), and splits it into tiles.
+
+		:param pdf_path: The full path to the compiled .pdf file.
+		:param page: The page number (starting from 1).
+		:param dpi: The DPI of the tiles.
+		:param tiles: A list of [column, row] pairs of the requested tiles.
+		:param page_pixels: The width and height of the page at that DPI, in pixels.
+		"""
+		first_column = max(0, min([column for column, row in tiles]) - 1)
+		first_row = max(0, min([row for column, row in tiles]) - 1)
+		last_column = min(ceil(page_pixels[0] / TILE_SIZE) - 1, max([column for column, row in tiles]) + 1)
+		last_row = min(ceil(page_pixels[1] / TILE_SIZE) - 1, max([row for column, row in tiles]) + 1)
+		box = (
+			first_column * TILE_SIZE,
+			first_row * TILE_SIZE,
+			min(page_pixels[0], (last_column + 1) * TILE_SIZE),
+			min(page_pixels[1], (last_row + 1) * TILE_SIZE)
+		)
+		rasterizer = select_rasterizer(self.app_pointer.settings.get("raster_backend", "auto"), pdf_path)
+		region = rasterizer.render_region(pdf_path, dpi, page, box)
+
+		for row in range(first_row, last_row + 1):
+			for column in range(first_column, last_column + 1):
+				key = self.tile_cache.key(pdf_path, page, dpi, column, row)
+				left = column * TILE_SIZE - box[0]
+				top = row * TILE_SIZE - box[1]
+				if not region or left >= region.width or top >= region.height:
+					self.failed.add(key)
+					continue
+				self.tile_cache.put(key, to_qimage(region.crop((
+					left,
+					top,
+					min(left + TILE_SIZE, region.width),
+					min(top + TILE_SIZE, region.height)
+				))))
+
+	def zoom_at(self, point, factor):
+		"""
+		Zooms in or out, keeping the point under the cursor in place.
+
+		:param point: The point to zoom around, in the widget's coordinates.
+		:param factor: The factor to multiply the zoom by.
+		"""
+		# The point, in inches from the document's top and the pages' left edge
+		document_x = (point.x() - self.page_rect(1).x()) / self.scale()
+		document_y = (point.y() + self.scroll) / self.scale()
+		self.zoom = min(max(self.zoom * factor, 1.0), self.app_pointer.settings["preview_max_zoom"])
+		self.pan = point.x() - document_x * self.scale() - (self.width() - self.page_size[0] * self.scale()) / 2
+		self.scroll = document_y * self.scale() - point.y()
+		self.clamp()
+		self.update()
+
+	def wheelEvent(self, event):
+		"""
+		Scrolls, or zooms (with Ctrl).
+		"""
+		if not self.pdf_path:
+			return
+		if event.modifiers() & Qt.ControlModifier:
+			# A notch of the wheel zooms by a quarter
+			self.zoom_at(QPointF(event.pos()), 2 ** (event.angleDelta().y() / 480))
+		else:
+			self.scroll -= event.angleDelta().y()
+			self.pan += event.angleDelta().x()
+			self.focus_page = int()
+			self.clamp()
+			self.update()
+
+	def mousePressEvent(self, event):
+		"""
+		Starts dragging the pages.
+		"""
+		if event.button() == Qt.LeftButton:
+			self.drag_start = QPointF(event.pos())
+			self.drag_from = [self.pan, self.scroll]
+
+	def mouseMoveEvent(self, event):
+		"""
+		Pans and scrolls the pages while they are dragged.
+		"""
+		if self.drag_start and self.pdf_path:
+			if (QPointF(event.pos()) - self.drag_start).manhattanLength() >= 4:
+				self.focus_page = int()
+			self.pan = self.drag_from[0] + event.pos().x() - self.drag_start.x()
+			self.scroll = self.drag_from[1] - (event.pos().y() - self.drag_start.y())
+			self.clamp()
+			self.update()
+
+	def mouseReleaseEvent(self, event):
+		"""
+		Stops dragging the pages, or emits the clicked signal if the pages weren't dragged.
+		"""
+		if self.drag_start and self.pdf_path and (QPointF(event.pos()) - self.drag_start).manhattanLength() < 4:
+			self.clicked.emit(*self.place_at(QPointF(event.pos())))
+		self.drag_start = False
+
+	def mouseDoubleClickEvent(self, event):
+		"""
+		Fits the pages to the widget's width again, keeping the middle page in view.
+		"""
+		if not self.pdf_path:
+			return
+		page = self.current_page()
+		self.zoom = 1.0
+		self.pan = float()
+		self.scroll_to(page)
+
+	def resizeEvent(self, event):
+		"""
+		Keeps the pages in bounds when the widget is resized.
+		"""
+		self.clamp()
+
+	def stop(self):
+		"""
+		Stops the preview's thread.
+		"""
+		with self.condition:
+			self.stopped = True
+			self.condition.notify()
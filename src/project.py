@@ -2,7 +2,35 @@
 The Project file.
 Used to store the Project class.
 """
-from os.path import exists, split
+from os.path import exists, split, splitext
+from re import compile as compile_regex
+
+# A sectioning command at the start of a line, e.g. "\section{Results}" or "\chapter*{Preface}"
+SECTION_PATTERN = compile_regex(r"^\s*\\(part|chapter|section|subsection|subsubsection)(\*?)\s*[\[{]")
+
+# The depth of each sectioning command (deeper commands are numbered within shallower ones)
+SECTION_LEVELS = ["part", "chapter", "section", "subsection", "subsubsection"]
+
+# The start and end of an environment
+ENVIRONMENT_PATTERN = compile_regex(r"\\(begin|end)\{([^}]+)\}")
+
+# A comment (a % which isn't escaped)
+COMMENT_PATTERN = compile_regex(r"(?<!\\)%.*$")
+
+# Put right before the \end{document} of an extract, writes the value of every counter (the same
+# counters \include checkpoints, including the page) to the .aux file, for the next extract to start from
+COUNTER_RECORDER = "\\clearpage\\makeatletter\\def\\@elt#1{\\immediate\\write\\@mainaux{\\string\\@gobble" \
+                   "{ABUELA-COUNTER=#1=\\the\\value{#1}}}}\\cl@@ckpt\\makeatother"
+
+# A counter written by the recorder, e.g. "\@gobble{ABUELA-COUNTER=page=12}"
+COUNTER_PATTERN = compile_regex(r"\\@gobble\{ABUELA-COUNTER=([^=}]+)=(-?\d+)\}")
+
+# A reference or a citation, e.g. "\eqref{eq:energy}" or "\citep[p. 4]{knuth,lamport}"
+REFERENCE_PATTERN = compile_regex(r"\\[A-Za-z]*(?:ref|cite[A-Za-z]*)\*?\s*(?:\[[^\]]*\]\s*)*\{([^}]*)\}")
+
+# A label or a bibliography entry in the .aux file, e.g. "\newlabel{eq:energy}{{3}{12}}" (the part
+# after an @ belongs to the same label, e.g. "\newlabel{eq:energy@cref}" of cleveref)
+AUX_LABEL_PATTERN = compile_regex(r"^\\(?:newlabel|bibcite)\{([^}@]*)")
 
 
 class Project:
@@ -20,6 +48,9 @@ class Project:
 		self.data = str()
 		self.preamble = str()
 		self.peroration = str()
+		# The name of the file which excerpts of the project are compiled from (see the .excerpt() method),
+		# it's written into a build directory, so that nothing is added next to the project's file
+		self.excerpt_name = "{name}.excerpt.tex".format(name=splitext(self.name)[0])
 
 	def unload(self):
 		"""
@@ -40,6 +71,198 @@ class Project:
 		self.preamble = """\\documentclass[12pt]{article}\n\\begin{document}"""
 		self.peroration = """\n\\end{document}"""
 
+	def split(self, text=None):
+		"""
+		Splits LaTeX code into the preamble (everything before \\begin{document})
+		and the peroration (everything after \\end{document}), and stores them.
+
+		:param text: The LaTeX code to split. Defaults to the Project's data.
+		:return: The preamble, as a string (empty if there is no \\begin{document}).
+		"""
+		if text is None:
+			text = self.data
+		# Everything before the document body is the preamble
+		if "\\begin{document}" in text:
+			self.preamble = text.split("\\begin{document}")[0]
+		else:
+			self.preamble = str()
+		# Everything after the document body is the peroration
+		if "\\end{document}" in text:
+			self.peroration = text.split("\\end{document}")[-1]
+		else:
+			self.peroration = str()
+		return self.preamble
+
+	def excerpt(self, line, text=None):
+		"""
+		Extracts the part of the document around a line: the innermost section
+		containing the line (extended to whole environments, so that it compiles),
+		along with the preamble. Everything else in the document body is blanked
+		out, so that the excerpt's line numbers are the same as the document's,
+		and the section counters are set to what they'd be in the whole document.
+
+		:param line: The line number (starting from 1), usually the editor's cursor.
+		:param text: The LaTeX code. Defaults to the Project's data.
+		:return: An array containing the excerpt's code, and its first and last lines,
+		or False if the line isn't in the document body, or the excerpt is most of the body anyways.
+		"""
+		if text is None:
+			text = self.data
+		lines = text.split("\n")
+		begin_index = next((index for index, code in enumerate(lines) if "\\begin{document}" in code), -1)
+		end_index = next((index for index, code in enumerate(lines) if "\\end{document}" in code), -1)
+		cursor_index = line - 1
+		if not begin_index < cursor_index < end_index:
+			return False
+
+		# Find the sectioning commands in the body
+		sections = list()
+		for index in range(begin_index + 1, end_index):
+			match = SECTION_PATTERN.match(lines[index])
+			if match:
+				sections.append([index, SECTION_LEVELS.index(match.group(1)), bool(match.group(2))])
+		# Start at the last one before the line, and stop at the next one which is as shallow
+		before = [section for section in sections if section[0] <= cursor_index]
+		start = before[-1][0] if before else begin_index + 1
+		level = before[-1][1] if before else len(SECTION_LEVELS)
+		end = next((section[0] for section in sections if section[0] > cursor_index and section[1] <= level), end_index)
+
+		# Extend the excerpt to whole environments
+		stack = list()
+		opened = dict()
+		for index in range(begin_index + 1, end_index):
+			if index == start and stack:
+				start = opened[0]
+			if index >= end and not stack:
+				end = index
+				break
+			for match in ENVIRONMENT_PATTERN.finditer(COMMENT_PATTERN.sub(str(), lines[index])):
+				if match.group(1) == "begin":
+					opened[len(stack)] = index
+					stack.append(match.group(2))
+				elif stack:
+					stack.pop()
+		else:
+			end = end_index
+		if (end - start) * 2 > end_index - begin_index:
+			return False
+		return [self.extract(start, end, text), start + 1, end]
+
+	def chunks(self, text=None):
+		"""
+		Splits the document body into chunks which can be compiled on their own:
+		a chunk for each chapter (or each section, if there are no chapters),
+		with whatever comes before the first one joined to the first chunk.
+		Sectioning commands inside environments don't start a chunk.
+
+		:param text: The LaTeX code. Defaults to the Project's data.
+		:return: A list of [first index, end index] pairs of lines (starting from 0, the end
+		is excluded), in order, or an empty list if the document has no body.
+		"""
+		if text is None:
+			text = self.data
+		lines = text.split("\n")
+		begin_index = next((index for index, code in enumerate(lines) if "\\begin{document}" in code), -1)
+		end_index = next((index for index, code in enumerate(lines) if "\\end{document}" in code), -1)
+		if not 0 <= begin_index < end_index:
+			return list()
+
+		# Find the sectioning commands outside of environments
+		sections = list()
+		depth = int()
+		for index in range(begin_index + 1, end_index):
+			match = SECTION_PATTERN.match(lines[index])
+			if match and not depth:
+				sections.append([index, SECTION_LEVELS.index(match.group(1))])
+			for environment in ENVIRONMENT_PATTERN.finditer(COMMENT_PATTERN.sub(str(), lines[index])):
+				depth = depth + 1 if environment.group(1) == "begin" else max(int(), depth - 1)
+		# Split at the shallowest of chapters and sections
+		levels = [level for index, level in sections if 1 <= level <= 2]
+		if not levels:
+			return [[begin_index + 1, end_index]]
+		starts = [index for index, level in sections if level == min(levels)]
+		starts[0] = begin_index + 1
+		return [[start, end] for start, end in zip(starts, starts[1:] + [end_index])]
+
+	def extract(self, start, end, text=None, counters=False, trailer=str()):
+		"""
+		Extracts lines of the document body, along with the preamble. Everything else
+		in the body is blanked out, so that the extract's line numbers are the same as
+		the document's, and the section counters are set to what they'd be in the whole document.
+
+		:param start: The index of the first line to extract (starting from 0).
+		:param end: The index of the line after the last line to extract.
+		:param text: The LaTeX code. Defaults to the Project's data.
+		:param counters: A dictionary of the values of the other counters (e.g. the page, figures
+		and equations) at the start of the extract, or False to start them from 0.
+		See the COUNTER_RECORDER and the .read_counters() method.
+		:param trailer: Code to put right before the extract's \\end{document} (e.g. the COUNTER_RECORDER).
+		:return: The extract's code.
+		"""
+		if text is None:
+			text = self.data
+		lines = text.split("\n")
+		begin_index = next((index for index, code in enumerate(lines) if "\\begin{document}" in code), -1)
+
+		# Number the sections as they would be numbered in the whole document
+		sections = [int()] * len(SECTION_LEVELS)
+		for index in range(begin_index + 1, start):
+			match = SECTION_PATTERN.match(lines[index])
+			if match and not match.group(2):
+				section_level = SECTION_LEVELS.index(match.group(1))
+				sections[section_level] += 1
+				# Parts don't restart the chapters
+				if section_level:
+					sections[section_level + 1:] = [int()] * (len(SECTION_LEVELS) - section_level - 1)
+		setup = "".join(["\\setcounter{{{name}}}{{{value}}}".format(name=name, value=value)
+		                 for name, value in zip(SECTION_LEVELS, sections) if value])
+		# The other counters were recorded by a previous build (the sections are counted above, which is
+		# always up to date), and counters which aren't defined anymore are skipped
+		recorded = "".join(["\\@ifundefined{{c@{name}}}{{}}{{\\setcounter{{{name}}}{{{value}}}}}".format(
+			name=name,
+			value=value
+		) for name, value in sorted((counters or dict()).items()) if name not in SECTION_LEVELS])
+		if recorded:
+			setup += "\\makeatletter" + recorded + "\\makeatother"
+
+		# Blank out the rest of the body, keeping the line numbers
+		extract = lines[:begin_index + 1] + [str()] * (start - begin_index - 1) + lines[start:end] + \
+			[trailer + "\\end{document}"]
+		if setup and start - 1 > begin_index:
+			extract[start - 1] = setup
+		return "\n".join(extract)
+
+	@staticmethod
+	def read_counters(aux):
+		"""
+		Reads the counters written by the COUNTER_RECORDER.
+
+		:param aux: The contents of the extract's .aux file.
+		:return: A dictionary of the counters' names to their values at the end of the extract.
+		"""
+		return {match.group(1): int(match.group(2)) for match in COUNTER_PATTERN.finditer(aux)}
+
+	@staticmethod
+	def used_labels(code, aux):
+		"""
+		Picks the lines of an .aux file which a piece of code refers to (the labels it references and the entries it cites).
+
+		:param code: The LaTeX code.
+		:param aux: The contents of the .aux file.
+		:return: The lines, as a string (in the .aux file's order).
+		"""
+		# The names referenced outside of comments (a command may reference a few, e.g. "\\cite{a,b}")
+		names = set()
+		for line in code.split("\n"):
+			for match in REFERENCE_PATTERN.finditer(COMMENT_PATTERN.sub(str(), line)):
+				names.update([name.strip() for name in match.group(1).split(",")])
+		used = list()
+		for line in aux.split("\n"):
+			match = AUX_LABEL_PATTERN.match(line)
+			if match and match.group(1) in names:
+				used.append(line)
+		return "\n".join(used)
+
 	def save(self, text, overwrite=False):
 		"""
 		Saves the text to the Project object's file
@@ -0,0 +1,384 @@
+"""
+The Raster file.
+Stores the Rasterizer classes, which are the
+interchangeable backends that convert the pages
+of .pdf files to images, functions to choose
+between them and compare their speed, and the
+RasterPool class, which spreads the conversion
+of many pages across processes.
+"""
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from io import BytesIO
+from math import ceil
+from os import cpu_count
+from shutil import which
+from subprocess import run, PIPE
+from threading import Lock
+from time import time
+
+from PIL import Image
+from pdf2image import convert_from_path
+
+try:
+	# noinspection PyUnresolvedReferences
+	import fitz
+except ImportError:
+	fitz = False
+
+# The amount of recent page times each backend keeps (see the Rasterizer.page_time() method)
+TIMES_SIZE = 256
+
+
+class Rasterizer:
+	"""
+	The Rasterizer class is the base class of all the
+	rasterizer backends. Each backend converts a range
+	of pages to PIL images, and measures how long it took.
+	Pages are converted with Poppler's pdftoppm (through
+	pdf2image), unless the backend converts them otherwise.
+	"""
+	name = "rasterizer"
+
+	def __init__(self):
+		# The time (seconds) it took to convert a page, for the most recent pages converted
+		self.times = deque(maxlen=TIMES_SIZE)
+
+	@staticmethod
+	def available():
+		"""
+		Checks whether the backend can be used on this machine.
+		The base class isn't a backend of its own (it's not one of the RASTERIZERS).
+
+		:return: True if it can, False otherwise.
+		"""
+		return False
+
+	def convert(self, path, quality, first_page, last_page):
+		"""
+		Converts pages of a .pdf file to images.
+
+		:param path: The full path to the .pdf file.
+		:param quality: The DPI of the images to create.
+		:param first_page: The first page to convert (starting from 1).
+		:param last_page: The last page to convert.
+		:return: A list of PIL images, in page order.
+		"""
+		return convert_from_path(path, quality, first_page=first_page, last_page=last_page)
+
+	def convert_region(self, path, quality, page, box):
+		"""
+		Converts a region of a page to an image. Backends which can't convert
+		only a region convert the whole page, and crop it.
+
+		:param path: The full path to the .pdf file.
+		:param quality: The DPI of the image to create.
+		:param page: The page to convert (starting from 1).
+		:param box: The region, as (left, top, right, bottom) pixels of the page at that DPI.
+		:return: The PIL image of the region.
+		"""
+		image = self.convert(path, quality, page, page)[0]
+		# The page's size in pixels may be rounded differently than the box
+		return image.crop((box[0], box[1], min(box[2], image.width), min(box[3], image.height)))
+
+	def render_region(self, path, quality, page, box):
+		"""
+		Converts a region of a page to an image, and records how long it took.
+
+		:return: The PIL image of the region, or False if the conversion failed.
+		"""
+		start_time = time()
+		try:
+			region = self.convert_region(path, quality, page, box)
+		except Exception as e:
+			print("REPORT THIS ASAP 10 | ", e.__dict__)
+			return False
+		self.times.append(time() - start_time)
+		return region
+
+	def render(self, path, quality, first_page, last_page):
+		"""
+		Converts pages of a .pdf file to images, and records how long each page took.
+
+		:return: A list of PIL images, in page order (empty if the conversion failed).
+		"""
+		start_time = time()
+		try:
+			pages = self.convert(path, quality, first_page, last_page)
+		except Exception as e:
+			print("REPORT THIS ASAP 8 | ", e.__dict__)
+			return list()
+		if pages:
+			self.times.extend([(time() - start_time) / len(pages)] * len(pages))
+		return pages
+
+	def page_time(self):
+		"""
+		Returns the average time (seconds) it took to convert a page, or 0 if no pages were converted.
+		"""
+		return sum(self.times) / len(self.times) if self.times else float()
+
+
+def poppler_region(command, image_format, path, quality, page, box):
+	"""
+	Converts a region of a page with one of Poppler's tools (which can render only a region of a page).
+
+	:param command: The tool's name (pdftoppm or pdftocairo).
+	:param image_format: The tool's option for the format to write (e.g. "-png").
+	:param path: The full path to the .pdf file.
+	:param quality: The DPI of the image to create.
+	:param page: The page to convert (starting from 1).
+	:param box: The region, as (left, top, right, bottom) pixels of the page at that DPI.
+	:return: The PIL image of the region.
+	"""
+	proc = run([
+		command, image_format, "-singlefile",
+		"-f", str(page), "-l", str(page), "-r", str(quality),
+		"-x", str(box[0]), "-y", str(box[1]), "-W", str(box[2] - box[0]), "-H", str(box[3] - box[1]),
+		path, "-"
+	], stdout=PIPE, stderr=PIPE)
+	if proc.returncode:
+		raise OSError(proc.stderr.decode("utf-8", errors="replace"))
+	return Image.open(BytesIO(proc.stdout))
+
+
+class PdftoppmRasterizer(Rasterizer):
+	"""
+	Converts pages with Poppler's pdftoppm (through pdf2image).
+	"""
+	name = "pdftoppm"
+
+	@staticmethod
+	def available():
+		return bool(which("pdftoppm"))
+
+	def convert_region(self, path, quality, page, box):
+		return poppler_region("pdftoppm", "-ppm", path, quality, page, box)
+
+
+class PdftocairoRasterizer(Rasterizer):
+	"""
+	Converts pages with Poppler's pdftocairo (through pdf2image).
+	"""
+	name = "pdftocairo"
+
+	@staticmethod
+	def available():
+		return bool(which("pdftocairo"))
+
+	def convert(self, path, quality, first_page, last_page):
+		return convert_from_path(path, quality, first_page=first_page, last_page=last_page, use_pdftocairo=True)
+
+	def convert_region(self, path, quality, page, box):
+		return poppler_region("pdftocairo", "-png", path, quality, page, box)
+
+
+class MupdfRasterizer(Rasterizer):
+	"""
+	Converts pages in-process with the MuPDF library (PyMuPDF),
+	without starting a process or writing temporary files.
+	"""
+	name = "mupdf"
+
+	@staticmethod
+	def available():
+		return bool(fitz)
+
+	def convert(self, path, quality, first_page, last_page):
+		pages = list()
+		document = fitz.open(path)
+		try:
+			for index in range(first_page - 1, last_page):
+				pixel_map = document[index].get_pixmap(matrix=fitz.Matrix(quality / 72, quality / 72), alpha=False)
+				pages.append(Image.frombytes("RGB", [pixel_map.width, pixel_map.height], pixel_map.samples))
+		finally:
+			document.close()
+		return pages
+
+	def convert_region(self, path, quality, page, box):
+		document = fitz.open(path)
+		try:
+			scale = 72 / quality
+			pixel_map = document[page - 1].get_pixmap(
+				matrix=fitz.Matrix(quality / 72, quality / 72),
+				clip=fitz.Rect(box[0] * scale, box[1] * scale, box[2] * scale, box[3] * scale),
+				alpha=False
+			)
+			return Image.frombytes("RGB", [pixel_map.width, pixel_map.height], pixel_map.samples)
+		finally:
+			document.close()
+
+
+# All the backends, by the name used in the raster_backend setting
+RASTERIZERS = {rasterizer.name: rasterizer for rasterizer in [MupdfRasterizer, PdftoppmRasterizer, PdftocairoRasterizer]}
+
+# The backends in use, created once so that their times add up
+rasterizers = dict()
+rasterizers_lock = Lock()
+
+
+def get_rasterizer(name):
+	"""
+	Returns the (single) instance of a backend.
+
+	:param name: The name of the backend.
+	:return: The Rasterizer object, or False if there's no such backend or it isn't available.
+	"""
+	with rasterizers_lock:
+		if name not in rasterizers:
+			if name not in RASTERIZERS or not RASTERIZERS[name].available():
+				return False
+			rasterizers[name] = RASTERIZERS[name]()
+		return rasterizers[name]
+
+
+def compare_rasterizers(path, quality=100, page=1):
+	"""
+	Converts a page with each of the available backends, to compare their speed.
+
+	:param path: The full path to a .pdf file.
+	:param quality: The DPI to convert the page at.
+	:param page: The page to convert.
+	:return: A dictionary of backend names to the time (seconds) the page took, fastest first.
+	"""
+	results = dict()
+	for name in RASTERIZERS:
+		rasterizer = get_rasterizer(name)
+		if rasterizer:
+			start_time = time()
+			if rasterizer.render(path, quality, page, page):
+				results[name] = time() - start_time
+	return dict(sorted(results.items(), key=lambda result: result[1]))
+
+
+# The backend chosen by the "auto" setting
+fastest = list()
+
+
+def select_rasterizer(name, path):
+	"""
+	Chooses the backend to convert pages with.
+
+	:param name: The name of the backend from the settings, or "auto" for the fastest available one.
+	The fastest one is found by comparing the backends on the first .pdf file converted.
+	:param path: The full path to the .pdf file about to be converted.
+	:return: The Rasterizer object (pdftoppm if the requested backend isn't available).
+	"""
+	if name != "auto":
+		return get_rasterizer(name) or get_rasterizer("pdftoppm") or PdftoppmRasterizer()
+	with rasterizers_lock:
+		chosen = fastest[0] if fastest else False
+	if not chosen:
+		# Compare at a low quality, so that choosing doesn't take longer than converting
+		results = compare_rasterizers(path, quality=30)
+		chosen = list(results)[0] if results else "pdftoppm"
+		with rasterizers_lock:
+			fastest[:] = [chosen]
+	return get_rasterizer(chosen) or PdftoppmRasterizer()
+
+
+def render_range(name, path, quality, first_page, last_page, prefix=False):
+	"""
+	Converts a range of pages in a worker process of the RasterPool.
+
+	:param name: The name of the backend to convert the pages with.
+	:param path: The full path to the .pdf file.
+	:param quality: The DPI of the images to create.
+	:param first_page: The first page to convert (starting from 1).
+	:param last_page: The last page to convert.
+	:param prefix: If given, each page is also saved as a .jpg file named prefix + page number.
+	:return: A list of the PIL images, and a list of the time (seconds) each page took.
+	"""
+	rasterizer = get_rasterizer(name) or PdftoppmRasterizer()
+	pages = rasterizer.render(path, quality, first_page, last_page)
+	# Encode the images here as well, rather than one after another in the app
+	if prefix:
+		for page_index, page in enumerate(pages, first_page):
+			page.save("{prefix}{index}.jpg".format(prefix=prefix, index=page_index), 'JPEG')
+	return [pages, list(rasterizer.times)[-len(pages):] if pages else list()]
+
+
+class RasterPool:
+	"""
+	The RasterPool class converts (and encodes) ranges of pages
+	on a pool of worker processes, so that converting a long
+	document uses all the cores of the machine. The pages are
+	streamed back in page order, so the first pages can be used
+	before the last ones are done.
+	"""
+
+	def __init__(self, workers=0):
+		"""
+		:param workers: The amount of worker processes (0 for one per core, 1 to convert in the app's process).
+		"""
+		self.workers = workers or cpu_count() or 1
+		# The pool is only started once it is needed
+		self.executor = False
+		self.lock = Lock()
+
+	def chunks(self, first_page, last_page):
+		"""
+		Splits a range of pages into a range for every worker.
+
+		:param first_page: The first page of the range.
+		:param last_page: The last page of the range.
+		:return: A list of [first page, last page] pairs, in page order.
+		"""
+		size = max(1, ceil((last_page - first_page + 1) / self.workers))
+		return [[start, min(start + size - 1, last_page)] for start in range(first_page, last_page + 1, size)]
+
+	def render(self, rasterizer, path, quality, first_page, last_page, prefix=False):
+		"""
+		Converts a range of pages, spread across the worker processes.
+
+		:param rasterizer: The Rasterizer object to convert the pages with (its times are updated).
+		:param path: The full path to the .pdf file.
+		:param quality: The DPI of the images to create.
+		:param first_page: The first page to convert (starting from 1).
+		:param last_page: The last page to convert.
+		:param prefix: If given, each page is also saved as a .jpg file named prefix + page number.
+		:return: A generator of (page number, PIL image) pairs, in page order.
+		It stops early if a range couldn't be converted.
+		"""
+		# A single page (or worker) isn't worth the trip to another process
+		if self.workers <= 1 or first_page == last_page:
+			pages = rasterizer.render(path, quality, first_page, last_page)
+			for page_index, page in enumerate(pages, first_page):
+				if prefix:
+					page.save("{prefix}{index}.jpg".format(prefix=prefix, index=page_index), 'JPEG')
+				yield page_index, page
+			return
+
+		with self.lock:
+			if not self.executor:
+				# The workers are started afresh rather than forked, forking a process with threads (e.g. Qt's) isn't safe
+				self.executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=get_context("spawn"))
+			executor = self.executor
+		chunks = self.chunks(first_page, last_page)
+		futures = [executor.submit(render_range, rasterizer.name, path, quality, chunk_first, chunk_last, prefix)
+		           for chunk_first, chunk_last in chunks]
+
+		# Hand out the ranges in order, as soon as each one is done
+		for (chunk_first, chunk_last), future in zip(chunks, futures):
+			try:
+				pages, times = future.result()
+			except Exception as e:
+				print("REPORT THIS ASAP 9 | ", e.__dict__)
+				pages, times = list(), list()
+			rasterizer.times.extend(times)
+			if not pages:
+				for other_future in futures:
+					other_future.cancel()
+				return
+			for page_index, page in enumerate(pages, chunk_first):
+				yield page_index, page
+
+	def close(self):
+		"""
+		Stops the worker processes (if they were started).
+		"""
+		with self.lock:
+			if self.executor:
+				self.executor.shutdown(wait=False)
+			self.executor = False
@@ -0,0 +1,165 @@
+"""
+The Scheduler file.
+Stores the CompileScheduler class, which runs
+live compiles on a single worker thread, and
+the CompileJob class, which describes a single compile.
+"""
+from threading import Thread, Condition, Lock
+from time import perf_counter
+
+
+class CompileJob:
+	"""
+	The CompileJob class holds an immutable snapshot
+	of the text to compile and its revision number.
+	It also tracks the processes started for it,
+	so that the job can be cancelled at any moment.
+	"""
+
+	def __init__(self, revision, text, due, full=False, kill=False):
+		"""
+		:param revision: The revision number of the text.
+		:param text: The text to compile.
+		:param due: The time (perf_counter() seconds) at which the job should start.
+		:param full: Whether the whole document must be compiled (rather than an excerpt of it).
+		:param kill: The function which kills a process of the job (e.g. Compile.kill),
+		or False to call the process' own .kill() method.
+		"""
+		self.revision = revision
+		self.text = text
+		self.due = due
+		self.full = full
+		self.kill = kill or (lambda proc: proc.kill())
+		self.cancelled = False
+		self.processes = list()
+		self.lock = Lock()
+
+	def attach(self, proc):
+		"""
+		Registers a process as part of the job.
+		If the job was already cancelled, the process is killed right away.
+
+		:param proc: The Popen object of the process.
+		"""
+		with self.lock:
+			if not self.cancelled:
+				self.processes.append(proc)
+				return
+		self.kill(proc)
+
+	def cancel(self):
+		"""
+		Cancels the job, and kills all of its processes which are still running.
+		"""
+		with self.lock:
+			self.cancelled = True
+			processes = self.processes
+			self.processes = list()
+		for proc in processes:
+			self.kill(proc)
+
+
+class CompileScheduler:
+	"""
+	The CompileScheduler class replaces a thread per edit
+	with one long-lived worker thread. It holds at most one
+	running job and one pending job. Submitting a new revision
+	replaces the pending job, and kills the running one,
+	since its result would be outdated anyways.
+	"""
+
+	def __init__(self, run, delay, kill=False):
+		"""
+		:param run: The function that executes a job (called with the CompileJob, on the worker thread).
+		:param delay: The delay (seconds) since the last submission before a job starts.
+		:param kill: The function which kills the processes of cancelled jobs (see the CompileJob class).
+		"""
+		self.run = run
+		self.delay = delay
+		self.kill = kill
+		self.revision = int()
+		self.pending = None
+		self.running = None
+		self.closed = False
+		self.condition = Condition()
+		self.worker = Thread(target=self.work)
+		self.worker.setDaemon(True)
+		self.worker.start()
+
+	def submit(self, text, full=False):
+		"""
+		Queues a new revision of the text to compile.
+
+		:param text: The text to compile.
+		:param full: Whether the whole document must be compiled (rather than an excerpt of it).
+		:return: The revision number of the new job.
+		"""
+		with self.condition:
+			self.revision += 1
+			revision = self.revision
+			self.pending = CompileJob(revision, text, perf_counter() + self.delay, full, self.kill)
+			running = self.running
+			self.condition.notify()
+		# The running job is outdated now, so stop it
+		if running:
+			running.cancel()
+		return revision
+
+	def is_current(self, revision):
+		"""
+		Checks whether a revision is the latest one submitted.
+
+		:param revision: The revision number of a job.
+		:return: True if no newer revision was submitted, False otherwise.
+		"""
+		return revision == self.revision
+
+	def wait_idle(self, revision, timeout):
+		"""
+		Waits for a while, unless a newer revision is submitted in the meantime.
+
+		:param revision: The revision number of a job.
+		:param timeout: The time (seconds) to wait.
+		:return: True if no newer revision was submitted by the end of the wait, False otherwise.
+		"""
+		end = perf_counter() + timeout
+		with self.condition:
+			while not self.closed and self.is_current(revision) and perf_counter() < end:
+				self.condition.wait(end - perf_counter())
+			return not self.closed and self.is_current(revision)
+
+	def work(self):
+		"""
+		The worker thread's loop. Waits for the pending job's delay to
+		pass (new submissions restart it), then runs the job.
+		"""
+		while True:
+			with self.condition:
+				# Wait until there is a job which is due
+				while not self.closed and (not self.pending or perf_counter() < self.pending.due):
+					self.condition.wait(self.pending.due - perf_counter() if self.pending else None)
+				if self.closed:
+					return
+				job = self.pending
+				self.pending = None
+				self.running = job
+			try:
+				self.run(job)
+			except Exception as e:
+				# Keep the worker alive, the next revision may compile just fine
+				print("REPORT THIS ASAP 6 | ", e.__dict__)
+			finally:
+				with self.condition:
+					self.running = None
+
+	def close(self):
+		"""
+		Stops the worker thread and cancels the running job.
+		"""
+		with self.condition:
+			self.closed = True
+			self.pending = None
+			running = self.running
+			self.condition.notify()
+		if running:
+			running.cancel()
@@ -0,0 +1,129 @@
+"""
+The SyncTeX file.
+Stores the SyncTex class, which parses the SyncTeX
+data of a compile (once), into an index which links
+lines of the source code to places in the compiled
+.pdf file, and places in the .pdf file back to lines.
+"""
+from bisect import bisect_left
+from gzip import open as gzip_open
+from os.path import abspath, basename
+from re import compile as compile_regex
+
+# A record of a box, kern, glue or math node, e.g. "(1,12:4736286,5343414:22609920,655360,0"
+# (the type, the input's tag, the line, an optional column, the position, and an optional size)
+RECORD_PATTERN = compile_regex(r"^([\[(vhxkg$])(\d+),(\d+)(?:,-?\d+)?:(-?\d+),(-?\d+)(?::(-?\d+)(?:,(-?\d+),(-?\d+))?)?")
+
+# TeX points per inch (SyncTeX positions are in scaled points, 65536 per point)
+POINTS_PER_INCH = 72.27
+
+
+class SyncTex:
+	"""
+	The SyncTex class holds the SyncTeX index of a compile.
+	Each lookup is a binary search, so that following the
+	cursor (or a click) never needs another compiler run.
+	Positions are in inches from the top-left corner of the page.
+	"""
+
+	def __init__(self):
+		# The source lines which have a place in the .pdf file (sorted), and the place of each one
+		self.lines = list()
+		self.places = list()
+		# Page numbers to the bottoms of the page's records (sorted), and the [top, bottom, line] of each one
+		self.bottoms = dict()
+		self.records = dict()
+
+	@staticmethod
+	def parse(path, source=False):
+		"""
+		Parses a SyncTeX file into an index.
+
+		:param path: The full path to the .synctex.gz (or uncompressed .synctex) file.
+		:param source: The path to the source file to index (other inputs are skipped), or False for all of them.
+		:return: The SyncTex object, or False if the file can't be read.
+		"""
+		try:
+			with (gzip_open(path, "rt", encoding="utf-8", errors="replace") if path.endswith(".gz")
+			      else open(path, "r", encoding="utf-8", errors="replace")) as file:
+				lines = file.read().splitlines()
+		except OSError:
+			return False
+
+		# Read the preamble: the inputs' tags, and the units
+		tags = set()
+		unit = float(1)
+		magnification = float(1)
+		offsets = [float(), float()]
+		page = int()
+		places = dict()
+		records = dict()
+		for line in lines:
+			if line.startswith("Input:"):
+				tag, input_path = line[len("Input:"):].split(":", 1)
+				if not source or abspath(input_path) == abspath(source) or basename(input_path) == basename(source):
+					tags.add(int(tag))
+			elif line.startswith("Unit:"):
+				unit = float(line[len("Unit:"):])
+			elif line.startswith("Magnification:"):
+				magnification = float(line[len("Magnification:"):]) / 1000
+			elif line.startswith("X Offset:"):
+				offsets[0] = float(line[len("X Offset:"):])
+			elif line.startswith("Y Offset:"):
+				offsets[1] = float(line[len("Y Offset:"):])
+			elif line.startswith("{"):
+				page = int(line[1:])
+			elif line.startswith("}"):
+				page = int()
+			elif page:
+				match = RECORD_PATTERN.match(line)
+				if not match or int(match.group(2)) not in tags:
+					continue
+				source_line = int(match.group(3))
+				# Positions are measured from an origin one inch from the page's top-left corner
+				scale = unit * magnification / 65536 / POINTS_PER_INCH
+				x = (int(match.group(4)) + offsets[0]) * scale + 1
+				y = (int(match.group(5)) + offsets[1]) * scale + 1
+				height = int(match.group(7) or 0) * scale
+				depth = int(match.group(8) or 0) * scale
+				# The first place of a line (in reading order) is where it starts
+				if source_line not in places or [page, y - height] < places[source_line][:2]:
+					places[source_line] = [page, y - height, x]
+				records.setdefault(page, list()).append([y - height, y + depth, source_line])
+
+		# Sort the index for binary searches
+		sync_tex = SyncTex()
+		sync_tex.lines = sorted(places)
+		sync_tex.places = [places[source_line] for source_line in sync_tex.lines]
+		for page, page_records in records.items():
+			page_records.sort(key=lambda record: record[1])
+			sync_tex.records[page] = page_records
+			sync_tex.bottoms[page] = [record[1] for record in page_records]
+		return sync_tex
+
+	def forward(self, line):
+		"""
+		Finds the place of a source line in the .pdf file (forward search).
+		Lines without a place of their own (e.g. blank lines) are given the place of the next line.
+
+		:param line: The line number (starting from 1).
+		:return: The place as [page, top, left] (inches), or False if the index is empty.
+		"""
+		if not self.lines:
+			return False
+		index = min(bisect_left(self.lines, line), len(self.lines) - 1)
+		return self.places[index]
+
+	def inverse(self, page, y):
+		"""
+		Finds the source line at a place in the .pdf file (inverse search).
+
+		:param page: The page number (starting from 1).
+		:param y: The distance from the page's top (inches).
+		:return: The line number, or False if nothing on the page came from the source file.
+		"""
+		if not self.bottoms.get(page):
+			return False
+		# The first record whose bottom is below the place is the line of text the place is on (or right above)
+		index = min(bisect_left(self.bottoms[page], y), len(self.bottoms[page]) - 1)
+		return self.records[page][index][2]
@@ -0,0 +1,155 @@
+"""
+The Tracing file.
+Stores the Tracer class, which records how long
+each stage of the live pipeline takes, and the span
+function, which traces a stage if the app has a tracer.
+"""
+from collections import deque
+from json import dumps
+from os import getpid
+from threading import get_ident
+from time import perf_counter
+
+
+class Span:
+	"""
+	The Span class measures a single stage (used with the with statement).
+	Spans which are opened inside other spans (on the same thread) are nested in them.
+	"""
+
+	def __init__(self, tracer, name, args):
+		self.tracer = tracer
+		self.name = name
+		self.args = args
+		self.start = float()
+
+	def __enter__(self):
+		self.start = perf_counter()
+		return self
+
+	def __exit__(self, exc_type, exc_value, traceback):
+		self.tracer.record(self.name, self.start, perf_counter(), **self.args)
+		return False
+
+
+class NullSpan:
+	"""
+	The NullSpan class stands in for a span when there's no tracer.
+	"""
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, exc_type, exc_value, traceback):
+		return False
+
+
+NULL_SPAN = NullSpan()
+
+
+class Tracer:
+	"""
+	The Tracer class keeps the latest spans (stages with their start time
+	and duration) in a ring buffer, so that tracing costs the same however
+	long the app runs. The spans can be exported as Chrome trace events
+	(chrome://tracing, or ui.perfetto.dev), where spans of the same thread
+	are shown nested by their times.
+	"""
+
+	def __init__(self, size=4096):
+		"""
+		:param size: The amount of spans to keep (0 to not trace at all).
+		"""
+		self.size = size
+		# Each event is kept as a tuple, and only converted when it is exported
+		self.events = deque(maxlen=size or 1)
+		self.origin = perf_counter()
+
+	def span(self, name, **args):
+		"""
+		Traces a stage.
+
+		:param name: The name of the stage.
+		:param args: Any details to show along with the span.
+		:return: A Span object, to use with the with statement.
+		"""
+		return Span(self, name, args) if self.size else NULL_SPAN
+
+	def record(self, name, start, end, **args):
+		"""
+		Records a stage which was already measured (e.g. a stage which started on another thread).
+
+		:param name: The name of the stage.
+		:param start: The time the stage started at (seconds, as returned by time.perf_counter).
+		:param end: The time the stage ended at.
+		:param args: Any details to show along with the span.
+		"""
+		if self.size:
+			self.events.append(("X", name, start, end - start, get_ident(), args))
+
+	def instant(self, name, **args):
+		"""
+		Records a moment (e.g. a change of the "Task" status).
+
+		:param name: The name of the moment.
+		:param args: Any details to show along with it.
+		"""
+		if self.size:
+			self.events.append(("i", name, perf_counter(), float(), get_ident(), args))
+
+	def to_chrome(self):
+		"""
+		Converts the spans to Chrome trace events.
+
+		:return: A dictionary in the Chrome trace event format.
+		"""
+		pid = getpid()
+		trace_events = list()
+		for phase, name, start, duration, thread, args in list(self.events):
+			event = {
+				"name": name,
+				"ph": phase,
+				"ts": round((start - self.origin) * 1e6, 1),
+				"pid": pid,
+				"tid": thread,
+				"args": args
+			}
+			if phase == "X":
+				event["dur"] = round(duration * 1e6, 1)
+			else:
+				# Show moments on their thread only
+				event["s"] = "t"
+			trace_events.append(event)
+		# Spans are recorded when they end, so nested spans come before their parents (and
+		# may start at the same time, so the longer span, which is the parent, comes first)
+		trace_events.sort(key=lambda trace_event: (trace_event["ts"], -trace_event.get("dur", float())))
+		return {"traceEvents": trace_events, "displayTimeUnit": "ms"}
+
+	def export(self, path):
+		"""
+		Writes the spans to a Chrome trace .json file.
+
+		:param path: The path to the file.
+		"""
+		file = open(path, "w", encoding="utf-8")
+		file.write(dumps(self.to_chrome()))
+		file.close()
+
+	def clear(self):
+		"""
+		Forgets all the spans.
+		"""
+		self.events.clear()
+
+
+def span(app_pointer, name, **args):
+	"""
+	Traces a stage, if the app has a tracer.
+
+	:param app_pointer: The app (or False).
+	:param name: The name of the stage.
+	:param args: Any details to show along with the span.
+	:return: A Span object, to use with the with statement.
+	"""
+	tracer = getattr(app_pointer, "tracer", False)
+	return tracer.span(name, **args) if tracer else NULL_SPAN
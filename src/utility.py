@@ -69,6 +69,7 @@ class Utility:
 		# /tests/ is irrelevant to GUI runtime
 		# /src/ is irrelevant because the file wouldn't be running if it was deleted
 		system_paths = {"dir": ["../compile",
+		                        "../cache",
 		                        "../project",
 		                        "../resources",
 		                        "../gui_themes",
@@ -237,16 +238,17 @@ class Utility:
 		return file_name if not exists(file_name) else self.get_file_id(ext, filePath, prefix)
 
 	@staticmethod
-	def parse_errors(error_message):
+	def parse_errors(error_message, file_name="../project/current.tex"):
 		"""
 		Parses the LaTeX compiler error message,and
 		returns a dictionary of line to error messages.
 
 		:param error_message: The full error message string
+		:param file_name: The path of the compiled file, as it was given to the compiler
 		:return: A dictionary containing the line of the error, and the message accompanying it
 		"""
 		errors = dict()
-		for chunk in error_message.split("../project/current.tex:"):
+		for chunk in error_message.split(file_name + ":"):
 			line = chunk.split(":")[0]
 			message = ":".join(chunk.split(":")[1:]).strip()
 			if line.strip().isnumeric():
@@ -343,16 +345,20 @@ class Utility:
 			elif split_path[1] == ".pdf":
 				# Import this here, otherwise it's a recursive import and will lead to an error
 				self.app_pointer.status_bar_instance.update_status({"Task": "Loading..."})
-				from compile import Compile
+				from compile import compile_to_pdf
 
-				# If the extension is a pdf, compile the file again
+				# If the extension is a pdf, compile the file again (a long document is compiled in chunks)
 				self.app_pointer.status_bar_instance.update_status({"Task": "Compiling..."})
-				c = Compile(self.app_pointer)
-				pdf_path, error_msg = c.compile(self.app_pointer.project.file_name)
+				pdf_path, error_msg = compile_to_pdf(
+					app_pointer=self.app_pointer,
+					path=self.app_pointer.project.file_name,
+					chunked=True
+				)
 
-				# Copy the file to its final path
+				# Copy the file to its final path (the compile cache owns the build directory)
 				self.app_pointer.status_bar_instance.update_status({"Task": "Copying..."})
-				copyfile(pdf_path, file_path)
+				if pdf_path:
+					copyfile(pdf_path, file_path)
 			# If the extension is anything else (a .jpg)
 			else:
 				# Import this here, otherwise it's a recursive import and will lead to an error
@@ -364,7 +370,8 @@ class Utility:
 				image_path = compile_to_image(
 					app_pointer=self.app_pointer,
 					path=self.app_pointer.project.file_name,
-					quality=self.app_pointer.settings["compile_quality"]
+					quality=self.app_pointer.settings["compile_quality"],
+					page=1
 				)[0]
 
 				# Copy it to the full path
@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+# coding: utf-8
+"""
+Benchmarks the compile pipeline end to end (Compile.compile, Compile.image and compile_to_image)
+over the .tex files in this folder and generated documents of 10 to 500 pages.
+
+Runs against the real engine if it's installed, and against the fake engine stand-in otherwise
+(see fake_engine.py). Reports the p50/p95 time of each stage and the peak memory, and compares
+the p50 times to the stored baseline of the same engine.
+
+    python tests/benchmark.py [--engine auto|fake|real] [--repeat 5] [--save] [--tolerance 1.25]
+"""
+import sys
+import tracemalloc
+from argparse import ArgumentParser
+from json import dumps, load
+from math import ceil
+from os import makedirs
+from os.path import abspath, basename, dirname, exists, join
+from shutil import which, rmtree
+from time import perf_counter
+
+TESTS_DIR = dirname(abspath(__file__))
+sys.path.insert(0, join(dirname(TESTS_DIR), "src"))
+
+from compile import compile_to_image, Compile  # noqa: E402
+
+try:
+    # noinspection PyUnresolvedReferences
+    from resource import getrusage, RUSAGE_SELF, RUSAGE_CHILDREN
+except ImportError:
+    getrusage = False
+
+BASELINE_PATH = join(TESTS_DIR, "benchmark_baseline.json")
+CORPUS = ["house.tex", "hebrew.tex", "mytest.tex"]
+GENERATED_PAGES = [10, 50, 100, 500]
+STAGES = ["compile", "image", "compile_to_image"]
+
+
+class Status:
+    """
+    Stands in for the status bar.
+    """
+
+    @staticmethod
+    def update_status(statuses):
+        pass
+
+
+class App:
+    """
+    Stands in for the app, without any caches (so that every repeat does the full work).
+    """
+
+    def __init__(self):
+        self.status_bar_instance = Status()
+        self.settings = {"raster_backend": "auto"}
+
+
+def generate_document(pages):
+    """
+    Generates a document with a section on each page.
+
+    :param pages: The amount of pages.
+    :return: The LaTeX code.
+    """
+    body = list()
+    for page in range(1, pages + 1):
+        body.append("\\section{{Section {page}}}\n{text}\n\\newpage".format(
+            page=page,
+            text=" ".join(["Lorem ipsum dolor sit amet, consectetur adipiscing elit."] * 8)
+        ))
+    return "\\documentclass{article}\n\\begin{document}\n" + "\n".join(body) + "\n\\end{document}\n"
+
+
+def make_corpus(directory):
+    """
+    Lists the documents to benchmark, writing the generated ones into a directory.
+
+    :param directory: The directory to write the generated documents to.
+    :return: A dictionary of document names to their paths.
+    """
+    corpus = {name: join(TESTS_DIR, name) for name in CORPUS}
+    for pages in GENERATED_PAGES:
+        path = join(directory, "generated-{pages}.tex".format(pages=pages))
+        with open(path, "w", encoding="utf-8") as file:
+            file.write(generate_document(pages))
+        corpus[basename(path)] = path
+    return corpus
+
+
+def percentile(values, fraction):
+    """
+    Returns a percentile of values (nearest rank).
+
+    :param values: A list of numbers.
+    :param fraction: The percentile, between 0 and 1.
+    :return: The percentile, or 0 for an empty list.
+    """
+    if not values:
+        return float()
+    ordered = sorted(values)
+    return ordered[min(len(ordered), max(1, ceil(fraction * len(ordered)))) - 1]
+
+
+def peak_rss():
+    """
+    Returns the peak resident memory (MB) of this process and of its children (e.g. the engine), or 0.
+    """
+    if not getrusage:
+        return float()
+    # Linux reports kilobytes, macOS reports bytes
+    scale = 1 if sys.platform == "darwin" else 1024
+    return max(getrusage(RUSAGE_SELF).ru_maxrss, getrusage(RUSAGE_CHILDREN).ru_maxrss) * scale / 2 ** 20
+
+
+def bench_document(path, repeat, quality):
+    """
+    Times each stage of the pipeline on a document.
+
+    :param path: The path to the .tex file.
+    :param repeat: The amount of times to run each stage.
+    :param quality: The DPI to convert the pages at.
+    :return: A dictionary of stage names to a list of times (seconds), or False if the document didn't compile.
+    """
+    times = {stage: list() for stage in STAGES}
+    app = App()
+    for _ in range(repeat):
+        compiler = Compile(app)
+        start = perf_counter()
+        pdf_path, _ = compiler.compile(path)
+        times["compile"].append(perf_counter() - start)
+        if not pdf_path:
+            compiler.clean()
+            return False
+
+        start = perf_counter()
+        compiler.image(pdf_path, quality=quality)
+        times["image"].append(perf_counter() - start)
+        compiler.clean()
+
+        start = perf_counter()
+        split_path = compile_to_image(app, path, quality)[0]
+        times["compile_to_image"].append(perf_counter() - start)
+        if split_path:
+            rmtree(dirname(split_path), ignore_errors=True)
+    return times
+
+
+def compare(results, baseline, tolerance):
+    """
+    Compares the p50 times to a baseline.
+
+    :param results: The results of this run (see the run function).
+    :param baseline: The results of the baseline run.
+    :param tolerance: The ratio to the baseline above which a time is a regression.
+    :return: A list of the regressions, as strings.
+    """
+    regressions = list()
+    for document, stages in results["documents"].items():
+        for stage, result in stages.items():
+            base = baseline["documents"].get(document, dict()).get(stage)
+            if base and base["p50"] and result["p50"] > base["p50"] * tolerance:
+                regressions.append("{document} {stage}: {time:.3f}s (baseline {base:.3f}s, x{ratio:.2f})".format(
+                    document=document, stage=stage, time=result["p50"], base=base["p50"],
+                    ratio=result["p50"] / base["p50"]
+                ))
+    return regressions
+
+
+def run(engine, repeat, quality):
+    """
+    Benchmarks the whole corpus.
+
+    :param engine: "real" for the installed engine, "fake" for the stand-in.
+    :param repeat: The amount of times to run each stage.
+    :param quality: The DPI to convert the pages at.
+    :return: The results, as a dictionary.
+    """
+    if engine == "fake":
+        Compile.engine = [sys.executable, join(TESTS_DIR, "fake_engine.py")]
+    directory = join(Compile.build_root, "benchmark")
+    makedirs(directory, exist_ok=True)
+    results = {"engine": engine, "repeat": repeat, "quality": quality, "documents": dict()}
+    tracemalloc.start()
+    try:
+        for name, path in make_corpus(directory).items():
+            times = bench_document(path, repeat, quality)
+            if not times:
+                print("{name}: failed to compile".format(name=name))
+                continue
+            results["documents"][name] = {stage: {
+                "p50": percentile(stage_times, 0.5),
+                "p95": percentile(stage_times, 0.95)
+            } for stage, stage_times in times.items()}
+            print("{name}: {stages}".format(name=name, stages=", ".join(
+                "{stage} p50 {p50:.3f}s p95 {p95:.3f}s".format(stage=stage, **result)
+                for stage, result in results["documents"][name].items()
+            )))
+        results["peak_python_mb"] = tracemalloc.get_traced_memory()[1] / 2 ** 20
+        results["peak_rss_mb"] = peak_rss()
+    finally:
+        tracemalloc.stop()
+        Compile.clean_all()
+    print("Peak memory: {python:.1f} MB (Python), {rss:.1f} MB (resident)".format(
+        python=results["peak_python_mb"], rss=results["peak_rss_mb"]))
+    return results
+
+
+def main(args):
+    parser = ArgumentParser(description="Benchmark the compile pipeline.")
+    parser.add_argument("--engine", choices=["auto", "fake", "real"], default="auto",
+                        help="the engine to compile with (auto: the real one if it's installed)")
+    parser.add_argument("--repeat", type=int, default=5, help="the amount of times to run each stage")
+    parser.add_argument("--quality", type=int, default=100, help="the DPI to convert the pages at")
+    parser.add_argument("--tolerance", type=float, default=1.25,
+                        help="the ratio to the baseline's p50 above which a stage is a regression")
+    parser.add_argument("--save", action="store_true", help="store the results as the baseline")
+    options = parser.parse_args(args)
+
+    engine = options.engine
+    if engine == "auto":
+        engine = "real" if which(Compile.engine[0]) else "fake"
+    results = run(engine, options.repeat, options.quality)
+
+    # Each engine has a baseline of its own, since their times can't be compared
+    baselines = dict()
+    if exists(BASELINE_PATH):
+        with open(BASELINE_PATH, "r", encoding="utf-8") as file:
+            baselines = load(file)
+    if options.save:
+        baselines[engine] = results
+        with open(BASELINE_PATH, "w", encoding="utf-8") as file:
+            file.write(dumps(baselines, indent=1))
+        print("Saved the baseline for the {engine} engine.".format(engine=engine))
+        return 0
+    if engine not in baselines:
+        print("No baseline for the {engine} engine yet (run with --save).".format(engine=engine))
+        return 0
+    regressions = compare(results, baselines[engine], options.tolerance)
+    for regression in regressions:
+        print("Regression: " + regression)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
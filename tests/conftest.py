@@ -0,0 +1,7 @@
+#!/usr/bin/env python3
+# coding: utf-8
+import sys
+from os.path import dirname, join
+
+# The source files import each other by name, so make them importable from the tests
+sys.path.insert(0, join(dirname(dirname(__file__)), "src"))
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# coding: utf-8
+"""
+A deterministic stand-in for the TeX engine, for benchmarks on machines without one.
+
+It takes the same command line as the real engine (see Compile.command), and writes
+a valid .pdf with one page per page break in the document's body (plus one), along
+with the .aux and .log files. Lines containing \\ABUELAERROR are reported as errors,
+and lines containing \\ABUELAFATAL stop the compile without a .pdf.
+"""
+import sys
+from os.path import basename, join, splitext
+from re import compile as compile_regex
+
+PAGE_BREAK_PATTERN = compile_regex(r"\\(newpage|clearpage|pagebreak)\b")
+
+
+def make_pdf(pages, width=612, height=792):
+    """
+    Builds a minimal .pdf file with a line of text on each page.
+
+    :param pages: The amount of pages.
+    :param width: The width of the pages (points).
+    :param height: The height of the pages (points).
+    :return: The .pdf file, as bytes.
+    """
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        "<< /Type /Pages /Kids [{kids}] /Count {count} >>".format(
+            kids=" ".join("{number} 0 R".format(number=4 + 2 * page) for page in range(pages)),
+            count=pages
+        ).encode("ascii"),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"
+    ]
+    for page in range(pages):
+        objects.append("<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {width} {height}] "
+                       "/Resources << /Font << /F1 3 0 R >> >> /Contents {contents} 0 R >>".format(
+                           width=width, height=height, contents=5 + 2 * page).encode("ascii"))
+        stream = "BT /F1 24 Tf 72 {top} Td (Page {number}) Tj ET".format(top=height - 96, number=page + 1)
+        objects.append("<< /Length {length} >>\nstream\n{stream}\nendstream".format(
+            length=len(stream), stream=stream).encode("ascii"))
+
+    pdf = bytearray(b"%PDF-1.4\n")
+    offsets = list()
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(pdf))
+        pdf += "{number} 0 obj\n".format(number=number).encode("ascii") + body + b"\nendobj\n"
+    xref = len(pdf)
+    pdf += "xref\n0 {size}\n0000000000 65535 f \n".format(size=len(objects) + 1).encode("ascii")
+    for offset in offsets:
+        pdf += "{offset:010d} 00000 n \n".format(offset=offset).encode("ascii")
+    pdf += "trailer\n<< /Size {size} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".format(
+        size=len(objects) + 1, xref=xref).encode("ascii")
+    return bytes(pdf)
+
+
+def main(args):
+    """
+    Compiles a file like the engine would.
+
+    :param args: The command line arguments (without the program's name).
+    :return: The exit code.
+    """
+    options = {arg.split("=")[0]: arg.split("=", 1)[-1] for arg in args[:-1] if arg.startswith("-")}
+    path = args[-1]
+    job_name = options.get("-job-name", splitext(basename(path))[0])
+    output_dir = options.get("-output-directory", ".")
+
+    with open(path, "r", encoding="utf-8") as file:
+        lines = file.read().split("\n")
+    pages = 1
+    in_body = False
+    for number, line in enumerate(lines, 1):
+        if "\\begin{document}" in line:
+            in_body = True
+        if "\\ABUELAFATAL" in line:
+            print("{path}:{number}: Emergency stop.".format(path=path, number=number), flush=True)
+            return 1
+        if "\\ABUELAERROR" in line:
+            print("{path}:{number}: Undefined control sequence.".format(path=path, number=number), flush=True)
+        if in_body:
+            pages += len(PAGE_BREAK_PATTERN.findall(line))
+
+    with open(join(output_dir, job_name + ".pdf"), "wb") as file:
+        file.write(make_pdf(pages))
+    with open(join(output_dir, job_name + ".aux"), "w", encoding="utf-8") as file:
+        file.write("\\relax\n")
+    with open(join(output_dir, job_name + ".log"), "w", encoding="utf-8") as file:
+        file.write("Output written on {job}.pdf ({pages} pages).\n".format(job=job_name, pages=pages))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+# coding: utf-8
+from build import BuildPlanner
+
+CITATIONS = "\\relax\n\\citation{knuth}\n\\bibdata{refs}\n\\bibstyle{plain}\n"
+
+
+class FakeStatus:
+    def update_status(self, statuses):
+        pass
+
+
+class FakeApp:
+    status_bar_instance = FakeStatus()
+
+
+class FakeJob:
+    cancelled = False
+
+
+class FakeCompiler:
+    """
+    Stands in for a Compile object whose passes only record that they ran.
+    """
+
+    def __init__(self, build_dir, job=False):
+        self.app_pointer = FakeApp()
+        self.build_dir = str(build_dir)
+        self.job = job
+        self.reasons = list()
+        self.inputs = False
+        self.passes = int()
+
+    def compile(self, source, fmt=False, rerun=False):
+        self.passes += 1
+        return [self.build_dir + "/compile.pdf", str()]
+
+
+def make_build(tmp_path, aux):
+    source_dir = tmp_path / "thesis"
+    source_dir.mkdir()
+    (source_dir / "thesis.tex").write_text("")
+    build_dir = tmp_path / "build"
+    build_dir.mkdir()
+    (build_dir / "compile.aux").write_text(aux)
+    return str(source_dir / "thesis.tex"), build_dir
+
+
+def test_no_rerun_when_the_aux_is_unchanged(tmp_path):
+    source, build_dir = make_build(tmp_path, "\\relax\n")
+    planner = BuildPlanner()
+    compiler = FakeCompiler(build_dir)
+    planner.seed(compiler, str(build_dir), source)
+    assert planner.build(compiler, source, pdf_path="compile.pdf")[0] == "compile.pdf"
+    assert compiler.passes == 0 and compiler.reasons == list()
+    # The build is carried over to the next compile
+    assert planner.carried_file(source, ".aux") == b"\\relax\n"
+
+
+def test_rerun_when_the_aux_changed(tmp_path):
+    source, build_dir = make_build(tmp_path, "\\relax\n")
+    planner = BuildPlanner()
+    compiler = FakeCompiler(build_dir)
+    planner.seed(compiler, str(build_dir), source)
+    (build_dir / "compile.aux").write_text("\\relax\n\\newlabel{sec:one}{{1}{1}}\n")
+    planner.build(compiler, source, pdf_path="compile.pdf")
+    assert compiler.passes == 1 and compiler.reasons == ["pass 2: compile.aux changed"]
+
+
+def test_bibtex_runs_only_when_its_inputs_change(tmp_path):
+    source, build_dir = make_build(tmp_path, CITATIONS)
+    (tmp_path / "thesis" / "refs.bib").write_text("@book{knuth}")
+    planner = BuildPlanner()
+
+    # A missing .bbl is always made
+    [[tool, command, digest, reason]] = planner.plan_tools(str(build_dir), source, dict())
+    assert (tool, command, reason) == ("bibtex", ["bibtex", "compile"], "compile.bbl is missing")
+    (build_dir / "compile.bbl").write_text("\\begin{thebibliography}")
+    assert planner.plan_tools(str(build_dir), source, {"bibtex": digest}) == list()
+
+    # Labels don't matter to BibTeX, citations and databases do
+    (build_dir / "compile.aux").write_text(CITATIONS + "\\newlabel{sec:one}{{1}{1}}\n")
+    assert planner.plan_tools(str(build_dir), source, {"bibtex": digest}) == list()
+    (build_dir / "compile.aux").write_text(CITATIONS + "\\citation{lamport}\n")
+    assert len(planner.plan_tools(str(build_dir), source, {"bibtex": digest})) == 1
+    (build_dir / "compile.aux").write_text(CITATIONS)
+    (tmp_path / "thesis" / "refs.bib").write_text("@book{knuth} @book{lamport}")
+    assert len(planner.plan_tools(str(build_dir), source, {"bibtex": digest})) == 1
+
+
+def test_makeindex_runs_when_the_ind_is_missing(tmp_path):
+    source, build_dir = make_build(tmp_path, "\\relax\n")
+    (build_dir / "compile.idx").write_text("\\indexentry{TeX}{1}")
+    planner = BuildPlanner()
+    [[tool, command, digest, reason]] = planner.plan_tools(str(build_dir), source, dict())
+    assert (tool, reason) == ("makeindex", "compile.ind is missing")
+    (build_dir / "compile.ind").write_text("\\begin{theindex}")
+    assert planner.plan_tools(str(build_dir), source, {"makeindex": digest}) == list()
+
+
+def test_cancelled_builds_carry_nothing_over(tmp_path):
+    source, build_dir = make_build(tmp_path, "\\relax\n")
+    planner = BuildPlanner()
+    job = FakeJob()
+    compiler = FakeCompiler(build_dir, job)
+    planner.seed(compiler, str(build_dir), source)
+    # The first pass changed the .aux file, then the job was cancelled
+    (build_dir / "compile.aux").write_text("\\relax\n\\newlabel{sec:one}{{1}{1}}\n")
+    job.cancelled = True
+    assert planner.build(compiler, source, pdf_path="compile.pdf")[0] is False
+    assert compiler.passes == 0
+    assert planner.carried == dict() and planner.tool_inputs == dict()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+# coding: utf-8
+from cache import CompileCache
+
+
+def test_key_changes_with_inputs():
+    key = CompileCache.key(b"a", ["xelatex"])
+    assert key == CompileCache.key(b"a", ["xelatex"])
+    assert key != CompileCache.key(b"b", ["xelatex"])
+    assert key != CompileCache.key(b"a", ["pdflatex"])
+    assert key != CompileCache.key(b"a", ["xelatex", "-fmt=preamble"])
+
+
+def test_hits_and_misses():
+    cache = CompileCache(2)
+    assert cache.get("a") is False
+    cache.put("a", {"pdf": "a.pdf"})
+    assert cache.get("a") == {"pdf": "a.pdf"}
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert cache.ratio() == 0.5
+
+
+def test_lru_eviction_deletes_files(tmp_path):
+    old_file = tmp_path / "old.jpg"
+    old_file.write_bytes(b"")
+    cache = CompileCache(2)
+    cache.put("old", {"files": [str(old_file)]})
+    cache.put("new", {"files": list()})
+    # Using the old result makes the new one the least recently used
+    cache.get("old")
+    cache.put("newest", {"files": list()})
+    assert cache.get("new") is False
+    assert cache.get("old")
+    cache.put("another", {"files": list()})
+    cache.put("more", {"files": list()})
+    assert not old_file.exists()
+
+
+def test_read_inputs_keeps_the_document_files(tmp_path):
+    source_dir = tmp_path / "thesis"
+    (source_dir / "chapters").mkdir(parents=True)
+    fls = tmp_path / "compile.fls"
+    fls.write_text("\n".join([
+        "PWD {dir}".format(dir=source_dir),
+        "INPUT thesis.tex",
+        "INPUT chapters/intro.tex",
+        "INPUT chapters/intro.tex",
+        "INPUT /usr/share/texmf/tex/latex/base/article.cls",
+        "INPUT {dir}/compile.aux".format(dir=tmp_path),
+        "OUTPUT compile.pdf"
+    ]))
+    assert CompileCache.read_inputs(str(fls), str(source_dir)) == [
+        str(source_dir / "chapters" / "intro.tex"),
+        str(source_dir / "thesis.tex")
+    ]
+    assert CompileCache.read_inputs(str(tmp_path / "missing.fls"), str(source_dir)) == list()
+
+
+def test_results_whose_inputs_changed_are_evicted(tmp_path):
+    chapter = tmp_path / "chapter.tex"
+    chapter.write_text("Old")
+    build_dir = tmp_path / "build"
+    build_dir.mkdir()
+    cache = CompileCache(2)
+    cache.put("a", {"pdf": "a.pdf", "inputs": CompileCache.hash_inputs([str(chapter)]), "files": [str(build_dir)]})
+    assert cache.get("a")
+    chapter.write_text("New")
+    assert cache.get("a") is False
+    assert not build_dir.exists()
+    assert (cache.hits, cache.misses) == (1, 1)
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+# coding: utf-8
+from diagnostics import Diagnostic
+
+
+def test_parse_error_line():
+    diagnostic = Diagnostic.parse("../project/current.tex:12: Undefined control sequence.")
+    assert diagnostic.file == "../project/current.tex"
+    assert diagnostic.line == 12
+    assert diagnostic.message == "Undefined control sequence."
+    assert not diagnostic.fatal
+
+
+def test_parse_windows_path_and_fatal():
+    diagnostic = Diagnostic.parse("C:\\Users\\me\\thesis.tex:3: Emergency stop.")
+    assert diagnostic.file == "C:\\Users\\me\\thesis.tex"
+    assert diagnostic.line == 3
+    assert diagnostic.fatal
+
+
+def test_parse_other_lines():
+    assert Diagnostic.parse("This is XeTeX, Version 3.14159265") is False
+    assert Diagnostic.parse("l.12 \\foo") is False
+
+
+def test_only_missing_packages_are_fatal():
+    assert not Diagnostic.parse("current.tex:7: LaTeX Error: File `fig.png' not found.").fatal
+    assert Diagnostic.parse("current.tex:1: LaTeX Error: File `tikz.sty' not found.").fatal
+    assert Diagnostic.parse("current.tex:1: LaTeX Error: File `thesis.cls' not found.").fatal
+
+
+def test_messages_end_at_the_context_line_or_a_blank_line():
+    diagnostics = Diagnostic.parse_output("\n".join([
+        "current.tex:12: Undefined control sequence.",
+        "<argument> \\foo",
+        "l.12 \\foo",
+        "[1] [2] [3]",
+        "current.tex:20: LaTeX Error: File `fig.png' not found.",
+        "",
+        "See the LaTeX manual or LaTeX Companion for explanation.",
+        "Output written on compile.pdf (3 pages).",
+    ]))
+    assert [(diagnostic.line, diagnostic.message) for diagnostic in diagnostics] == [
+        (12, "Undefined control sequence.\n<argument> \\foo\nl.12 \\foo"),
+        (20, "LaTeX Error: File `fig.png' not found."),
+    ]
@@ -0,0 +1,29 @@
+#!/usr/bin/env python3
+# coding: utf-8
+from fake_engine import main, make_pdf
+
+
+def test_pdf_is_well_formed():
+    pdf = make_pdf(3)
+    assert pdf.startswith(b"%PDF-1.4") and pdf.endswith(b"%%EOF\n")
+    assert b"/Count 3" in pdf
+    # The cross-reference table points at the objects
+    xref = int(pdf.split(b"startxref\n")[1].split(b"\n")[0])
+    assert pdf[xref:].startswith(b"xref")
+    offsets = [int(line[:10]) for line in pdf[xref:].split(b"\n")[3:3 + 9]]
+    assert all(pdf[offset:].startswith(b"%d 0 obj" % number) for number, offset in enumerate(offsets, 1))
+
+
+def test_pages_and_errors(tmp_path, capsys):
+    path = tmp_path / "doc.tex"
+    path.write_text("\\newpage\n\\begin{document}\nA\\newpage\n\\ABUELAERROR\nB\\clearpage C\n\\end{document}\n")
+    assert main(["-job-name=compile", "-output-directory={dir}".format(dir=tmp_path), str(path)]) == 0
+    assert b"/Count 3" in (tmp_path / "compile.pdf").read_bytes()
+    assert capsys.readouterr().out == "{path}:4: Undefined control sequence.\n".format(path=path)
+
+
+def test_fatal_error(tmp_path):
+    path = tmp_path / "doc.tex"
+    path.write_text("\\begin{document}\n\\ABUELAFATAL\n\\end{document}\n")
+    assert main(["-output-directory={dir}".format(dir=tmp_path), str(path)]) == 1
+    assert not (tmp_path / "doc.pdf").exists()
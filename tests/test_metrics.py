@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+# coding: utf-8
+from metrics import Histogram, Metrics
+
+
+def test_histogram_percentiles():
+    histogram = Histogram()
+    for seconds in [0.003] * 90 + [0.4] * 9 + [100]:
+        histogram.observe(seconds)
+    assert histogram.count() == 100
+    assert histogram.percentile(0.5) == 5
+    assert histogram.percentile(0.95) == 500
+    assert histogram.percentile(1) == float("inf")
+    assert Histogram().percentile(0.5) == 0
+
+
+def test_sessions_add_up_per_project(tmp_path):
+    path = str(tmp_path / "metrics.jsonl")
+    for _ in range(2):
+        metrics = Metrics(path)
+        metrics.project = "a.tex"
+        metrics.observe("engine", 0.15)
+        metrics.count("compile_cache", hits=1, misses=3)
+        metrics.project = "b.tex"
+        metrics.observe("engine", 1.5)
+        metrics.save()
+    projects = Metrics.load(path)
+    assert projects["a.tex"]["histograms"]["engine"].count() == 2
+    assert projects["a.tex"]["counters"]["compile_cache"] == [2, 6]
+    assert projects["b.tex"]["histograms"]["engine"].percentile(0.5) == 2000
+    report = Metrics.report(path)
+    assert "Engine: p50 <=200 ms" in report and "Compile cache hits: 2/8 (25%)" in report
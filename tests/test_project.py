@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# coding: utf-8
+from project import COUNTER_RECORDER, Project
+
+DOCUMENT = "\n".join([
+    "\\documentclass{book}",                  # 1
+    "\\begin{document}",                      # 2
+    "\\chapter{One}",                         # 3
+    "\\section{Alpha}",                       # 4
+    "Some text.",                             # 5
+    "\\section{Beta}",                        # 6
+    "\\begin{figure}",                        # 7
+    "A figure.",                              # 8
+    "\\subsection{Inside}",                   # 9
+    "More of the figure.",                    # 10
+    "\\end{figure}",                          # 11
+    "\\section*{Gamma}",                      # 12
+    "Unnumbered.",                            # 13
+    "\\chapter{Two}",                         # 14
+    "\\section{Delta}",                       # 15
+    "The cursor is here.",                    # 16
+    "\\section{Epsilon}",                     # 17
+    "The end.",                               # 18
+    "\\end{document}",                        # 19
+])
+
+
+def test_excerpt_keeps_line_numbers_and_counters():
+    code, first_line, last_line = Project("current.tex").excerpt(16, DOCUMENT)
+    lines = code.split("\n")
+    assert (first_line, last_line) == (15, 16)
+    assert lines[14] == "\\section{Delta}"
+    assert lines[15] == "The cursor is here."
+    assert lines[16] == "\\end{document}"
+    # Both chapters come before the excerpt, and the sections restarted with the second one
+    assert lines[13] == "\\setcounter{chapter}{2}"
+    assert all(not line for line in lines[2:13])
+
+
+def test_excerpt_extends_to_whole_environments():
+    code, first_line, last_line = Project("current.tex").excerpt(10, DOCUMENT)
+    lines = code.split("\n")
+    # The subsection is inside a figure, so the whole figure is compiled
+    assert (first_line, last_line) == (7, 11)
+    assert lines[6] == "\\begin{figure}"
+    assert lines[10] == "\\end{figure}"
+    assert lines[5] == "\\setcounter{chapter}{1}\\setcounter{section}{2}"
+
+
+def test_no_excerpt_outside_the_body():
+    assert Project("current.tex").excerpt(1, DOCUMENT) is False
+    assert Project("current.tex").excerpt(5, "\\begin{document}\nShort\n\\end{document}") is False
+
+
+def test_chunks_split_at_chapters():
+    project = Project("current.tex")
+    assert project.chunks(DOCUMENT) == [[2, 13], [13, 18]]
+    lines = project.extract(13, 18, DOCUMENT).split("\n")
+    assert lines[12] == "\\setcounter{chapter}{1}\\setcounter{section}{2}\\setcounter{subsection}{1}"
+    assert lines[13] == "\\chapter{Two}"
+    assert lines[18] == "\\end{document}"
+
+
+def test_chunks_carry_every_counter():
+    project = Project("current.tex")
+    first, second = project.chunks(DOCUMENT)
+    # The recorder runs before the chunk ends, on the same line as its \end{document}
+    lines = project.extract(*first, DOCUMENT, trailer=COUNTER_RECORDER).split("\n")
+    assert lines[13] == COUNTER_RECORDER + "\\end{document}"
+    assert lines.count("\\end{document}") == 0
+    # The counters it writes start the next chunk (the sections are counted from the document itself)
+    aux = "\\relax\n\\@gobble{ABUELA-COUNTER=page=7}\n\\@gobble{ABUELA-COUNTER=figure=3}\n" \
+          "\\@gobble{ABUELA-COUNTER=section=9}\n"
+    counters = Project.read_counters(aux)
+    assert counters == {"page": 7, "figure": 3, "section": 9}
+    lines = project.extract(*second, DOCUMENT, counters=counters).split("\n")
+    assert lines[12] == "\\setcounter{chapter}{1}\\setcounter{section}{2}\\setcounter{subsection}{1}\\makeatletter" \
+                        "\\@ifundefined{c@figure}{}{\\setcounter{figure}{3}}" \
+                        "\\@ifundefined{c@page}{}{\\setcounter{page}{7}}\\makeatother"
+
+
+def test_used_labels_are_picked_from_the_aux():
+    code = "\n".join([
+        "See \\eqref{eq:energy} and \\cref{fig:a, fig:b}.",
+        "As shown by \\citep[p. 4]{knuth}.",
+        "% \\ref{sec:commented}",
+    ])
+    aux = "\n".join([
+        "\\relax",
+        "\\newlabel{eq:energy}{{3}{12}}",
+        "\\newlabel{eq:energy@cref}{{[equation][3][]3}{12}}",
+        "\\newlabel{fig:b}{{2}{5}}",
+        "\\newlabel{sec:commented}{{1}{1}}",
+        "\\newlabel{eq:other}{{4}{13}}",
+        "\\bibcite{knuth}{1}",
+        "\\bibcite{lamport}{2}",
+    ])
+    assert Project.used_labels(code, aux).split("\n") == [
+        "\\newlabel{eq:energy}{{3}{12}}",
+        "\\newlabel{eq:energy@cref}{{[equation][3][]3}{12}}",
+        "\\newlabel{fig:b}{{2}{5}}",
+        "\\bibcite{knuth}{1}",
+    ]
+    assert Project.used_labels("No references.", aux) == str()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# coding: utf-8
+from threading import Event
+from time import sleep
+
+from scheduler import CompileJob, CompileScheduler
+
+
+class FakeProcess:
+    def __init__(self):
+        self.killed = False
+
+
+def kill(proc):
+    proc.killed = True
+
+
+def test_bursts_are_coalesced():
+    jobs = list()
+    done = Event()
+
+    def run(job):
+        jobs.append(job)
+        done.set()
+
+    scheduler = CompileScheduler(run, 0.05, kill)
+    for text in ["a", "ab", "abc"]:
+        scheduler.submit(text)
+    assert done.wait(2)
+    sleep(0.1)
+    scheduler.close()
+    # Only the last revision of the burst is compiled
+    assert [(job.revision, job.text) for job in jobs] == [(3, "abc")]
+
+
+def test_submitting_cancels_the_running_job():
+    started = Event()
+    finished = Event()
+    proc = FakeProcess()
+    jobs = list()
+
+    def run(job):
+        jobs.append(job)
+        if job.revision == 1:
+            job.attach(proc)
+            started.set()
+            # Stands in for a compiler which runs until it's killed
+            while not job.cancelled:
+                sleep(0.01)
+        else:
+            finished.set()
+
+    scheduler = CompileScheduler(run, 0, kill)
+    scheduler.submit("old")
+    assert started.wait(2)
+    scheduler.submit("new")
+    assert finished.wait(2)
+    scheduler.close()
+    assert jobs[0].cancelled and proc.killed
+    assert [job.text for job in jobs] == ["old", "new"]
+    assert not jobs[1].cancelled
+
+
+def test_stale_revisions_are_rejected():
+    scheduler = CompileScheduler(lambda job: None, 10, kill)
+    old_revision = scheduler.submit("old")
+    assert scheduler.is_current(old_revision)
+    new_revision = scheduler.submit("new")
+    assert not scheduler.is_current(old_revision)
+    assert scheduler.is_current(new_revision)
+    # Waiting is cut short for outdated revisions
+    assert not scheduler.wait_idle(old_revision, 10)
+    assert scheduler.wait_idle(new_revision, 0.01)
+    scheduler.close()
+
+
+def test_processes_of_cancelled_jobs_are_killed_right_away():
+    job = CompileJob(1, "text", 0, kill=kill)
+    job.cancel()
+    proc = FakeProcess()
+    job.attach(proc)
+    assert proc.killed and not job.processes
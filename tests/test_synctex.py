@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+# coding: utf-8
+import gzip
+
+from synctex import SyncTex
+
+# One inch is 72.27 TeX points of 65536 scaled points each
+INCH = 4736286
+
+SYNCTEX = """SyncTeX Version:1
+Input:1:../project/current.tex
+Input:2:/usr/share/texmf/tex/latex/base/article.cls
+Output:pdf
+Magnification:1000
+Unit:1
+X Offset:0
+Y Offset:0
+Content:
+!100
+{1
+[1,5:0,0:INCH,INCH,0
+(1,5:0,INCH:INCH,HALF,0
+(2,90:0,INCH:INCH,HALF,0
+(1,7:0,TWO:INCH,HALF,0
+]
+}1
+{2
+(1,12:INCH,INCH:INCH,HALF,0
+}2
+Postamble:
+""".replace("HALF", str(INCH // 2)).replace("TWO", str(2 * INCH)).replace("INCH", str(INCH))
+
+
+def write_synctex(tmp_path):
+    path = tmp_path / "compile.synctex.gz"
+    with gzip.open(path, "wt", encoding="utf-8") as file:
+        file.write(SYNCTEX)
+    return str(path)
+
+
+def test_forward_search(tmp_path):
+    sync_tex = SyncTex.parse(write_synctex(tmp_path), "../project/current.tex")
+    page, top, left = sync_tex.forward(7)
+    assert page == 1
+    assert abs(top - 2.5) < 0.01
+    assert abs(left - 1) < 0.01
+    # Lines without a place of their own get the next line's place
+    assert sync_tex.forward(10)[0] == 2
+    assert sync_tex.forward(100)[0] == 2
+
+
+def test_inverse_search(tmp_path):
+    sync_tex = SyncTex.parse(write_synctex(tmp_path), "../project/current.tex")
+    assert sync_tex.inverse(1, 2.8) == 7
+    assert sync_tex.inverse(2, 1.9) == 12
+    assert sync_tex.inverse(3, 1) is False
+
+
+def test_other_inputs_are_skipped(tmp_path):
+    sync_tex = SyncTex.parse(write_synctex(tmp_path), "../project/current.tex")
+    assert 90 not in sync_tex.lines
+    assert SyncTex.parse(str(tmp_path / "missing.synctex.gz")) is False
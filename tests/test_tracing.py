@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+# coding: utf-8
+from tracing import NULL_SPAN, Tracer, span
+
+
+def test_nested_spans_export_in_order():
+    tracer = Tracer(16)
+    with tracer.span("outer", revision=1):
+        with tracer.span("inner"):
+            pass
+        tracer.instant("Compiling...")
+    events = tracer.to_chrome()["traceEvents"]
+    assert [event["name"] for event in events] == ["outer", "inner", "Compiling..."]
+    outer, inner, instant = events
+    assert outer["ph"] == inner["ph"] == "X" and instant["ph"] == "i"
+    assert outer["args"] == {"revision": 1}
+    # The inner span lies within the outer one
+    assert outer["ts"] <= inner["ts"] and inner["ts"] + inner["dur"] <= outer["ts"] + outer["dur"]
+
+
+def test_ring_buffer_keeps_latest():
+    tracer = Tracer(2)
+    for index in range(5):
+        tracer.record(str(index), 0.0, 1.0)
+    assert [event["name"] for event in tracer.to_chrome()["traceEvents"]] == ["3", "4"]
+
+
+def test_disabled_and_missing_tracer():
+    tracer = Tracer(0)
+    with tracer.span("stage"):
+        tracer.instant("moment")
+    assert tracer.to_chrome()["traceEvents"] == []
+    assert span(False, "stage") is NULL_SPAN
+
+
+def test_parents_come_first_at_the_same_time():
+    tracer = Tracer(16)
+    # A coarse clock gives nested spans the same start, and the child ends (and is recorded) first
+    tracer.record("child", tracer.origin + 5, tracer.origin + 5)
+    tracer.record("parent", tracer.origin + 5, tracer.origin + 9)
+    assert [event["name"] for event in tracer.to_chrome()["traceEvents"]] == ["parent", "child"]